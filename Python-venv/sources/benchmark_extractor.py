@@ -0,0 +1,87 @@
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from logging import Logger, getLogger
+import statistics
+import time
+import sys
+
+from my_logger import MyLogger
+from models.html_cache import HtmlCache, read_blob
+from models.article_extractor import ArticleExtractor, ArticleBodyNotFoundError, Html5libExtractor, FastExtractor, FallbackExtractor
+
+
+class ExtractorBenchmark:
+	"""保存済みのHTMLで，抽出器ごとの1ページあたりの解析時間と，html5libとの抽出結果の一致を確認します。"""
+	
+	def __init__(self, logger: Optional[Logger] = None):
+		self.__logger: Logger = logger if logger is not None else getLogger("benchmark")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__html_cache_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/crawl/html_cache"))
+	
+	def main(self) -> bool:
+		pages_directory: str = input("HTMLファイル（*.html）のディレクトリーは？（空欄でクロール時のキャッシュ）：")
+		max_pages: str = input("何ページで計測する？（空欄ですべて）：")
+		pages: List[Tuple[str, str]] = self.load_pages(pages_directory, int(max_pages) if max_pages != "" else 0)
+		results: Dict[str, Dict[str, float]] = self.run(pages)
+		return all(map(lambda result: result["mismatch"] == 0, results.values( )))
+	
+	def load_pages(self, pages_directory: str = "", max_pages: int = 0) -> List[Tuple[str, str]]:
+		"""計測するHTMLを読み込みます。\n
+		:param pages_directory: HTMLファイルのディレクトリー（空文字列でクロール時のキャッシュ）
+		:param max_pages: 読み込む最大ページ数（0ですべて）
+		:return: （名前，HTML）のリスト"""
+		if pages_directory != "":
+			paths: List[Path] = sorted(Path(pages_directory).glob("*.html"))
+			paths = paths[: max_pages] if 0 < max_pages else paths
+			return list(map(lambda path: (path.stem, path.read_text(encoding = "utf-8")), paths))
+		with HtmlCache(self.__html_cache_directory_path) as html_cache:
+			items: List[Tuple[int, str]] = html_cache.items( )
+		items = items[: max_pages] if 0 < max_pages else items
+		return list(map(lambda item: (str(item[0]), read_blob(item[1])), items))
+	
+	def run(self, pages: List[Tuple[str, str]]) -> Dict[str, Dict[str, float]]:
+		"""抽出器ごとに計測し，結果をログ出力します。\n
+		:param pages: （名前，HTML）のリスト
+		:return: 抽出器名→{ 'mean', 'median', 'max', 'mismatch' }（時間はミリ秒）"""
+		if len(pages) < 1:
+			self.__logger.error("計測するHTMLがありません。")
+			return dict( )
+		self.__logger.info(str(len(pages)) + " ページで計測します。")
+		extractors: Tuple[ArticleExtractor, ...] = (Html5libExtractor( ), FastExtractor( ), FallbackExtractor( ))
+		expected: List[Dict[str, str]] = list( )
+		results: Dict[str, Dict[str, float]] = dict( )
+		for extractor in extractors:
+			seconds: List[float] = list( )
+			mismatches: List[str] = list( )
+			for i, (name, html) in enumerate(pages):
+				start_time: float = time.perf_counter( )
+				article: Dict[str, str] = self.__extract(extractor, html)
+				seconds.append(time.perf_counter( ) - start_time)
+				if extractor.name == Html5libExtractor.name:
+					expected.append(article)
+				elif article != expected[i]:
+					mismatches.append(name)
+			results[extractor.name] = {
+				"mean": statistics.mean(seconds) * 1000.0,
+				"median": statistics.median(seconds) * 1000.0,
+				"max": max(seconds) * 1000.0,
+				"mismatch": float(len(mismatches))
+			}
+			self.__logger.info(extractor.name + "：平均 " + str(round(results[extractor.name]["mean"], 3)) + " ms，中央値 " + str(round(results[extractor.name]["median"], 3)) + " ms，最大 " + str(round(results[extractor.name]["max"], 3)) + " ms／ページ，html5libと不一致 " + str(len(mismatches)) + " ページ" + ("（" + "，".join(mismatches[: 20]) + "）" if 0 < len(mismatches) else ""))
+			if isinstance(extractor, FallbackExtractor):
+				self.__logger.info(extractor.name + "：html5libで抽出し直したページ数 " + str(extractor.fallback_count))
+		return results
+	
+	def __extract(self, extractor: ArticleExtractor, html: str) -> Dict[str, str]:
+		"""抽出します。エラーの場合は種類だけを返します。"""
+		try:
+			return extractor.extract(html)
+		except ArticleBodyNotFoundError:
+			return {"error": "deleted"}
+		except Exception:
+			return {"error": "invalid"}
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("benchmark").logger
+	sys.exit(0 if ExtractorBenchmark(logger).main( ) else 1)
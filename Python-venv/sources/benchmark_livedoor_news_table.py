@@ -0,0 +1,76 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from pathlib import Path
+from logging import Logger, getLogger
+import tracemalloc
+import time
+import json
+
+from my_logger import MyLogger
+from models.livedoor_news import LivedoorNewsTable
+from models.record_index import RecordRangeReader
+
+
+class LivedoorNewsTableBenchmark:
+	"""記事ごとの辞書のリストとLivedoorNewsTableで，読み込み・絞り込み・書き出しの時間とメモリー使用量を比べます。"""
+	
+	def __init__(self, logger: Optional[Logger] = None):
+		self.__logger: Logger = logger if logger is not None else getLogger("benchmark")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__json_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+	
+	def main(self):
+		file_name: str = input("どのJSONで計測する？（debug / develop / test / train，空欄でtrain）：")
+		year: str = input("絞り込む公開年は？（空欄で2016）：")
+		month: str = input("絞り込む公開月は？（空欄で1）：")
+		self.run(file_name if file_name != "" else "train", int(year) if year != "" else 2016, int(month) if month != "" else 1)
+	
+	def run(self, file_name: str, year: int, month: int) -> Dict[str, Dict[str, float]]:
+		"""計測し，結果をログ出力します。\n
+		:param file_name: JSON（JSONLがあればJSONL）の表示名
+		:param year: 絞り込む公開年
+		:param month: 絞り込む公開月
+		:return: 方式名→{ 'load', 'filter', 'export'（秒）, 'memory'（MiB）, 'count'（絞り込み後の件数） }"""
+		data_path: str = self.__json_directory_path + "/" + file_name + ".jsonl"
+		if not Path(data_path).exists( ):
+			data_path = self.__json_directory_path + "/" + file_name + ".json"
+		if not Path(data_path).exists( ):
+			self.__logger.error(data_path + " がありません。")
+			return dict( )
+		results: Dict[str, Dict[str, float]] = dict( )
+		# 辞書のリスト（従来の，記事ごとにPythonオブジェクトを持つ方式）
+		records, load_seconds, memory = self.__measure_load(data_path, lambda reader: list(reader.read( )))
+		filtered, filter_seconds = self.__measure(lambda: list(filter(lambda record: record.get("year") == year and record.get("month") == month, records)))
+		_, export_seconds = self.__measure(lambda: "".join(map(lambda record: json.dumps(record, ensure_ascii = False, allow_nan = False) + "\n", filtered)))
+		results["list"] = {"load": load_seconds, "filter": filter_seconds, "export": export_seconds, "memory": memory, "count": float(len(filtered))}
+		del records, filtered
+		# LivedoorNewsTable
+		table, load_seconds, memory = self.__measure_load(data_path, lambda reader: LivedoorNewsTable.from_records(reader.read( )))
+		filtered_table, filter_seconds = self.__measure(lambda: table.filter(year = year, month = month))
+		_, export_seconds = self.__measure(lambda: "".join(map(lambda record: json.dumps(record, ensure_ascii = False, allow_nan = False) + "\n", filtered_table.records( ))))
+		results["table"] = {"load": load_seconds, "filter": filter_seconds, "export": export_seconds, "memory": memory, "count": float(len(filtered_table))}
+		for name, result in results.items( ):
+			self.__logger.info(name + "：読み込み " + str(round(result["load"], 3)) + " 秒（" + str(round(result["memory"], 1)) + " MiB），絞り込み " + str(round(result["filter"] * 1000.0, 3)) + " ms（" + str(int(result["count"])) + " 件），書き出し " + str(round(result["export"] * 1000.0, 3)) + " ms")
+		return results
+	
+	@staticmethod
+	def __measure_load(data_path: str, load: Callable[[RecordRangeReader], Any]) -> Tuple[Any, float, float]:
+		"""読み込みの時間と，読み込んだ結果が占めるメモリー（MiB）を計測します。"""
+		tracemalloc.start( )
+		start_time: float = time.perf_counter( )
+		with RecordRangeReader(data_path) as reader:
+			loaded: Any = load(reader)
+		seconds: float = time.perf_counter( ) - start_time
+		memory: int = tracemalloc.get_traced_memory( )[0]
+		tracemalloc.stop( )
+		return loaded, seconds, memory / 1024.0 ** 2
+	
+	@staticmethod
+	def __measure(function: Callable[[ ], Any]) -> Tuple[Any, float]:
+		start_time: float = time.perf_counter( )
+		result: Any = function( )
+		return result, time.perf_counter( ) - start_time
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("LivedoorNewsTableBenchmark").logger
+	LivedoorNewsTableBenchmark(logger).main( )
@@ -0,0 +1,60 @@
+from typing import Callable, Dict, List, Optional
+from logging import Logger, LogRecord, getLogger, INFO
+import tempfile
+import time
+import os
+
+from my_logger import MyLogger, HTMLFormatter
+
+
+class MyLoggerBenchmark:
+	"""ログ出力1件あたりに，呼び出し元のスレッドがかかる時間を，従来どおりの同期出力とQueueListenerを使う出力，文字列連結と%形式の引数で比べます。\n
+	標準出力は/dev/nullに，HTMLのログは一時ディレクトリーに書き出します。"""
+	
+	def __init__(self, logger: Optional[Logger] = None):
+		self.__logger: Logger = logger if logger is not None else getLogger("benchmark")
+	
+	def main(self):
+		count: str = input("何件出力する？（空欄で20000）：")
+		self.run(int(count) if count != "" else 20000)
+	
+	def run(self, count: int) -> Dict[str, Dict[str, float]]:
+		"""計測し，結果をログ出力します。\n
+		:param count: 方式ごとに出力するログの件数
+		:return: 方式名→{ 'microseconds'（呼び出し元の1件あたりのマイクロ秒）, 'drain_seconds'（キューに残ったログを書き終えるまでの秒） }"""
+		results: Dict[str, Dict[str, float]] = dict( )
+		with tempfile.TemporaryDirectory( ) as log_directory_path, open(os.devnull, mode = "w") as null_stream:
+			for use_queue in (False, True):
+				for lazy in (False, True):
+					for level in ("info", "disabled debug"):
+						name: str = ("queue" if use_queue else "sync") + "，" + ("%形式" if lazy else "連結") + "，" + level
+						my_logger: MyLogger = MyLogger("benchmark-" + name, use_queue = use_queue, log_directory_path = log_directory_path, stream = null_stream)
+						my_logger.logger.setLevel(INFO)
+						my_logger.logger.propagate = False
+						log: Callable = my_logger.logger.info if level == "info" else my_logger.logger.debug
+						start_time: float = time.perf_counter( )
+						if lazy:
+							for i in range(count):
+								log("進捗：%d / %d（%s ％）\n経過時間：%s", i, count, round(i / count * 100.0, 2), i * 0.5)
+						else:
+							for i in range(count):
+								log("進捗：" + str(i) + " / " + str(count) + "（" + str(round(i / count * 100.0, 2)) + " ％）\n経過時間：" + str(i * 0.5))
+						seconds: float = time.perf_counter( ) - start_time
+						start_time = time.perf_counter( )
+						my_logger.close( )
+						results[name] = {"microseconds": seconds / count * 1000000.0, "drain_seconds": time.perf_counter( ) - start_time}
+						self.__logger.info(name + "：呼び出し元 " + str(round(results[name]["microseconds"], 2)) + " µs／件，残りの書き込み " + str(round(results[name]["drain_seconds"], 3)) + " 秒")
+		self.__check_html_formatter( )
+		return results
+	
+	def __check_html_formatter(self):
+		"""HTMLFormatterが，従来の置き換えを繰り返す方式と同じ結果になるかを確かめます。"""
+		formatter: HTMLFormatter = HTMLFormatter(fmt = "%(message)s", datefmt = "%Y/%m/%d-%H:%M:%S")
+		messages: List[str] = ["<a>\r\n\tb\n\rc>\r\n\r", "", "タグ<p>と\t改行\r\n", "\r\r\n\n"]
+		mismatches: List[str] = list(filter(lambda message: formatter.format(LogRecord("check", INFO, "", 0, message, None, None)) != message.replace("<", "&#60").replace(">", "&#62").replace("\r\n", "<br />").replace("\n", "<br />").replace("\t", "　　"), messages))
+		self.__logger.info("HTMLFormatter：従来との不一致 " + str(len(mismatches)) + " 件")
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("MyLoggerBenchmark").logger
+	MyLoggerBenchmark(logger).main( )
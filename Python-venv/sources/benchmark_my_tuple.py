@@ -0,0 +1,97 @@
+from typing import Callable, Dict, Iterable, List, Optional
+from functools import reduce
+from logging import Logger, getLogger
+from multiprocessing import Pool
+import multiprocessing
+import time
+
+from my_logger import MyLogger
+from models.my_tuple import MyTuple
+
+
+class MyTupleBenchmark:
+	"""従来のMyTuple（imapのたびにプロセスプールを作り直し，chunksize 1で全件をtupleにする）と，使い回すプロセスプールでmap，filterをまとめて少しずつ計算するMyTupleを比べます。"""
+	
+	def __init__(self, logger: Optional[Logger] = None):
+		self.__logger: Logger = logger if logger is not None else getLogger("benchmark")
+	
+	def main(self):
+		count: str = input("要素数は？（空欄で200000）：")
+		repeat: str = input("何回続けて実行する？（空欄で5）：")
+		num_of_process: str = input("プロセス数は？（空欄でCPU数 - 1）：")
+		self.run(int(count) if count != "" else 200000, int(repeat) if repeat != "" else 5, int(num_of_process) if num_of_process != "" else max(multiprocessing.cpu_count( ) - 1, 1))
+	
+	def run(self, count: int, repeat: int = 5, num_of_process: int = max(multiprocessing.cpu_count( ) - 1, 1)) -> Dict[str, Dict[str, float]]:
+		"""imap→map→filter→imapのパイプラインをrepeat回実行し，時間を計測して，結果をログ出力します。\n
+		:param count: 要素数
+		:param repeat: 続けて実行する回数（2回目以降は，使い回すプロセスプールの起動時間がかからない）
+		:param num_of_process: プロセス数
+		:return: 方式名→{ 'first'（1回目の秒）, 'seconds'（合計の秒）, 'items_per_second', 'mismatch' }"""
+		texts: List[str] = list(map(lambda i: "記事" + str(i) + "。" * (i % 7), range(count)))
+		self.__logger.info(str(count) + " 個の要素を，" + str(num_of_process) + " プロセスで " + str(repeat) + " 回計測します。")
+		pipelines: Dict[str, Callable[[ ], tuple]] = {
+			"legacy": lambda: LegacyMyTuple(texts).imap(text_length, num_of_process).map(square).filter(is_even).imap(digit_sum, num_of_process).tuple,
+			"unordered": lambda: MyTuple(texts).imap(text_length, num_of_process, ordered = False).map(square).filter(is_even).imap(digit_sum, num_of_process).tuple,
+			"fused": lambda: MyTuple(texts).imap(text_length, num_of_process).map(square).filter(is_even).imap(digit_sum, num_of_process).tuple
+		}
+		expected: tuple = tuple(map(digit_sum, filter(is_even, map(square, map(text_length, texts)))))
+		# 使い回すプロセスプールの起動も計測に含めるため，最初の実行より前には作らない
+		results: Dict[str, Dict[str, float]] = dict( )
+		for name, pipeline in pipelines.items( ):
+			seconds: List[float] = list( )
+			mismatch: int = 0
+			for _ in range(repeat):
+				start_time: float = time.perf_counter( )
+				output: tuple = pipeline( )
+				seconds.append(time.perf_counter( ) - start_time)
+				# 順不同は並べ替えて比べる
+				mismatch += int((sorted(output) if name == "unordered" else output) != (sorted(expected) if name == "unordered" else expected))
+			total: float = max(sum(seconds), 0.000001)
+			results[name] = {"first": seconds[0], "seconds": total, "items_per_second": count * repeat / total, "mismatch": float(mismatch)}
+			self.__logger.info(name + "：1回目 " + str(round(seconds[0], 3)) + " 秒，合計 " + str(round(total, 3)) + " 秒，" + str(round(results[name]["items_per_second"], 1)) + " 個／秒，結果の不一致 " + str(mismatch) + " 回")
+		return results
+
+
+class LegacyMyTuple:
+	"""比較用の，従来のMyTupleのimapとmap，filterです。"""
+	
+	def __init__(self, iterator: Iterable):
+		self.__iterator: Iterable = iterator
+	
+	@property
+	def tuple(self) -> tuple:
+		return tuple(self.__iterator)
+	
+	def map(self, function: Callable):
+		self.__iterator = map(function, self.__iterator)
+		return self
+	
+	def imap(self, function: Callable, num_of_process: int = multiprocessing.cpu_count( ) - 1):
+		with Pool(processes = num_of_process) as pool:
+			self.__iterator = tuple(pool.imap(function, self.__iterator))
+		return self
+	
+	def filter(self, function: Callable):
+		self.__iterator = filter(function, self.__iterator)
+		return self
+
+
+def text_length(text: str) -> int:
+	return len(text.encode("utf-8"))
+
+
+def square(value: int) -> int:
+	return value * value
+
+
+def is_even(value: int) -> bool:
+	return value % 2 == 0
+
+
+def digit_sum(value: int) -> int:
+	return reduce(lambda total, digit: total + int(digit), str(value), 0)
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("MyTupleBenchmark").logger
+	MyTupleBenchmark(logger).main( )
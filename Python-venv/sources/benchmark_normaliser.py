@@ -0,0 +1,101 @@
+# Apache License, Version 2.0の「mojimoji」（by Studio Ousia）を用いています。
+from typing import Callable, Dict, Iterator, List, Optional, Match
+from itertools import chain, islice
+from pathlib import Path
+from logging import Logger, getLogger
+from kanjize import kanji2int
+import time
+import re
+import mojimoji
+import unicodedata
+
+from my_logger import MyLogger
+from models.jsonl_shard import read_crawled_records
+from models.normaliser_engine import NormaliserEngine, staged_normalise
+
+
+def original_normalise(string: str, delimiter: str = "。") -> str:
+	"""NormaliserEngineを入れる前のStringNormaliser.normaliseと同じ手順（Unicode正規化→改行・区切り文字→記号→漢数字→全角・半角）で正規化します。\n
+	差分確認の基準なので，models.normaliser_engineの表や正規表現は使わず，当時の処理をそのまま書き写してあります。
+	:param string: 正規化前文字列
+	:param delimiter: 文区切り文字（例：「。」）
+	:return: 正規化後の文字列"""
+	def replace_crlf(before_string: str) -> str:
+		return before_string.replace("\r\n", "　").replace("\n", "　").replace("\r", "　")
+	
+	def kanji_number_to_arabic_number(kanji_match: Match) -> str:
+		kanji_string: str = kanji_match.group(0)
+		if re.compile("[〇一二三四五六七八九]{1,}").fullmatch(kanji_string):
+			return "".join(map(lambda kanji: str(kanji2int(kanji)), kanji_string))
+		return str(kanji2int(kanji_string))
+	
+	unicode_normalised: str = unicodedata.normalize("NFD", string)
+	crlf2space1: str = replace_crlf(unicode_normalised)
+	remove_crlf: str = re.compile(delimiter + "(([ 　]{0,}(\r\n)|(\n)|(\r))|([ 　]{1,}))").sub(delimiter, crlf2space1)
+	crlf2space2: str = re.compile("[ 　]{2,}").sub("　", replace_crlf(remove_crlf))
+	half: str = "\"#%&'()*+" + "<=>?@" + "[\\]^`" + "{|}~" + "‐"
+	full: str = "＂＃％＆＇（）＊＋" + "＜＝＞？＠" + "［＼］＾｀" + "｛｜｝〜" + "-"
+	sign_replaced: str = crlf2space2.translate(str.maketrans(half, full))
+	kan_suji_replaced: str = re.compile("[〇一二三四五六七八九十百千万億兆]{1,}").sub(kanji_number_to_arabic_number, sign_replaced)
+	latin_full: str = "".join(map(chr, list(range(0xff10, 0xff10 + 10)) + list(range(0xff21, 0xff21 + 26)) + list(range(0xff41, 0xff41 + 26))))
+	latin_half: str = "".join(map(chr, list(range(0x0030, 0x0030 + 10)) + list(range(0x0041, 0x0041 + 26)) + list(range(0x0061, 0x0061 + 26))))
+	translate_latin: str = kan_suji_replaced.translate(str.maketrans(latin_full, latin_half))
+	return mojimoji.han_to_zen(translate_latin, digit = False, ascii = False)
+
+
+class NormaliserBenchmark:
+	"""クロールした記事のタイトル・要約・本文で，NormaliserEngineと段ごとの正規化が，NormaliserEngineを入れる前の正規化（original_normalise）と完全に一致するかを確かめ，スループットを比べます。"""
+	
+	def __init__(self, logger: Optional[Logger] = None):
+		self.__logger: Logger = logger if logger is not None else getLogger("benchmark")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__json_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+	
+	def main(self):
+		file_name: str = input("どの分割で計測する？（debug / develop / test / train，空欄でdevelop）：")
+		max_articles: str = input("何記事で計測する？（空欄ですべて）：")
+		texts: List[str] = self.load_texts(file_name if file_name != "" else "develop", int(max_articles) if max_articles != "" else 0)
+		self.run(texts)
+	
+	def load_texts(self, file_name: str, max_articles: int = 0) -> List[str]:
+		"""クロールした記事のタイトル・要約・本文を読み込みます。\n
+		:param file_name: 分割の名前
+		:param max_articles: 読み込む最大記事数（0ですべて）
+		:return: 文字列のリスト"""
+		records: Iterator[dict] = read_crawled_records(self.__json_directory_path + "/" + file_name, file_name)
+		records = islice(records, max_articles) if 0 < max_articles else records
+		return list(filter(lambda text: text != "", chain.from_iterable(map(lambda record: (record.get("title") or "", record.get("summary") or "", record.get("content") or ""), records))))
+	
+	def run(self, texts: List[str], delimiter: str = "。") -> Dict[str, Dict[str, float]]:
+		"""正規化の結果を比べ，それぞれの時間を計測して，結果をログ出力します。\n
+		:param texts: 正規化する文字列のリスト
+		:param delimiter: 文区切り文字
+		:return: 方式名→{ 'seconds', 'texts_per_second', 'characters_per_second', 'mismatch' }"""
+		if len(texts) < 1:
+			self.__logger.error("計測する文字列がありません。")
+			return dict( )
+		characters: int = sum(map(len, texts))
+		self.__logger.info(str(len(texts)) + " 個（" + str(characters) + " 文字）の文字列で計測します。")
+		engine: NormaliserEngine = NormaliserEngine( )
+		normalisers: Dict[str, Callable[[str], str]] = {
+			"original": lambda text: original_normalise(text, delimiter),
+			"staged": lambda text: staged_normalise(text, delimiter),
+			"engine": lambda text: engine.normalise(text, delimiter)
+		}
+		outputs: Dict[str, List[str]] = dict( )
+		results: Dict[str, Dict[str, float]] = dict( )
+		for name, normalise in normalisers.items( ):
+			start_time: float = time.perf_counter( )
+			outputs[name] = list(map(normalise, texts))
+			seconds: float = max(time.perf_counter( ) - start_time, 0.000001)
+			mismatches: List[int] = list(filter(lambda i: outputs[name][i] != outputs["original"][i], range(len(texts))))
+			results[name] = {"seconds": seconds, "texts_per_second": len(texts) / seconds, "characters_per_second": characters / seconds, "mismatch": float(len(mismatches))}
+			self.__logger.info(name + "：" + str(round(seconds, 3)) + " 秒，" + str(round(results[name]["texts_per_second"], 1)) + " 個／秒，" + str(round(results[name]["characters_per_second"] / 1000000.0, 2)) + " M文字／秒，従来との不一致 " + str(len(mismatches)) + " 個")
+			for i in mismatches[: 5]:
+				self.__logger.error("不一致：\n" + repr(texts[i]) + "\n従来：" + repr(outputs["original"][i]) + "\n" + name + "：" + repr(outputs[name][i]))
+		return results
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("NormaliserBenchmark").logger
+	NormaliserBenchmark(logger).main( )
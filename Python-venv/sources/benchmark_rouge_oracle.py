@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from logging import Logger, getLogger
+import multiprocessing
+import random
+import time
+import numpy
+
+from my_logger import MyLogger
+from models.rouge_oracle import SUMMARY_LINES, pad_lines, score_articles
+
+
+class RougeOracleBenchmark:
+	"""本文の文と要約の行の組ごとにPythonのループでROUGEを計算する素朴な方式と，models.rouge_oracle.score_articlesの配列演算の方式（1プロセス・プロセスプール）の記事／秒を比べます。\n
+	GiNZAやクロールした記事なしで計測できるよう，形態素に分けた合成の記事（出現頻度に偏りのある語彙から作った本文と，本文の文を崩して作った3行要約）を使います。"""
+	
+	def __init__(self, logger: Optional[Logger] = None):
+		self.__logger: Logger = logger if logger is not None else getLogger("benchmark")
+	
+	def main(self):
+		count: str = input("記事数は？（空欄で5000）：")
+		naive_count: str = input("素朴な方式で計算する記事数は？（空欄で200）：")
+		num_of_process: str = input("プロセス数は？（空欄でCPU数 - 1）：")
+		self.run(int(count) if count != "" else 5000, int(naive_count) if naive_count != "" else 200, int(num_of_process) if num_of_process != "" else max(multiprocessing.cpu_count( ) - 1, 1))
+	
+	def run(self, count: int, naive_count: int = 200, num_of_process: int = max(multiprocessing.cpu_count( ) - 1, 1), chunk_size: int = 64) -> Dict[str, Dict[str, float]]:
+		"""合成の記事のROUGEとラベルを各方式で計算して時間を計測し，素朴な方式との差とともにログ出力します。\n
+		:param count: 記事数
+		:param naive_count: 素朴な方式で計算する記事数（遅いため先頭の一部だけ）
+		:param num_of_process: プロセスプールのプロセス数
+		:param chunk_size: まとめて配列演算で計算する記事数
+		:return: 方式名→{ 'articles', 'seconds', 'articles_per_second' }（vectorisedには素朴な方式とのF値の最大の差「max_difference」とラベルの不一致数「label_mismatch」も含む）"""
+		articles: List[Tuple[List[List[str]], List[List[str]]]] = synthetic_articles(count)
+		chunks: List[List[Tuple[List[List[str]], List[List[str]]]]] = list(map(lambda start: articles[start: start + chunk_size], range(0, count, chunk_size)))
+		self.__logger.info(str(count) + " 記事（" + str(sum(map(lambda article: len(article[0]), articles))) + " 文）で計測します。")
+		results: Dict[str, Dict[str, float]] = dict( )
+		start_time: float = time.perf_counter( )
+		naive: List[Tuple[numpy.ndarray, numpy.ndarray]] = list(map(naive_score_article, articles[: naive_count]))
+		results["naive"] = throughput(len(naive), time.perf_counter( ) - start_time)
+		start_time = time.perf_counter( )
+		outputs: List[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]] = list(map(score_articles, chunks))
+		results["vectorised"] = throughput(count, time.perf_counter( ) - start_time)
+		# 素朴な方式と同じ結果か
+		scores: numpy.ndarray = numpy.concatenate(list(map(lambda output: output[1], outputs)))
+		labels: numpy.ndarray = numpy.concatenate(list(map(lambda output: output[2], outputs)))
+		naive_sentence_count: int = sum(map(lambda article: len(article[0]), articles[: naive_count]))
+		if 0 < naive_sentence_count:
+			results["vectorised"]["max_difference"] = float(numpy.abs(numpy.concatenate(list(map(lambda item: item[0], naive))) - scores[: naive_sentence_count]).max( ))
+			results["vectorised"]["label_mismatch"] = float(numpy.count_nonzero(numpy.concatenate(list(map(lambda item: item[1], naive))) != labels[: naive_sentence_count]))
+		# プロセスの起動は計測に含める
+		start_time = time.perf_counter( )
+		with ProcessPoolExecutor(max_workers = num_of_process) as executor:
+			tuple(executor.map(score_articles, chunks))
+		results["process_pool"] = throughput(count, time.perf_counter( ) - start_time)
+		for name, result in results.items( ):
+			self.__logger.info(name + "：" + str(int(result["articles"])) + " 記事，" + str(round(result["seconds"], 3)) + " 秒，" + str(round(result["articles_per_second"], 1)) + " 記事／秒" + ("（" + str(num_of_process) + " プロセス）" if name == "process_pool" else ""))
+		if "max_difference" in results["vectorised"]:
+			self.__logger.info("素朴な方式とのF値の最大の差：" + str(results["vectorised"]["max_difference"]) + "，ラベルの不一致：" + str(int(results["vectorised"]["label_mismatch"])) + " 文")
+		return results
+
+
+def throughput(count: int, seconds: float) -> Dict[str, float]:
+	return {"articles": float(count), "seconds": seconds, "articles_per_second": count / max(seconds, 0.000001)}
+
+
+def synthetic_articles(count: int, seed: int = 0) -> List[Tuple[List[List[str]], List[List[str]]]]:
+	"""合成の記事（本文の文ごとの形態素，要約の行ごとの形態素）を作ります。要約の行は，本文の文の一部を並べ替えたり語を入れ替えたりして作ります。"""
+	generator: random.Random = random.Random(seed)
+	# 出現頻度に偏りのある（ジップの法則に近い）語彙
+	vocabulary: List[str] = list(map(lambda i: "語" + str(i), range(20000)))
+	weights: List[float] = list(map(lambda i: 1.0 / (i + 1), range(len(vocabulary))))
+	articles: List[Tuple[List[List[str]], List[List[str]]]] = list( )
+	for _ in range(count):
+		sentences: List[List[str]] = list(map(lambda _: generator.choices(vocabulary, weights, k = generator.randint(5, 60)), range(generator.randint(5, 40))))
+		lines: List[List[str]] = list(map(lambda sentence: mutate(sentence, vocabulary, generator), generator.sample(sentences, min(SUMMARY_LINES, len(sentences)))))
+		articles.append((sentences, lines))
+	return articles
+
+
+def mutate(sentence: Sequence[str], vocabulary: Sequence[str], generator: random.Random) -> List[str]:
+	"""文の一部を切り出し，語を入れ替えて要約の行にします。"""
+	start: int = generator.randrange(len(sentence))
+	line: List[str] = list(sentence[start: start + generator.randint(5, 30)])
+	return list(map(lambda token: token if generator.random( ) < 0.7 else generator.choice(vocabulary), line))
+
+
+def naive_score_article(article: Tuple[Sequence[Sequence[str]], Sequence[Sequence[str]]]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""文と要約の行の組ごとにPythonのループでROUGE-1 / 2 / LのF値とラベルを計算します（比較用）。"""
+	lines: List[List[str]] = pad_lines(article[1])
+	scores: numpy.ndarray = numpy.array(list(map(lambda sentence: list(map(lambda line: [naive_rouge_n(sentence, line, 1), naive_rouge_n(sentence, line, 2), naive_f_measure(naive_lcs(sentence, line), len(sentence), len(line))], lines)), article[0])), dtype = numpy.float32).reshape(-1, SUMMARY_LINES, 3)
+	labels: numpy.ndarray = numpy.zeros(len(scores), dtype = numpy.uint8)
+	means: numpy.ndarray = scores.mean(axis = 2)
+	for line in range(SUMMARY_LINES):
+		if 0 < len(means) and 0 < means[:, line].max( ):
+			labels[int(numpy.argmax(means[:, line]))] |= numpy.uint8(1 << line)
+	return scores, labels
+
+
+def naive_rouge_n(sentence: Sequence[str], line: Sequence[str], n: int) -> float:
+	sentence_grams: Counter = Counter(map(lambda i: tuple(sentence[i: i + n]), range(len(sentence) - n + 1)))
+	line_grams: Counter = Counter(map(lambda i: tuple(line[i: i + n]), range(len(line) - n + 1)))
+	return naive_f_measure(sum((sentence_grams & line_grams).values( )), sum(sentence_grams.values( )), sum(line_grams.values( )))
+
+
+def naive_lcs(sentence: Sequence[str], line: Sequence[str]) -> int:
+	lengths: List[int] = [0] * (len(line) + 1)
+	for token in sentence:
+		previous: int = 0
+		for j, line_token in enumerate(line):
+			current: int = lengths[j + 1]
+			lengths[j + 1] = previous + 1 if token == line_token else max(lengths[j + 1], lengths[j])
+			previous = current
+	return lengths[-1]
+
+
+def naive_f_measure(overlap: int, candidate_total: int, reference_total: int) -> float:
+	precision: float = overlap / candidate_total if 0 < candidate_total else 0.0
+	recall: float = overlap / reference_total if 0 < reference_total else 0.0
+	return 2.0 * precision * recall / (precision + recall) if 0.0 < precision + recall else 0.0
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("RougeOracleBenchmark").logger
+	RougeOracleBenchmark(logger).main( )
@@ -0,0 +1,250 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from logging import Logger, getLogger, CRITICAL
+from itertools import cycle, islice
+from collections import Counter
+import multiprocessing
+import tempfile
+import random
+import time
+import json
+import sys
+
+from my_logger import MyLogger
+from csv_to_json import CsvToJson, peak_rss_mebibytes
+from crawl import Crawler
+from stub_server import StubServer
+from benchmark_extractor import ExtractorBenchmark
+from models.crawl_state import CrawlState
+from models.article_extractor import ArticleExtractor, FastExtractor, FallbackExtractor, ExtractionError
+from models.normaliser_engine import NormaliserEngine
+
+
+# data/train.csvの行数
+TRAIN_CSV_ROWS: int = 213159
+# 既定の許容する悪化の割合（同じマシンでも実行ごとにぶれるため大きめ）
+DEFAULT_TOLERANCE: float = 0.25
+# 値が小さいほど良い指標（「_mebibytes」で終わるものも含む）
+LOWER_IS_BETTER: Tuple[str, ...] = ("crawl_status_mismatch", "extract_fast_mismatch", "extract_fallback_mismatch", "tokenise_surface_mismatch")
+
+
+class BenchmarkSuite:
+	"""ネットワークや元のデータなしで，クロール（スタブサーバーに保存済みの記事ページを返させる），保存済みの記事ページでの高速な抽出器とhtml5libの抽出結果の一致，CSV→JSON変換（data/train.csvと同じ行数の合成CSV），正規化，形態素解析のスループットと最大メモリー使用量を計測し，基準値と比べます。\n
+	最大メモリー使用量をそれぞれ分けて計るため，計測はひとつずつ新しいプロセスで行います。"""
+	
+	def __init__(self, logger: Optional[Logger] = None, baseline_path: Optional[str] = None):
+		"""計測器を生成します。\n
+		:param logger: ロガー
+		:param baseline_path: 基準値のJSON（Noneで「Python-venv/benchmark/baseline.json」）"""
+		self.__logger: Logger = logger if logger is not None else getLogger("benchmark")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__baseline_path: str = baseline_path if baseline_path is not None else str(Path(self.__sources_directory_path).joinpath("../benchmark/baseline.json"))
+	
+	def main(self) -> bool:
+		articles: str = input("クロールする記事数は？（空欄で600）：")
+		latency: str = input("スタブサーバーの応答までの待ち秒数は？（空欄で0.02）：")
+		csv_rows: str = input("合成CSVの行数は？（空欄で" + str(TRAIN_CSV_ROWS) + "＝data/train.csvと同じ）：")
+		update: str = input("今回の結果で基準値を更新する？（y / 空欄で更新しない）：")
+		results: Dict[str, float] = self.run(int(articles) if articles != "" else 600, float(latency) if latency != "" else 0.02, int(csv_rows) if csv_rows != "" else TRAIN_CSV_ROWS)
+		if update == "y":
+			self.save_baseline(results)
+			return True
+		return len(self.compare(results)) < 1
+	
+	def run(self, articles: int = 600, latency: float = 0.02, csv_rows: int = TRAIN_CSV_ROWS, concurrency: int = 8, texts: int = 20000, tokenise_texts: int = 2000) -> Dict[str, float]:
+		"""すべて計測し，結果をログ出力します。\n
+		:param articles: クロールする記事数
+		:param latency: スタブサーバーの応答までの待ち秒数
+		:param csv_rows: 合成CSVの行数
+		:param concurrency: クロールの同時接続数
+		:param texts: 正規化する文字列の数
+		:param tokenise_texts: 形態素解析する文字列の数
+		:return: 指標名→値（形態素解析できない環境では，形態素解析の指標を含みません）"""
+		benchmarks: Tuple[Tuple[str, Callable, tuple], ...] = (
+			("クロール", measure_crawl, (articles, latency, concurrency)),
+			("抽出", measure_extract, ( )),
+			("CSV→JSON", measure_csv_to_json, (csv_rows, )),
+			("正規化", measure_normalise, (texts, )),
+			("形態素解析", measure_tokenise, (tokenise_texts, )),
+			("表層形の区切り", measure_surface_tokens, (tokenise_texts, ))
+		)
+		results: Dict[str, float] = dict( )
+		for name, function, arguments in benchmarks:
+			# 前の計測の最大メモリー使用量が残らないよう，毎回新しいプロセスで計測する（このプロセスでは計測しないため，大きくならない）
+			with ProcessPoolExecutor(max_workers = 1) as executor:
+				metrics: Dict[str, float] = executor.submit(function, *arguments).result( )
+			if len(metrics) < 1:
+				self.__logger.warning(name + "：計測できませんでした（必要なライブラリーやモデルがありません）。")
+				continue
+			self.__logger.info(name + "：" + "，".join(map(lambda item: item[0] + " " + str(round(item[1], 3)), metrics.items( ))))
+			results.update(metrics)
+		return results
+	
+	def load_baseline(self) -> Dict[str, dict]:
+		"""基準値を読み込みます（なければ空）。\n
+		:return: { 'tolerance'（既定の許容する悪化の割合）, 'metrics'（指標名→{ 'value', 'higher_is_better', 'tolerance'（省略可） }） }"""
+		if not Path(self.__baseline_path).exists( ):
+			return dict( )
+		with open(self.__baseline_path, mode = "r", encoding = "utf-8") as baseline_file:
+			return json.load(baseline_file)
+	
+	def save_baseline(self, results: Dict[str, float]):
+		"""今回の結果を基準値として保存します（指標ごとの許容する割合は，すでにあれば引き継ぎます）。"""
+		baseline: Dict[str, dict] = self.load_baseline( )
+		metrics: Dict[str, dict] = baseline.get("metrics", dict( ))
+		for name, value in results.items( ):
+			metrics[name] = dict(metrics.get(name, dict( )), value = value, higher_is_better = name not in LOWER_IS_BETTER and not name.endswith("_mebibytes"))
+		with open(self.__baseline_path, mode = "w", encoding = "utf-8") as baseline_file:
+			json.dump({"tolerance": baseline.get("tolerance", DEFAULT_TOLERANCE), "metrics": metrics}, baseline_file, ensure_ascii = False, indent = "\t")
+			baseline_file.write("\n")
+		self.__logger.info(self.__baseline_path + " に基準値を保存しました。")
+	
+	def compare(self, results: Dict[str, float]) -> List[str]:
+		"""基準値と比べ，許容する割合を超えて悪化した指標をログ出力します。\n
+		:param results: runの結果
+		:return: 悪化した指標名のリスト"""
+		baseline: Dict[str, dict] = self.load_baseline( )
+		if len(baseline) < 1:
+			self.__logger.warning(self.__baseline_path + " がないため，基準値と比べられません。")
+			return list( )
+		regressions: List[str] = list( )
+		for name, expected in baseline.get("metrics", dict( )).items( ):
+			if name not in results:
+				self.__logger.warning(name + "：今回は計測していません。")
+				continue
+			tolerance: float = expected.get("tolerance", baseline.get("tolerance", DEFAULT_TOLERANCE))
+			value: float = results[name]
+			# 悪化した割合（正なら悪化）
+			change: float = (expected["value"] - value if expected.get("higher_is_better", True) else value - expected["value"]) / max(abs(expected["value"]), 0.000001)
+			# 不一致の件数など，基準値が0の指標は1件でも増えれば悪化とする
+			is_regression: bool = tolerance < change if expected["value"] != 0 else 0 < change
+			message: str = name + "：" + str(round(value, 3)) + "（基準値 " + str(round(expected["value"], 3)) + "，" + ("悪化" if 0 < change else "改善") + " " + str(round(abs(change) * 100.0, 1)) + " ％，許容 " + str(round(tolerance * 100.0, 1)) + " ％）"
+			if is_regression:
+				regressions.append(name)
+				self.__logger.error("【悪化】" + message)
+			else:
+				self.__logger.info(message)
+		self.__logger.info("基準値を超えて悪化した指標：" + str(len(regressions)) + " 個")
+		return regressions
+
+
+def quiet_logger( ) -> Logger:
+	"""計測中の，削除済みの記事などのログを出力しないロガーです。"""
+	logger: Logger = getLogger("BenchmarkSuite.quiet")
+	logger.setLevel(CRITICAL)
+	logger.propagate = False
+	# 解析プロセスのクローラーは「crawl」のロガーに出力する
+	getLogger("crawl").setLevel(CRITICAL)
+	return logger
+
+
+def measure_crawl(articles: int, latency: float, concurrency: int) -> Dict[str, float]:
+	"""一時ディレクトリーで，スタブサーバーからクロールします（計測用のプロセスから呼ぶため関数にしています）。\n
+	:return: { 'crawl_articles_per_second', 'crawl_status_mismatch'（manifest.jsonと違うクロール状態になった記事数）, 'crawl_peak_rss_mebibytes' }"""
+	with tempfile.TemporaryDirectory( ) as directory_path, StubServer(latency = latency) as stub_server:
+		# 各ページを同じ回数ずつクロールするよう，記事IDをページ数で割った余りが順に回るようにする
+		ids: List[int] = list(map(lambda i: 10000000 + i, range(articles)))
+		with open(directory_path + "/benchmark.jsonl", mode = "w", encoding = "utf-8") as json_file:
+			json_file.write("".join(map(lambda id: json.dumps({"year": 2016, "month": 1, "category": 1, "id": id, "is_series": None}) + "\n", ids)))
+		Path(directory_path).joinpath("benchmark").mkdir( )
+		crawler: Crawler = Crawler(quiet_logger( ), concurrency = concurrency, requests_per_second = 1000000.0, burst = float(concurrency), base_url = stub_server.base_url, progress_interval = 3600.0, metrics_format = "none", data_directory_path = directory_path)
+		start_time: float = time.perf_counter( )
+		crawler.crawl("benchmark")
+		seconds: float = max(time.perf_counter( ) - start_time, 0.000001)
+		expected: Dict[str, str] = stub_server.expected_statuses( )
+		expected_counts: Counter = Counter(map(lambda id: expected.get(stub_server.name_of(id)), ids))
+		with CrawlState(directory_path + "/benchmark.sqlite3") as crawl_state:
+			counts: Dict[str, int] = crawl_state.counts( )
+		mismatch: int = sum(map(lambda status: abs(counts.get(status, 0) - expected_counts.get(status, 0)), set(counts).union(expected_counts)))
+	return {"crawl_articles_per_second": articles / seconds, "crawl_status_mismatch": float(mismatch), "crawl_peak_rss_mebibytes": peak_rss_mebibytes( )}
+
+
+def measure_extract( ) -> Dict[str, float]:
+	"""保存済みの記事ページを各抽出器で抽出し，html5libと抽出結果（削除済み・解析エラーの別を含む）が違ったページ数を数えます（計測用のプロセスから呼ぶため関数にしています）。\n
+	FallbackExtractorは正しそうな結果なら高速な抽出器の結果をそのまま使うため，高速な抽出器単独の一致も確かめます。基準値が0のため，1ページでも違えば悪化になります。\n
+	:return: { 'extract_fast_mismatch', 'extract_fallback_mismatch' }"""
+	benchmark: ExtractorBenchmark = ExtractorBenchmark(quiet_logger( ))
+	results: Dict[str, Dict[str, float]] = benchmark.run(benchmark.load_pages(str(Path(__file__).parent.joinpath("../benchmark/pages"))))
+	return {"extract_fast_mismatch": results[FastExtractor.name]["mismatch"], "extract_fallback_mismatch": results[FallbackExtractor.name]["mismatch"]}
+
+
+def write_synthetic_csv(path: str, rows: int, seed: int = 0):
+	"""data/train.csvと同じ形式（公開年の下2桁，月，カテゴリー，記事ID）の合成CSVを書き出します。記事IDの末尾に「.」などが付いた行も同じくらいの割合で含めます。"""
+	generator: random.Random = random.Random(seed)
+	categories: List[int] = list(map(lambda _: generator.randint(1, 900), range(74)))
+	with open(path, mode = "w") as csv_file:
+		for _ in range(rows):
+			suffix: str = generator.choice((".", "j", "s", ".j")) if generator.random( ) < 0.01 else ""
+			csv_file.write(str(generator.randint(13, 16)) + "," + str(generator.randint(1, 12)) + "," + str(generator.choice(categories)) + "," + str(generator.randint(10000000, 11999999)) + suffix + "\n")
+
+
+def measure_csv_to_json(rows: int) -> Dict[str, float]:
+	"""一時ディレクトリーで，合成CSVをJSONに変換します（計測用のプロセスから呼ぶため関数にしています）。\n
+	:return: { 'csv_to_json_rows_per_second', 'csv_to_json_peak_rss_mebibytes' }"""
+	with tempfile.TemporaryDirectory( ) as directory_path:
+		write_synthetic_csv(directory_path + "/train.csv", rows)
+		converter: CsvToJson = CsvToJson(quiet_logger( ), csv_directory_path = directory_path, output_directory_path = directory_path)
+		start_time: float = time.perf_counter( )
+		with ProcessPoolExecutor(max_workers = max(multiprocessing.cpu_count( ) - 1, 1)) as executor:
+			count: int = converter.csv_to_json("train", executor)
+		seconds: float = max(time.perf_counter( ) - start_time, 0.000001)
+	return {"csv_to_json_rows_per_second": count / seconds, "csv_to_json_peak_rss_mebibytes": peak_rss_mebibytes( )}
+
+
+def fixture_texts(count: int) -> List[str]:
+	"""保存済みの記事ページから抽出したタイトル・要約・本文を，count個になるまで繰り返して返します。"""
+	extractor: ArticleExtractor = FastExtractor( )
+	texts: List[str] = list( )
+	for path in sorted(Path(__file__).parent.joinpath("../benchmark/pages").glob("*.html")):
+		try:
+			article: Dict[str, str] = extractor.extract(path.read_text(encoding = "utf-8"))
+		except ExtractionError:
+			continue
+		texts.extend(filter(lambda text: text != "", (article.get("title"), article.get("summary"), article.get("content"))))
+	return list(islice(cycle(texts), count)) if 0 < len(texts) else list( )
+
+
+def measure_normalise(count: int) -> Dict[str, float]:
+	"""保存済みの記事ページの文字列を正規化します（計測用のプロセスから呼ぶため関数にしています）。\n
+	:return: { 'normalise_characters_per_second', 'normalise_texts_per_second', 'normalise_peak_rss_mebibytes' }"""
+	texts: List[str] = fixture_texts(count)
+	engine: NormaliserEngine = NormaliserEngine( )
+	start_time: float = time.perf_counter( )
+	tuple(map(engine.normalise, texts))
+	seconds: float = max(time.perf_counter( ) - start_time, 0.000001)
+	return {"normalise_characters_per_second": sum(map(len, texts)) / seconds, "normalise_texts_per_second": len(texts) / seconds, "normalise_peak_rss_mebibytes": peak_rss_mebibytes( )}
+
+
+def measure_tokenise(count: int) -> Dict[str, float]:
+	"""保存済みの記事ページの文字列を正規化してから，キャッシュなしで形態素解析します（計測用のプロセスから呼ぶため関数にしています）。\n
+	:return: { 'tokenise_texts_per_second', 'tokenise_peak_rss_mebibytes' }，spaCyやGiNZAがなければ空"""
+	try:
+		from models.string_normaliser import StringNormaliser
+		normaliser: StringNormaliser = StringNormaliser(use_token_cache = False, use_server = False)
+	except (ImportError, OSError):
+		return dict( )
+	texts: List[str] = list(map(normaliser.normalise, fixture_texts(count)))
+	start_time: float = time.perf_counter( )
+	tuple(normaliser.analyse_many(texts, with_stop_words = True))
+	seconds: float = max(time.perf_counter( ) - start_time, 0.000001)
+	return {"tokenise_texts_per_second": len(texts) / seconds, "tokenise_peak_rss_mebibytes": peak_rss_mebibytes( )}
+
+
+def measure_surface_tokens(count: int) -> Dict[str, float]:
+	"""保存済みの記事ページの文字列を正規化し，表層形だけの解析（固有表現抽出を無効にする）と，すべての部品を使った解析の形態素の区切りが違った文字列の数を数えます（計測用のプロセスから呼ぶため関数にしています）。\n
+	:return: { 'tokenise_surface_mismatch' }，spaCyやGiNZAがなければ空"""
+	try:
+		from models.ginza_tokeniser import GinzaTokeniser
+		tokeniser: GinzaTokeniser = GinzaTokeniser( )
+	except (ImportError, OSError):
+		return dict( )
+	engine: NormaliserEngine = NormaliserEngine( )
+	# 同じ文字列を繰り返しても区切りは変わらないため，重複を除く
+	texts: List[str] = sorted(set(map(engine.normalise, fixture_texts(count))))
+	return {"tokenise_surface_mismatch": float(len(tokeniser.surface_mismatches(texts)))}
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("BenchmarkSuite").logger
+	sys.exit(0 if BenchmarkSuite(logger).main( ) else 1)
@@ -0,0 +1,74 @@
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from itertools import chain
+from pathlib import Path
+from logging import Logger, getLogger
+import time
+
+from my_logger import MyLogger
+from models.jsonl_shard import read_crawled_records
+from models.vocabulary import Vocabulary
+from models.token_corpus import TokenCorpusWriter
+
+
+class CorpusBuilder:
+	"""前処理した記事（dataset/learn/（分割））から語彙を作り，形態素IDのコーパス（メモリーマップして読む形式）に変換します。"""
+	
+	def __init__(self, logger: Optional[Logger] = None, min_count: int = 5, max_size: Optional[int] = None):
+		"""変換器を生成します。\n
+		:param logger: ロガー
+		:param min_count: 語彙に含める最小の出現回数
+		:param max_size: 語彙の最大の大きさ（Noneで上限なし）"""
+		self.__logger: Logger = logger if logger is not None else getLogger("CorpusBuilder")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__learn_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/learn"))
+		self.__min_count: int = min_count
+		self.__max_size: Optional[int] = max_size
+	
+	def main(self):
+		min_count: str = input("語彙に含める最小の出現回数は？（空欄で5）：")
+		max_size: str = input("語彙の最大の大きさは？（空欄で上限なし）：")
+		self.__min_count = int(min_count) if min_count != "" else 5
+		self.__max_size = int(max_size) if max_size != "" else None
+		vocabulary: Vocabulary = self.build_vocabulary("train")
+		counts: Tuple[int, ...] = tuple(map(lambda file_name: self.build_corpus(file_name, vocabulary), ("debug", "develop", "test", "train")))
+		self.__logger.info("すべて変換しました。\ndebug：" + str(counts[0]) + " 個\ndevelop：" + str(counts[1]) + " 個\ntest：" + str(counts[2]) + " 個\ntrain：" + str(counts[3]) + " 個")
+	
+	def build_vocabulary(self, file_name: str = "train") -> Vocabulary:
+		"""分割の形態素を数えて語彙を作り，「dataset/learn/vocabulary.json」に保存します。\n
+		:param file_name: 語彙を作る分割の名前
+		:return: 語彙"""
+		self.__logger.info(file_name + " から語彙を作ります。")
+		records: Iterator[Dict[str, Union[int, Optional[bool], str, list]]] = read_crawled_records(self.__learn_directory_path + "/" + file_name, file_name)
+		vocabulary: Vocabulary = Vocabulary.build(chain.from_iterable(map(article_token_sequences, records)), self.__min_count, self.__max_size)
+		vocabulary.save(self.__learn_directory_path + "/vocabulary.json")
+		self.__logger.info("語彙の大きさ：" + str(len(vocabulary)))
+		return vocabulary
+	
+	def build_corpus(self, file_name: str, vocabulary: Vocabulary) -> int:
+		"""ひとつの分割を形態素IDのコーパスに変換し，「dataset/learn/（分割）/（分割）.tokens.bin」などに書き出します。\n
+		:param file_name: 分割の名前
+		:param vocabulary: 語彙
+		:return: 変換した記事数"""
+		directory_path: str = self.__learn_directory_path + "/" + file_name
+		if not Path(directory_path).joinpath(file_name + ".index.sqlite3").exists( ):
+			self.__logger.error(directory_path + " に前処理した記事がありません。")
+			return 0
+		start_time: float = time.time( )
+		count: int = 0
+		with TokenCorpusWriter(directory_path, file_name) as corpus_writer:
+			for record in read_crawled_records(directory_path, file_name):
+				summary_lines: List[list] = record.get("summary_tokens") or [ ]
+				corpus_writer.write(record.get("id"), vocabulary.encode(record.get("title_tokens") or [ ]), list(map(vocabulary.encode, summary_lines)), vocabulary.encode(record.get("content_tokens") or [ ]))
+				count += 1
+		self.__logger.info(file_name + "：" + str(count) + " 記事を変換しました（" + str(round(time.time( ) - start_time, 2)) + " 秒）。")
+		return count
+
+
+def article_token_sequences(record: Dict[str, Union[int, Optional[bool], str, list]]) -> List[List[str]]:
+	"""前処理した記事の，タイトル・要約の各行・本文の形態素の列を返します。"""
+	return [record.get("title_tokens") or [ ]] + list(record.get("summary_tokens") or [ ]) + [record.get("content_tokens") or [ ]]
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("CorpusBuilder").logger
+	CorpusBuilder(logger).main( )
@@ -1,29 +1,74 @@
-from typing import Tuple, List, Dict, Union, Optional, Iterable, Pattern, Match
+from typing import Tuple, List, Dict, Set, Union, Optional, Iterable, Iterator, Pattern, Match
 from pathlib import Path
-from urllib.request import Request, urlopen
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.pool import Pool
+from functools import lru_cache
 from pprint import pformat
 from traceback import format_exception
-from bs4 import BeautifulSoup, Tag
 from datetime import timedelta
-from logging import Logger, getLogger
+from logging import Logger, getLogger, INFO
 import re
 import json
+import asyncio
+import heapq
 import sys
 import gzip
 import time
+import multiprocessing
 
-from my_logger import MyLogger
-from models.livedoor_news import LivedoorNews
+from my_logger import MyLogger, ProgressThrottle, init_worker_logging, queue_logger_names, worker_log_queue
+from models.livedoor_news import LivedoorNews, LivedoorNewsTable
+from models.token_bucket import HostRateLimiter
+from models.keep_alive_client import KeepAliveClient, HttpResult
+from models.crawl_state import CrawlState
+from models.crawl_metrics import CrawlMetrics
+from models.html_cache import HtmlCache, BLOB_ERRORS, read_blob
+from models.jsonl_shard import JsonlShardWriter
+from models.record_index import RecordRangeReader
+from models.article_extractor import ArticleExtractor, ArticleBodyNotFoundError, create_extractor, is_valid_article
 
 
 class Crawler:
 	"""Livedoorニュースのクローラーです。"""
 	
-	def __init__(self, logger: Optional[Logger] = None):
+	def __init__(self, logger: Optional[Logger] = None, concurrency: int = 1, requests_per_second: float = 0.1, burst: float = 1.0, base_url: str = "https://news.livedoor.com/article/detail/", extractor: str = "fast+html5lib", parse_processes: int = max(multiprocessing.cpu_count( ) - 1, 1), queue_size: int = 64, output: str = "jsonl", compress_output: bool = False, progress_interval: float = 1.0, metrics_format: str = "json", metrics_interval: float = 30.0, data_directory_path: Optional[str] = None, output_directory_path: Optional[str] = None):
+		"""クローラーを生成します。\n
+		:param logger: ロガー
+		:param concurrency: 同時に通信する記事数の上限
+		:param requests_per_second: ホストごとの1秒あたりのリクエスト数の上限（0.1で10秒に1回）
+		:param burst: 連続で送れるリクエスト数の上限（トークンバケットの容量）
+		:param base_url: 記事URLのIDより前の部分（ローカルのスタブサーバーに向けるときに変更）
+		:param extractor: HTMLの抽出器（html5lib / fast / fast+html5lib）
+		:param parse_processes: HTMLを解析するプロセス数
+		:param queue_size: 取得→解析，解析→書き込みの各キューに溜める記事数の上限
+		:param output: 出力形式（jsonl：シャードに追記 / json：1記事1ファイル）
+		:param compress_output: jsonlの場合，シャードをgzip圧縮するか
+		:param progress_interval: 進捗を出力する最短の間隔の秒数（0で1記事ごと）
+		:param metrics_format: 段ごとの処理時間などの集計を書き出す形式（json：「（名前）.metrics.json」 / prometheus：「（名前）.metrics.prom」 / none：書き出さない）
+		:param metrics_interval: 集計を書き出す間隔の秒数
+		:param data_directory_path: 入力のJSONと出力を置くディレクトリー（Noneで「Python-venv/dataset/crawl」）
+		:param output_directory_path: 出力（記事，クロール状態，HTMLのキャッシュ，集計）だけを別に置くディレクトリー（Noneでdata_directory_pathと同じ）"""
 		self.__logger: Logger = logger if logger is not None else getLogger("crawl")
+		self.__concurrency: int = max(concurrency, 1)
+		self.__requests_per_second: float = requests_per_second
+		self.__burst: float = burst
+		self.__base_url: str = base_url
+		self.__extractor: ArticleExtractor = create_extractor(extractor)
+		self.__parse_processes: int = max(parse_processes, 1)
+		self.__queue_size: int = max(queue_size, 1)
+		self.__output: str = output
+		self.__compress_output: bool = compress_output
+		self.__progress_throttle: ProgressThrottle = ProgressThrottle(progress_interval)
+		self.__metrics_format: str = metrics_format
+		self.__metrics_throttle: ProgressThrottle = ProgressThrottle(metrics_interval)
+		self.__metrics: CrawlMetrics = CrawlMetrics( )
 		self.__sources_directory_path: str = str(Path(__file__).parent)
-		self.__json_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+		self.__json_directory_path: str = data_directory_path if data_directory_path is not None else str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+		self.__output_directory_path: str = output_directory_path if output_directory_path is not None else self.__json_directory_path
 		self.__conf_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../conf"))
+		self.__html_cache_directory_path: str = str(Path(self.__output_directory_path).joinpath("html_cache"))
 		# TODO 本当はファイル開けない場合の例外処理も必要（以下すべてのopenにおいて）
 		with open(self.__conf_directory_path + "/User-Agent.txt", mode = "r") as user_agent_conf:
 			self.__user_agent: str = user_agent_conf.read( ).replace("\r\n", "").replace("\n", "")
@@ -34,75 +79,374 @@ class Crawler:
 		self.__critical_count: int = 0
 		self.__start_time: float = 0.0
 		self.__file_name: str = ""
+		self.__crawl_state: Optional[CrawlState] = None
+		self.__html_cache: Optional[HtmlCache] = None
+		self.__shard_writer: Optional[JsonlShardWriter] = None
+		# 解析のプロセスプール（プロセスが異常終了したら作り直すため，引数で渡さずに持つ）
+		self.__process_executor: Optional[ProcessPoolExecutor] = None
+		# 再試行待ちの（再試行時刻，ID，LivedoorNewsインスタンス）のヒープ
+		self.__retry_queue: List[Tuple[float, int, LivedoorNews]] = list( )
+		self.__in_flight: int = 0
 	
 	def main(self):
-		# TODO 以下3行，例外処理していないため，別の入力でエラーが発生する
+		# TODO 以下4行，例外処理していないため，別の入力でエラーが発生する
+		mode: str = input("何をする？（crawl：クロール / reparse：キャッシュ済みのHTMLを再解析，空欄でcrawl）：")
 		file_name: str = input("どれをクロールする？（debug / develop / test / train）：")
 		range_from: int = int(input("開始インデックスは？（0で指定なし）："))
 		range_to: int = int(input("終了インデックスは？（0で指定なし）："))
+		if mode == "reparse":
+			self.__file_name = file_name
+			self.__reparse(file_name, range_from, range_to)
+			return
+		concurrency: str = input("同時接続数は？（空欄で" + str(self.__concurrency) + "）：")
+		requests_per_second: str = input("1秒あたりのリクエスト数は？（空欄で" + str(self.__requests_per_second) + "）：")
+		self.__concurrency = max(int(concurrency), 1) if concurrency != "" else self.__concurrency
+		self.__requests_per_second = float(requests_per_second) if requests_per_second != "" else self.__requests_per_second
+		self.crawl(file_name, range_from, range_to)
+	
+	def crawl(self, file_name: str, range_from: int = 0, range_to: int = 0):
+		"""入力を聞かずにクロールします。\n
+		:param file_name: JSONの表示名
+		:param range_from: 何番目のオブジェクトから取得するか（0で最初から）
+		:param range_to: 何番目までのオブジェクトを取得するか（0で最後まで）"""
 		self.__file_name = file_name
+		Path(self.__output_directory_path).joinpath(file_name).mkdir(parents = True, exist_ok = True)
 		self.__crawl(file_name, range_from, range_to)
 	
+	def count_records(self, file_name: str) -> int:
+		"""JSON（JSONLがあればJSONL）のレコード数を返します（索引がなければ作ります）。\n
+		:param file_name: JSONの表示名"""
+		with RecordRangeReader(self.__data_path(file_name)) as reader:
+			return len(reader)
+	
 	def __crawl(self, file_name: str, range_from: int, range_to: int):
 		"""ひとつのJSONファイルのデータについてクロールを実施します。\n
 		:param file_name: JSONのファイル名"""
 		self.__logger.info(file_name + " の " + str(range_from) + " から " + str(range_to) + " までを取得します。")
-		before_data: Tuple[LivedoorNews, ...] = self.__get_data(file_name, range_from, range_to)
-		self.__length = len(before_data)
-		if self.__length < 1:
+		all_data: Tuple[LivedoorNews, ...] = self.__get_data(file_name, range_from, range_to)
+		if len(all_data) < 1:
 			self.__logger.error("ニュースインスタンスを取得できませんでした。")
 			return
-		self.__logger.info("取得ニュースインスタンス数：" + str(self.__length))
-		self.__start_time = time.time( )
-		tuple(map(self.__crawl_one, before_data))
-		self.__logger.info("【完了】")
-		self.__disp_progress( )
+		with CrawlState(self.__output_directory_path + "/" + file_name + ".sqlite3") as crawl_state, HtmlCache(self.__html_cache_directory_path) as html_cache:
+			self.__open_shard_writer(file_name)
+			# 前回までに取得済み・削除済みなどのIDは飛ばす
+			finished_ids: Set[int] = crawl_state.finished_ids(map(lambda news: news.id, all_data))
+			if self.__shard_writer is not None:
+				# 取得済みでもまとめて書き込む前に止まったものは，取得し直す
+				finished_ids.difference_update(crawl_state.ids_with_status(CrawlState.DONE).difference(self.__shard_writer.ids( )))
+			before_data: Tuple[LivedoorNews, ...] = tuple(filter(lambda news: news.id not in finished_ids, all_data))
+			self.__length = len(before_data)
+			self.__logger.info("取得ニュースインスタンス数：" + str(len(all_data)) + "（うち処理済みのため飛ばす数：" + str(len(finished_ids)) + "）")
+			if self.__length < 1:
+				self.__logger.info("すべて処理済みです。")
+				self.__close_shard_writer( )
+				return
+			self.__logger.info("出力形式：" + self.__output + "，同時接続数：" + str(self.__concurrency) + "，1秒あたりのリクエスト数：" + str(self.__requests_per_second) + "，解析プロセス数：" + str(self.__parse_processes) + "，キューの上限：" + str(self.__queue_size))
+			self.__crawl_state = crawl_state
+			self.__html_cache = html_cache
+			self.__reset_progress( )
+			loop: asyncio.AbstractEventLoop = asyncio.new_event_loop( )
+			try:
+				loop.run_until_complete(self.__crawl_all(before_data))
+			finally:
+				loop.close( )
+				self.__close_shard_writer( )
+				self.__crawl_state = None
+				self.__html_cache = None
+			self.__logger.info("【完了】")
+			self.__disp_progress(True)
+			self.__export_metrics(True)
+			self.__logger.info("クロール状態：" + str(crawl_state.counts( )))
+	
+	def __reparse(self, file_name: str, range_from: int, range_to: int):
+		"""キャッシュ済みのHTMLをプロセスプールで再解析し，JSONとクロール状態を更新します。\n
+		:param file_name: JSONのファイル名"""
+		self.__logger.info(file_name + " の " + str(range_from) + " から " + str(range_to) + " までのキャッシュ済みHTMLを再解析します。")
+		all_data: Tuple[LivedoorNews, ...] = self.__get_data(file_name, range_from, range_to)
+		news_dict: Dict[int, LivedoorNews] = dict(map(lambda news: (news.id, news), all_data))
+		with CrawlState(self.__output_directory_path + "/" + file_name + ".sqlite3") as crawl_state, HtmlCache(self.__html_cache_directory_path) as html_cache:
+			cached_items: List[Tuple[int, str]] = html_cache.items(news_dict.keys( ))
+			self.__length = len(cached_items)
+			self.__logger.info("取得ニュースインスタンス数：" + str(len(all_data)) + "（うちキャッシュ済み：" + str(self.__length) + "）")
+			if self.__length < 1:
+				return
+			self.__reset_progress( )
+			self.__crawl_state = crawl_state
+			self.__open_shard_writer(file_name)
+			try:
+				with Pool(processes = self.__parse_processes, initializer = init_worker_logging, initargs = (worker_log_queue( ), queue_logger_names( ))) as pool:
+					reparse_items: Iterator[Tuple[int, str, str]] = map(lambda item: (item[0], item[1], self.__extractor.name), cached_items)
+					for id, article, seconds in pool.imap_unordered(reparse_one, reparse_items, chunksize = 64):
+						self.__count += 1
+						self.__metrics.observe_many(seconds)
+						self.__write_result(news_dict[id], article, "（再解析）")
+						self.__disp_progress( )
+						self.__export_metrics( )
+			finally:
+				self.__close_shard_writer( )
+				self.__crawl_state = None
+			self.__logger.info("【完了】")
+			self.__disp_progress(True)
+			self.__export_metrics(True)
+			self.__logger.info("クロール状態：" + str(crawl_state.counts( )))
+	
+	def __open_shard_writer(self, file_name: str):
+		"""出力形式がjsonlなら，シャードの書き込み器を開きます。"""
+		if self.__output == "jsonl":
+			self.__shard_writer = JsonlShardWriter(self.__output_directory_path + "/" + file_name, file_name, compress = self.__compress_output)
+	
+	def __close_shard_writer(self):
+		"""シャードの書き込み器を閉じます（溜めている記事も書き込みます）。"""
+		if self.__shard_writer is not None:
+			self.__shard_writer.close( )
+			self.__shard_writer = None
+	
+	def parse(self, html: str, id: int) -> Dict[str, str]:
+		"""HTMLからタイトル，要約，本文を抽出し，結果を確認します。\n
+		:param html: HTML形式の文字列
+		:param id: 記事ID
+		:return: { 'title': '(title)', 'summary': '(summary)', 'content': '(content)' }，エラーの場合{ 'error': '(クロール状態)' }"""
+		return self.__parse_html(html, id)
+	
+	def parse_timed(self, html: str, id: int) -> Tuple[Dict[str, str], Dict[str, float]]:
+		"""parseと同じく抽出・確認し，それぞれにかかった時間も返します（解析は別プロセスのため，集計は呼び出し元で行います）。\n
+		:return: （解析結果，段の名前→秒数）"""
+		seconds: Dict[str, float] = dict( )
+		return self.__parse_html(html, id, seconds), seconds
 	
 	def __get_data(self, file_name: str, range_from: int, range_to: int) -> Tuple[LivedoorNews, ...]:
-		"""入力された情報を基に，JSONからLivedoorNewsインスタンスを生成します。\n
+		"""入力された情報を基に，JSON（JSONLがあればJSONL）の指定した範囲のレコードだけからLivedoorNewsインスタンスを生成します。\n
 		:param file_name: JSONの表示名
 		:param range_from: JSONの何番目のオブジェクトから取得するか（0で最初から）
 		:param range_to: JSONの何番目までのオブジェクトを取得するか（0で最後まで）
 		:return: 生成したLivedoorNewsインスタンスの組"""
-		with open(self.__json_directory_path + "/" + file_name + ".json", mode = "r") as json_file:
-			data_json: List[Dict[str, Union[int, Optional[bool], str]]] = json.load(json_file)
-		all_data: Tuple[LivedoorNews, ...] = tuple(map(lambda dic: LivedoorNews(dic.get("year"), dic.get("month"), dic.get("category"), dic.get("id"), dic.get("is_series")), data_json))
-		if range_to == 0:
-			range_to = len(all_data)
-		return tuple(map(lambda tup: tup[1], filter(lambda tup: range_from <= tup[0] and tup[0] < range_to, enumerate(all_data))))
-	
-	def __crawl_one(self, news: LivedoorNews):
-		"""ひとつのLivedoorNewsインスタンスについて，クロールを実施し，タイトル，要約，記事内容を追加します。\n
+		# 索引でレコードの位置が分かるため，全体をjson.loadせずに範囲の分だけ読み込む
+		with RecordRangeReader(self.__data_path(file_name)) as reader:
+			# 記事ごとのオブジェクトにせず，ひとつの表に詰めて，各インスタンスはその行のビューにする
+			table: LivedoorNewsTable = LivedoorNewsTable.from_records(reader.read(range_from, range_to))
+		return tuple(table)
+	
+	def __data_path(self, file_name: str) -> str:
+		"""入力のJSONL（なければJSON）のパスを返します。"""
+		data_path: str = self.__json_directory_path + "/" + file_name + ".jsonl"
+		return data_path if Path(data_path).exists( ) else self.__json_directory_path + "/" + file_name + ".json"
+	
+	async def __crawl_all(self, before_data: Tuple[LivedoorNews, ...]):
+		"""取得→解析→書き込みの3段のパイプラインで，すべてのLivedoorNewsインスタンスをクロールします。\n
+		取得は同時接続数ぶんのコルーチン（通信はスレッド），解析はプロセスプール，書き込みはひとつのコルーチンで行い，段の間は上限つきのキューでつなぎます。\n
+		:param before_data: 処理するLivedoorNewsインスタンスの組"""
+		news_iterator: Iterator[LivedoorNews] = iter(before_data)
+		rate_limiter: HostRateLimiter = HostRateLimiter(self.__requests_per_second, self.__burst)
+		# キューが埋まると前の段が待つ（バックプレッシャー）ため，メモリー上の記事数は上限を超えない
+		parse_queue: asyncio.Queue = asyncio.Queue(maxsize = self.__queue_size)
+		write_queue: asyncio.Queue = asyncio.Queue(maxsize = self.__queue_size)
+		self.__process_executor = ProcessPoolExecutor(max_workers = self.__parse_processes, initializer = init_worker_logging, initargs = (worker_log_queue( ), queue_logger_names( )))
+		try:
+			with ThreadPoolExecutor(max_workers = self.__concurrency) as executor, KeepAliveClient( ) as client:
+				# 各ワーカーが同じイテレーターから取り出すため，通信中の記事数は同時接続数を超えない
+				fetchers: List[asyncio.Future] = list(map(lambda _: asyncio.ensure_future(self.__fetch_worker(news_iterator, parse_queue, rate_limiter, executor, client)), range(self.__concurrency)))
+				parsers: List[asyncio.Future] = list(map(lambda _: asyncio.ensure_future(self.__parse_worker(parse_queue, write_queue)), range(self.__parse_processes)))
+				writer: asyncio.Future = asyncio.ensure_future(self.__write_worker(write_queue))
+				try:
+					await asyncio.gather(*fetchers)
+					await parse_queue.join( )
+					await write_queue.join( )
+				finally:
+					tuple(map(lambda future: future.cancel( ), parsers + [writer]))
+					await asyncio.gather(*parsers, writer, return_exceptions = True)
+		finally:
+			self.__process_executor.shutdown( )
+			self.__process_executor = None
+	
+	async def __fetch_worker(self, news_iterator: Iterator[LivedoorNews], parse_queue: asyncio.Queue, rate_limiter: HostRateLimiter, executor: ThreadPoolExecutor, client: KeepAliveClient):
+		"""【取得段】イテレーターと再試行キューが尽きるまで，ひとつずつHTMLを取得して解析段に渡します。再試行時刻を過ぎたものを優先します。"""
+		while True:
+			if 0 < len(self.__retry_queue) and self.__retry_queue[0][0] <= time.time( ):
+				retry_news: LivedoorNews = heapq.heappop(self.__retry_queue)[2]
+				self.__logger.debug("再試行：%d", retry_news.id)
+				await self.__fetch_one(retry_news, parse_queue, rate_limiter, executor, client, True)
+				continue
+			news: Optional[LivedoorNews] = next(news_iterator, None)
+			if news is not None:
+				await self.__fetch_one(news, parse_queue, rate_limiter, executor, client)
+				continue
+			# 解析・書き込み中の記事が再試行キューに入る可能性があるため，それも終わるまで待つ
+			if len(self.__retry_queue) < 1 and self.__in_flight < 1:
+				return
+			self.__export_metrics( )
+			wait_seconds: float = self.__retry_queue[0][0] - time.time( ) if 0 < len(self.__retry_queue) else 1.0
+			await asyncio.sleep(min(max(wait_seconds, 0.0), 1.0))
+	
+	async def __fetch_one(self, news: LivedoorNews, parse_queue: asyncio.Queue, rate_limiter: HostRateLimiter, executor: ThreadPoolExecutor, client: KeepAliveClient, is_retry: bool = False):
+		"""ひとつのLivedoorNewsインスタンスについてHTMLを取得し，解析段のキューに入れます。\n
 		:param news: 処理するLivedoorNewsインスタンス
-		:return: 入力と同じインスタンス"""
-		self.__disp_progress( )
-		self.__count += 1
-		html: str = self.__id_to_html(news.id)
-		if html == "":
-			self.__sleep( )
+		:param is_retry: 再試行か（再試行は進捗の件数に数えない）"""
+		if not is_retry:
+			self.__disp_progress( )
+			self.__count += 1
+		# 書き込み段で処理し終わるまで処理中として数える
+		self.__in_flight += 1
+		url: str = self.__base_url + str(news.id) + "/"
+		# 取得済みのHTMLがキャッシュにあれば通信しない
+		start_time: float = time.perf_counter( )
+		try:
+			html: Optional[str] = await asyncio.get_event_loop( ).run_in_executor(executor, self.__html_cache.get, news.id)
+		except BLOB_ERRORS:
+			# 読めないキャッシュは，なかったものとして取得し直す
+			html = None
+			self.__metrics.count_error("html_cache")
+			self.__logger.exception(str(news.id) + " のHTMLをキャッシュから読み込めませんでした。")
+		self.__metrics.observe(CrawlMetrics.CACHE, time.perf_counter( ) - start_time)
+		self.__metrics.count_event("html_cache_hit" if html is not None else "html_cache_miss")
+		if html is None:
+			# 一律におやすみする代わりに，トークンバケットでリクエスト間隔を空ける
+			start_time = time.perf_counter( )
+			await rate_limiter.acquire(urlsplit(url).netloc)
+			self.__metrics.observe(CrawlMetrics.RATE_LIMIT, time.perf_counter( ) - start_time)
+			html, error = await self.__id_to_html(news.id, url, executor, client)
+			if error == CrawlState.ERROR:
+				self.__retry_later(news, "通信エラー")
+				self.__in_flight -= 1
+				return
+			if error != "":
+				self.__crawl_state.mark(news.id, error, "HTTPエラー")
+				self.__in_flight -= 1
+				return
+			try:
+				await asyncio.get_event_loop( ).run_in_executor(executor, self.__html_cache.put, news.id, html)
+			except Exception:
+				self.__metrics.count_error("html_cache")
+				self.__logger.exception(str(news.id) + " のHTMLをキャッシュに保存できませんでした。")
+		await parse_queue.put((news, html))
+	
+	async def __parse_worker(self, parse_queue: asyncio.Queue, write_queue: asyncio.Queue):
+		"""【解析段】HTMLを別プロセスで解析し，書き込み段に渡します。\n
+		抽出のエラーは解析プロセスの中でクロール状態（DELETED / INVALID）になります。ここで起きるのはプロセスプールのエラー（メモリー不足で解析プロセスが落ちたなど）で，記事によらないため，書き込み段でERRORとして再試行します。"""
+		while True:
+			news, html = await parse_queue.get( )
+			start_time: float = time.perf_counter( )
+			process_executor: ProcessPoolExecutor = self.__process_executor
+			try:
+				article, seconds = await asyncio.get_event_loop( ).run_in_executor(process_executor, parse_one, (news.id, html, self.__extractor.name))
+				self.__metrics.observe_many(seconds)
+			except BrokenProcessPool as exception:
+				self.__metrics.count_error("parse_pool")
+				self.__logger.exception(str(news.id) + " を解析中に解析プロセスが異常終了しました。")
+				self.__restart_process_executor(process_executor)
+				article = {"error": CrawlState.ERROR}
+			except Exception as exception:
+				self.__metrics.count_error("parse_pool")
+				self.__logger.exception(str(news.id) + " を解析プロセスに渡せませんでした。")
+				article = {"error": CrawlState.ERROR}
+			# プロセス間の受け渡しを含めた時間
+			self.__metrics.observe(CrawlMetrics.PARSE, time.perf_counter( ) - start_time)
+			await write_queue.put((news, article))
+			parse_queue.task_done( )
+	
+	def __restart_process_executor(self, broken_executor: ProcessPoolExecutor):
+		"""壊れたプロセスプールを作り直します（壊れたプールは以後の解析をすべて拒否するため）。複数の解析段が同じプールの故障に気付くため，まだ作り直していない場合だけ作り直します。"""
+		if self.__process_executor is not broken_executor:
 			return
-		article: Dict[str, str] = self.__parse_html(html, news.id)
+		self.__logger.warning("解析のプロセスプールを作り直します。")
+		self.__metrics.count_event("parse_pool_restart")
+		self.__process_executor = ProcessPoolExecutor(max_workers = self.__parse_processes, initializer = init_worker_logging, initargs = (worker_log_queue( ), queue_logger_names( )))
+		broken_executor.shutdown(wait = False)
+	
+	async def __write_worker(self, write_queue: asyncio.Queue):
+		"""【書き込み段】解析結果をJSONに書き込み，クロール状態に記録します。ひとつだけ動かします。\n
+		このコルーチンが止まるとキューが詰まって全体が止まるため，記録できなかった記事はログ出力して次に進みます（クロール状態が処理済みにならないため，再実行時に取得し直します）。"""
+		while True:
+			news, article = await write_queue.get( )
+			try:
+				self.__write_result(news, article)
+			except Exception as exception:
+				self.__error_count += 1
+				self.__critical_count += 1
+				self.__metrics.count_error("write")
+				self.__logger.exception("【重大】" + str(news.id) + " の解析結果を記録できませんでした。")
+			finally:
+				self.__in_flight -= 1
+				write_queue.task_done( )
+			self.__export_metrics( )
+	
+	def __write_result(self, news: LivedoorNews, article: Dict[str, str], message_suffix: str = ""):
+		"""解析結果をJSONに書き込み，クロール状態に記録します（解析は別プロセスのため，エラー数もここで数えます）。\n
+		:param news: 処理したLivedoorNewsインスタンス
+		:param article: 解析結果
+		:param message_suffix: クロール状態に記録するメッセージの末尾"""
 		if article.get("error") is not None:
-			self.__sleep( )
+			self.__error_count += 1
+			self.__delete_count += 1 if article.get("error") == CrawlState.DELETED else 0
+			self.__metrics.count_error(article.get("error"))
+			if article.get("error") == CrawlState.ERROR:
+				self.__retry_later(news, "一時的な解析エラー" + message_suffix)
+				return
+			self.__crawl_state.mark(news.id, article.get("error"), "HTML解析エラー" + message_suffix)
+			return
+		start_time: float = time.perf_counter( )
+		is_written: bool = self.__update_json(news, article)
+		self.__metrics.observe(CrawlMetrics.WRITE, time.perf_counter( ) - start_time)
+		if not is_written:
+			self.__metrics.count_error("write")
+			self.__retry_later(news, "JSON書き込みエラー" + message_suffix)
 			return
-		self.__update_json(news, article)
-		self.__sleep( )
-		return
+		start_time = time.perf_counter( )
+		self.__crawl_state.mark(news.id, CrawlState.DONE)
+		self.__metrics.observe(CrawlMetrics.STATE, time.perf_counter( ) - start_time)
 	
-	def __disp_progress(self):
-		"""進捗をログ出力します。"""
+	def __retry_later(self, news: LivedoorNews, message: str):
+		"""一時的なエラーを記録し，バックオフ後に再試行するよう再試行キューに入れます。"""
+		wait_seconds: Optional[float] = self.__crawl_state.mark_error(news.id, message)
+		self.__metrics.count_event("retry_scheduled" if wait_seconds is not None else "retry_exhausted")
+		if wait_seconds is None:
+			self.__logger.error(str(news.id) + " は再試行の上限（" + str(self.__crawl_state.max_attempts) + "回）に達しました。")
+			return
+		self.__logger.debug("%d を %s 秒後に再試行します。", news.id, wait_seconds)
+		heapq.heappush(self.__retry_queue, (time.time( ) + wait_seconds, news.id, news))
+	
+	def __reset_progress(self):
+		"""進捗の件数と集計を0に戻します（同じインスタンスで範囲を変えて何度もクロールするため）。"""
+		self.__count = 0
+		self.__error_count = 0
+		self.__delete_count = 0
+		self.__critical_count = 0
+		self.__start_time = time.time( )
+		self.__metrics = CrawlMetrics( )
+	
+	def __disp_progress(self, force: bool = False):
+		"""進捗をログ出力します（前回からprogress_intervalの秒数が経っていなければ，メッセージを組み立てずに何もしません）。\n
+		:param force: 間隔に関係なく出力するか（完了時）"""
+		if not self.__progress_throttle.ready(force) or not self.__logger.isEnabledFor(INFO):
+			return
 		now_time: float = time.time( )
-		self.__logger.info("\n−−−−−−−−−−−−−−−−−−−−\n進捗：" + str(self.__count) + " / " + str(self.__length) + "（" + str(round(float(self.__count) / float(self.__length) * 100.0, 2)) + " ％），エラー数：" + str(self.__error_count) + "回（" +str(round(float(self.__error_count) / (float(self.__count) + 0.00001) * 100.0, 2)) + " ％），重大エラー数：" + str(self.__critical_count) + "回（" +str(round(float(self.__critical_count) / (float(self.__count) + 0.00001) * 100.0, 2)) + " ％）\n削除済み数：" + str(self.__delete_count) + "件（" +str(round(float(self.__delete_count) / (float(self.__count) + 0.00001) * 100.0, 2)) + " ％）\n経過時間：" + str(timedelta(seconds = (now_time - self.__start_time))) + "，推定残り時間：" + str(timedelta(seconds = (now_time - self.__start_time) * (float(self.__length) / (float(self.__count) + 0.00001)) - (now_time - self.__start_time))))
+		count: float = float(self.__count) + 0.00001
+		elapsed_seconds: float = now_time - self.__start_time
+		self.__logger.info("\n−−−−−−−−−−−−−−−−−−−−\n進捗：%d / %d（%s ％），エラー数：%d回（%s ％），重大エラー数：%d回（%s ％）\n削除済み数：%d件（%s ％）\n経過時間：%s，推定残り時間：%s", self.__count, self.__length, round(float(self.__count) / float(self.__length) * 100.0, 2), self.__error_count, round(float(self.__error_count) / count * 100.0, 2), self.__critical_count, round(float(self.__critical_count) / count * 100.0, 2), self.__delete_count, round(float(self.__delete_count) / count * 100.0, 2), timedelta(seconds = elapsed_seconds), timedelta(seconds = elapsed_seconds * (float(self.__length) / count) - elapsed_seconds))
 	
-	def __sleep(self):
-		"""クロール間隔を空けるため，いったん10秒おやすみします。"""
-		self.__logger.debug("いったん おやすみ 🌙 💤")
-		time.sleep(10.0)
+	def __export_metrics(self, force: bool = False):
+		"""段ごとの処理時間などの集計を，metrics_intervalの秒数ごとに「（名前）.metrics.json」（または「.metrics.prom」）に書き出します。\n
+		:param force: 間隔に関係なく書き出すか（完了時）"""
+		if self.__metrics_format == "none" or not self.__metrics_throttle.ready(force):
+			return
+		metrics_path: str = self.__output_directory_path + "/" + self.__file_name + (".metrics.prom" if self.__metrics_format == "prometheus" else ".metrics.json")
+		gauges: Dict[str, float] = {
+			"articles_processed": self.__count,
+			"articles_total": self.__length,
+			"error_count": self.__error_count,
+			"delete_count": self.__delete_count,
+			"critical_count": self.__critical_count,
+			"in_flight": self.__in_flight,
+			"retry_queue_length": len(self.__retry_queue)
+		}
+		try:
+			self.__metrics.export(metrics_path, gauges)
+		except Exception as exception:
+			self.__logger.exception(metrics_path + " に集計を書き出せませんでした。")
 	
-	def __id_to_html(self, id: int) -> str:
-		"""idからHTMLを取得します。"""
-		url: str = "https://news.livedoor.com/article/detail/" + str(id) + "/"
-		self.__logger.debug("ID→HTML：" + url)
+	async def __id_to_html(self, id: int, url: str, executor: ThreadPoolExecutor, client: KeepAliveClient) -> Tuple[str, str]:
+		"""idからHTMLを取得します。通信はスレッドで行い，接続はスレッドごとに使い回します。\n
+		:return: （HTML，エラーの場合のクロール状態（一時的なエラーはERROR，それ以外のHTTPエラーはINVALID，成功時は空文字列））"""
+		self.__logger.debug("ID→HTML：%s", url)
 		headers: Dict[str, str] = {
 			"User-Agent": self.__user_agent,
 			"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -114,91 +458,132 @@ class Crawler:
 			"Pragma": "no-cache",
 			"Cache-Control": "no-cache"
 		}
-		http_request: Request = Request(url, headers = headers)
 		try:
-			with urlopen(http_request) as http_response:
-				response_headers: Dict[str, str] = http_response.info( )
-				comp_type: str = response_headers["Content-Encoding"] if "Content-Encoding" in response_headers else "gzip"
-				content_type: str = response_headers["Content-Type"] if "Content-Type" in response_headers else "text/html; charset=utf-8"
-				encoding = content_type[content_type.find("charset=") + 8: ]
-				response_byte: bytes = http_response.read( )
-				if comp_type == "gzip":
-					response_byte = gzip.decompress(response_byte)
-				return response_byte.decode(encoding = encoding, errors = "ignore")
+			start_time: float = time.perf_counter( )
+			http_response: HttpResult = await asyncio.get_event_loop( ).run_in_executor(executor, client.get, url, headers)
+			self.__metrics.observe(CrawlMetrics.NETWORK, time.perf_counter( ) - start_time)
+			self.__metrics.count_status(http_response.status)
+			self.__metrics.add_bytes(CrawlMetrics.RECEIVED, len(http_response.body))
+			if not (200 <= http_response.status < 300):
+				self.__logger.error(str(id) + " のHTTPステータスコードが " + str(http_response.status) + " でした。")
+				self.__error_count += 1
+				self.__metrics.count_error("http_status")
+				# 429（リクエスト過多）と500番台は時間を置けば取得できる可能性がある
+				return "", CrawlState.ERROR if http_response.status == 429 or 500 <= http_response.status else CrawlState.INVALID
+			return self.__decode_response(http_response), ""
 		except Exception as exception:
 			self.__logger.exception(str(id) + " をクロール中にエラーが発生しました。")
 			self.__error_count += 1
-			return ""
+			self.__metrics.count_error("network")
+			return "", CrawlState.ERROR
+	
+	def __decode_response(self, http_response: HttpResult) -> str:
+		"""レスポンスの本文を展開し，文字列にします。"""
+		comp_type: str = http_response.headers.get("Content-Encoding", "gzip")
+		content_type: str = http_response.headers.get("Content-Type", "text/html; charset=utf-8")
+		encoding: str = content_type[content_type.find("charset=") + 8: ] if "charset=" in content_type else "utf-8"
+		start_time: float = time.perf_counter( )
+		response_byte: bytes = http_response.body
+		if comp_type == "gzip":
+			response_byte = gzip.decompress(response_byte)
+		html: str = response_byte.decode(encoding = encoding, errors = "ignore")
+		self.__metrics.observe(CrawlMetrics.DECOMPRESS, time.perf_counter( ) - start_time)
+		self.__metrics.add_bytes(CrawlMetrics.DECOMPRESSED, len(response_byte))
+		return html
 	
-	def __parse_html(self, html: str, id: int) -> Dict[str, str]:
+	def __parse_html(self, html: str, id: int, seconds: Optional[Dict[str, float]] = None) -> Dict[str, str]:
 		"""HTMLからタイトル，要約，本文を抽出します。\n
 		:param html: HTML形式の文字列
 		:param id: 記事ID
-		:return: { 'title': '(title)', 'summary': '(summary)', 'content': '(content)' }，エラーの場合{ 'error': '(error)' }"""
-		self.__logger.debug("HTML解析")
-		beautiful_soup: BeautifulSoup = BeautifulSoup(markup = html, features = "html5lib")
+		:param seconds: 与えると，抽出と確認にかかった秒数を（段の名前→秒数で）書き込みます
+		:return: { 'title': '(title)', 'summary': '(summary)', 'content': '(content)' }，エラーの場合{ 'error': '(クロール状態)' }"""
+		self.__logger.debug("HTML解析（%s）", self.__extractor.name)
+		start_time: float = time.perf_counter( )
 		try:
-			# 「。」区切りでひとまとまりになっているためmetaタグから要約を取得
-			meta_discription: Tag = beautiful_soup.find(name = "meta", attrs = {"name": "description"})
-			summary: str = meta_discription.get("content") + "。"
-			# 付加情報が付いていないためmetaタグからタイトルを取得
-			meta_ob_title: Tag = beautiful_soup.find(name = "meta", attrs = {"property": "ob:title"})
-			title: str = meta_ob_title.get("content")
-		except Exception as exception:
-			self.__logger.exception(str(id) + " を解析中にエラーが発生しました。")
-			self.__error_count += 1
-			return {"error": "error"}
-		try:
-			# 本文を取得（サイトの本文前後のタグに間違いがあるため正しく取れる保証はない）
-			span_article: Tag = beautiful_soup.find(name = "div", attrs = {"class": "articleBody"}).find(name = "span", attrs = {"itemprop": "articleBody"})
-			tuple(map(lambda script: script.decompose( ), span_article.find_all(name = "script")))
-			content: str = span_article.get_text(separator = "", strip = True).replace("\r\n", "").replace("\n", "")
-		except Exception as exception:
+			article: Dict[str, str] = self.__extractor.extract(html)
+		except ArticleBodyNotFoundError as exception:
 			self.__logger.error("【削除】" + str(id) + " はすでに削除されています。")
 			self.__error_count += 1
 			self.__delete_count += 1
-			return {"error": "error"}
-		return self.__check_html(title, summary, content)
+			return {"error": CrawlState.DELETED}
+		except Exception as exception:
+			self.__logger.exception(str(id) + " を解析中にエラーが発生しました。")
+			self.__error_count += 1
+			return {"error": CrawlState.INVALID}
+		finally:
+			if seconds is not None:
+				seconds[CrawlMetrics.EXTRACT] = time.perf_counter( ) - start_time
+		start_time = time.perf_counter( )
+		checked: Dict[str, str] = self.__check_html(article.get("title"), article.get("summary"), article.get("content"))
+		if seconds is not None:
+			seconds[CrawlMetrics.VALIDATE] = time.perf_counter( ) - start_time
+		return checked
 	
 	def __check_html(self, title: str, summary: str, content: str) -> Dict[str, str]:
 		"""HTML解析結果が正しかったか確認します。\n
 		:param title: HTMLから取得したタイトル
 		:param summary: HTMLから取得した要約
 		:param content: HTMLから取得した本文
-		return: { 'title': '(title)', 'summary': '(summary)', 'content': '(content)' }，エラーの場合{ 'error': '(error)' }"""
-		is_title: bool = 1 < len(title)
-		summary_pattern: Pattern = re.compile("[\\W\\w]{1,}?。[\\W\\w]{1,}?。[\\W\\w]{1,}?。")
-		summary_match: Match = summary_pattern.fullmatch(summary)
-		is_summary: bool = summary_match is not None and 1 < len(summary_match.group(0))
-		is_content: bool = 1 < len(content)
-		if not (is_title and is_summary and is_content):
+		return: { 'title': '(title)', 'summary': '(summary)', 'content': '(content)' }，エラーの場合{ 'error': '(クロール状態)' }"""
+		if not is_valid_article(title, summary, content):
 			self.__error_count += 1
 			self.__logger.error("HTMLの解析結果が正しくないようです。")
-			return {"error": "error"}
+			return {"error": CrawlState.INVALID}
 		return {
 			"title": title,
 			"summary": summary,
 			"content": content
 		}
 	
-	def __update_json(self, news: LivedoorNews, article: Dict[str, str]):
-		"""取得した記事情報を元にJSONを更新します"""
+	def __update_json(self, news: LivedoorNews, article: Dict[str, str]) -> bool:
+		"""取得した記事情報を元にJSONを更新します\n
+		:return: 書き込めたか"""
 		self.__logger.debug("JSON書き込み")
-		news.title = article.get("title")
-		news.summary = article.get("summary")
-		news.content = article.get("content")
-		write_data: dict = news.dict_like_json
+		# 表の行（news）は書き換えない（書き換えた本文は表が残る範囲の終わりまでメモリーに残るため）
+		write_data: dict = dict(news.dict_like_json, title = article.get("title"), summary = article.get("summary"), content = article.get("content"))
 		try:
+			if self.__shard_writer is not None:
+				self.__shard_writer.write(news.id, write_data)
+				return True
 			json_string: str = json.dumps(write_data, ensure_ascii = False, allow_nan = False, indent = "\t").replace("\n", "\r\n") + "\r\n"
-			with open(self.__json_directory_path + "/" + self.__file_name + "/" + str(news.id) + ".json", mode = "w") as json_write_file:
+			with open(self.__output_directory_path + "/" + self.__file_name + "/" + str(news.id) + ".json", mode = "w") as json_write_file:
 				json_write_file.write(json_string)
+			return True
 		except Exception as exception:
 			self.__error_count += 1
 			self.__critical_count += 1
-			self.__logger.error("【重大】" + self.__file_name + " JSONファイルに書き込めませんでした。\nID：" + str(id) + "\n処理番号（count）：" + str(self.__count) + "\n更新データ：" + json.dumps(news.dict_like_json, ensure_ascii = False, allow_nan = False, indent = "\t").replace("\n", "\r\n"))
-			return
+			self.__logger.error("【重大】" + self.__file_name + " JSONファイルに書き込めませんでした。\nID：" + str(news.id) + "\n処理番号（count）：" + str(self.__count) + "\n更新データ：" + json.dumps(write_data, ensure_ascii = False, allow_nan = False, indent = "\t").replace("\n", "\r\n"))
+			return False
+
+
+@lru_cache(maxsize = None)
+def worker_crawler(extractor: str) -> Crawler:
+	"""解析用のクローラーを，プロセス・抽出器ごとにひとつだけ生成します。"""
+	return Crawler(extractor = extractor)
+
+
+def parse_one(item: Tuple[int, str, str]) -> Tuple[Dict[str, str], Dict[str, float]]:
+	"""HTMLをひとつ解析します（プロセスプールから呼ぶため関数にしています）。\n
+	:param item: （記事ID，HTML，抽出器名）
+	:return: （解析結果，段の名前→秒数）"""
+	id, html, extractor = item
+	return worker_crawler(extractor).parse_timed(html, id)
+
+
+def reparse_one(item: Tuple[int, str, str]) -> Tuple[int, Dict[str, str], Dict[str, float]]:
+	"""キャッシュ済みのHTMLをひとつ再解析します（プロセスプールから呼ぶため関数にしています）。\n
+	:param item: （記事ID，圧縮HTMLのパス，抽出器名）
+	:return: （記事ID，解析結果，段の名前→秒数），キャッシュを読めなければ解析結果は{ 'error': ERROR }（次のクロールで取得し直す）"""
+	id, blob_path, extractor = item
+	try:
+		html: str = read_blob(blob_path)
+	except BLOB_ERRORS:
+		# 一覧を作ってから読むまでの間に削除された，または壊れていた（ひとつのために再解析全体を止めない）
+		getLogger("crawl").exception(str(id) + " のHTMLをキャッシュから読み込めませんでした。")
+		return id, {"error": CrawlState.ERROR}, dict( )
+	return (id, ) + worker_crawler(extractor).parse_timed(html, id)
 
 
 if __name__ == "__main__":
-	logger: Logger = MyLogger("crawl").logger
+	logger: Logger = MyLogger("crawl", use_queue = True).logger
 	Crawler(logger).main( )
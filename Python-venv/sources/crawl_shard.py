@@ -0,0 +1,156 @@
+from typing import Dict, List, Optional, Set
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from logging import Logger, getLogger
+import multiprocessing
+import socket
+import time
+
+from my_logger import MyLogger
+from crawl import Crawler
+from models.crawl_lease import CrawlLease, LeaseHeartbeat
+from models.jsonl_shard import JsonlShardReader, JsonlShardWriter
+
+
+SPLITS: tuple = ("debug", "develop", "test", "train")
+
+
+class ShardedCrawler:
+	"""ひとつの分割を，複数のワーカー（別プロセス）で重複も抜けもなくクロールします。\n
+	レコードを決まった大きさのバッチに分けて貸し出しデータベース（models.crawl_lease.CrawlLease）に登録し，各ワーカーはバッチを借りてはクロールします。\n
+	止まったワーカーが借りたままのバッチは，期限が切れると他のワーカーが借り直します。出力はワーカーごとのディレクトリーに書き出し，mergeで分割のディレクトリーにまとめます。\n
+	貸し出しデータベースは同じマシンのワーカーだけで共有します。別のマシンでは，それぞれのファイルを使い，steal = Falseでシャードごとに静的に分担します。"""
+	
+	def __init__(self, logger: Optional[Logger] = None, file_name: str = "train", output_directory_path: Optional[str] = None, lease_path: Optional[str] = None, data_directory_path: Optional[str] = None):
+		"""生成します。\n
+		:param logger: ロガー
+		:param file_name: 分割の名前（debug / develop / test / train）
+		:param output_directory_path: ワーカーごとの出力を置くディレクトリー（Noneで「Python-venv/dataset/crawl/workers」）
+		:param lease_path: 貸し出しデータベースのパス（Noneで「（output_directory_path）/（分割）.lease.sqlite3」，同じマシンのワーカー全員で同じ，ローカルのファイル）
+		:param data_directory_path: 入力のJSONと，mergeでまとめる先のディレクトリー（Noneで「Python-venv/dataset/crawl」）"""
+		self.__logger: Logger = logger if logger is not None else getLogger("ShardedCrawler")
+		self.__file_name: str = file_name
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__data_directory_path: str = data_directory_path if data_directory_path is not None else str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+		self.__output_directory_path: str = output_directory_path if output_directory_path is not None else str(Path(self.__data_directory_path).joinpath("workers"))
+		self.__lease_path: str = lease_path if lease_path is not None else str(Path(self.__output_directory_path).joinpath(file_name + ".lease.sqlite3"))
+	
+	def crawl(self, worker_name: str, shard_index: int = 0, shard_count: int = 1, batch_size: int = 1000, lease_seconds: float = 600.0, steal: bool = True, **crawler_options) -> int:
+		"""バッチを借りられなくなるまで，借りてはクロールします。\n
+		:param worker_name: ワーカー名（同時に動かすワーカーごとに重複しない名前，出力ディレクトリー名にもなる）
+		:param shard_index: 自分のシャード番号（0～shard_count - 1，このシャードのバッチを先に借りる）
+		:param shard_count: シャード数（バッチ番号をこれで割った余りがシャード番号）
+		:param batch_size: 1バッチのレコード数（最初のワーカーが決め，以降のワーカーは同じ値を指定）
+		:param lease_seconds: 貸し出しの期限の秒数（クロール中は1/3ごとに延長する）
+		:param steal: 自分のシャードが尽きたら，他のシャードのバッチも借りるか
+		:param crawler_options: Crawlerに渡す引数（concurrency，requests_per_secondなど）
+		:return: クロールしたバッチ数"""
+		if not (0 <= shard_index < shard_count):
+			raise ValueError("シャード番号は0～" + str(shard_count - 1) + "で指定してください（" + str(shard_index) + "）。")
+		worker_directory_path: str = str(Path(self.__output_directory_path).joinpath(worker_name))
+		Path(worker_directory_path).mkdir(parents = True, exist_ok = True)
+		crawler: Crawler = Crawler(self.__logger, data_directory_path = self.__data_directory_path, output_directory_path = worker_directory_path, **crawler_options)
+		batch_count: int = 0
+		start_time: float = time.time( )
+		with CrawlLease(self.__lease_path) as lease:
+			total_batches: int = lease.plan(crawler.count_records(self.__file_name), batch_size)
+			self.__logger.info(self.__file_name + " をワーカー「" + worker_name + "」（シャード " + str(shard_index) + " / " + str(shard_count) + "）でクロールします。\n全バッチ数：" + str(total_batches) + "，バッチの状態：" + str(lease.counts( )))
+			while True:
+				claimed: Optional[tuple] = lease.claim(worker_name, shard_index, shard_count, lease_seconds, steal)
+				if claimed is None:
+					break
+				batch, range_from, range_to = claimed
+				self.__logger.info("バッチ %d（%d から %d の手前まで）を借りました。", batch, range_from, range_to)
+				try:
+					with LeaseHeartbeat(self.__lease_path, batch, worker_name, lease_seconds, self.__logger):
+						crawler.crawl(self.__file_name, range_from, range_to)
+				except BaseException:
+					# 中断したバッチは，期限を待たずに他のワーカーが借りられるようにする
+					lease.release(batch, worker_name)
+					raise
+				if not lease.complete(batch, worker_name):
+					self.__logger.warning("バッチ %d は期限切れの間に他のワーカーにも貸し出されました（重複した記事はmergeで1件にまとめます）。", batch)
+				batch_count += 1
+			self.__logger.info("借りられるバッチがなくなりました。\nこのワーカーでクロールしたバッチ数：" + str(batch_count) + "（" + str(round(time.time( ) - start_time, 2)) + " 秒），バッチの状態：" + str(lease.counts( )))
+		return batch_count
+	
+	def merge(self, compress: bool = False) -> int:
+		"""ワーカーごとのディレクトリーにクロールした記事を，分割のディレクトリー（「（data_directory_path）/（分割）」のシャード）にまとめます。すでにある記事は飛ばします。\n
+		:param compress: シャードをgzip圧縮するか
+		:return: まとめた記事数"""
+		index_paths: List[Path] = sorted(Path(self.__output_directory_path).glob("*/" + self.__file_name + "/" + self.__file_name + ".index.sqlite3"))
+		if Path(self.__lease_path).exists( ):
+			with CrawlLease(self.__lease_path) as lease:
+				counts: Dict[str, int] = lease.counts( )
+			if 0 < sum(counts.values( )) - counts.get(CrawlLease.DONE, 0):
+				self.__logger.warning("まだ処理済みでないバッチがあります：" + str(counts))
+		count: int = 0
+		with JsonlShardWriter(self.__data_directory_path + "/" + self.__file_name, self.__file_name, compress = compress) as shard_writer:
+			written_ids: Set[int] = shard_writer.ids( )
+			for index_path in index_paths:
+				worker_count: int = 0
+				with JsonlShardReader(str(index_path.parent), self.__file_name) as reader:
+					for record in reader:
+						if record.get("id") in written_ids:
+							continue
+						shard_writer.write(record.get("id"), record)
+						written_ids.add(record.get("id"))
+						worker_count += 1
+				self.__logger.info(index_path.parent.parent.name + "：" + str(worker_count) + " 記事")
+				count += worker_count
+		self.__logger.info(self.__file_name + " に " + str(count) + " 記事をまとめました。")
+		return count
+	
+	def status(self) -> Dict[str, int]:
+		"""バッチの状態ごとの数と，貸し出し中のワーカーをログ出力します。\n
+		:return: 状態→バッチ数"""
+		if not Path(self.__lease_path).exists( ):
+			self.__logger.info(self.__lease_path + " がありません（まだクロールしていません）。")
+			return dict( )
+		with CrawlLease(self.__lease_path) as lease:
+			counts: Dict[str, int] = lease.counts( )
+			self.__logger.info(self.__file_name + " のバッチの状態：" + str(counts) + "\n貸し出し中のワーカー：" + str(lease.owners( )))
+		return counts
+
+
+def parse_arguments(arguments: Optional[List[str]] = None) -> Namespace:
+	"""コマンドライン引数を解析します。"""
+	parser: ArgumentParser = ArgumentParser(description = "分割を複数のワーカーで重複なくクロールします（crawl：バッチを借りてクロール / merge：ワーカーごとの出力をまとめる / status：バッチの状態）。")
+	parser.add_argument("command", choices = ("crawl", "merge", "status"))
+	parser.add_argument("--split", choices = SPLITS, required = True, help = "クロールする分割")
+	parser.add_argument("--shard-index", type = int, default = 0, help = "自分のシャード番号（0から）")
+	parser.add_argument("--shard-count", type = int, default = 1, help = "シャード数")
+	parser.add_argument("--worker-name", default = None, help = "ワーカー名（同時に動かすワーカーごとに重複しない名前，省略で「（ホスト名）-（シャード番号）」）")
+	parser.add_argument("--concurrency", type = int, default = 1, help = "ワーカーごとの同時接続数")
+	parser.add_argument("--requests-per-second", type = float, default = 0.1, help = "ワーカーごとの1秒あたりのリクエスト数（ワーカー全体ではワーカー数倍になる）")
+	parser.add_argument("--burst", type = float, default = 1.0, help = "ワーカーごとの連続で送れるリクエスト数の上限")
+	parser.add_argument("--parse-processes", type = int, default = max(multiprocessing.cpu_count( ) - 1, 1), help = "ワーカーごとのHTMLを解析するプロセス数")
+	parser.add_argument("--output-directory", default = None, help = "ワーカーごとの出力を置くディレクトリー（省略で「Python-venv/dataset/crawl/workers」）")
+	parser.add_argument("--lease-path", default = None, help = "貸し出しデータベースのパス（省略で「（出力ディレクトリー）/（分割）.lease.sqlite3」，同じマシンのワーカーだけで共有し，NFSなどに置かない）")
+	parser.add_argument("--data-directory", default = None, help = "入力のJSONとmergeでまとめる先のディレクトリー（省略で「Python-venv/dataset/crawl」）")
+	parser.add_argument("--batch-size", type = int, default = 1000, help = "1バッチのレコード数")
+	parser.add_argument("--lease-seconds", type = float, default = 600.0, help = "貸し出しの期限の秒数")
+	parser.add_argument("--no-steal", action = "store_true", help = "自分のシャードのバッチだけを借りる（別のマシンで分担する場合は必ず指定）")
+	parser.add_argument("--base-url", default = "https://news.livedoor.com/article/detail/", help = "記事URLのIDより前の部分")
+	parser.add_argument("--metrics-format", choices = ("json", "prometheus", "none"), default = "json", help = "集計を書き出す形式")
+	parser.add_argument("--compress", action = "store_true", help = "シャードをgzip圧縮する")
+	return parser.parse_args(arguments)
+
+
+def main(logger: Optional[Logger] = None, arguments: Optional[List[str]] = None):
+	parsed: Namespace = parse_arguments(arguments)
+	logger = logger if logger is not None else getLogger("ShardedCrawler")
+	sharded_crawler: ShardedCrawler = ShardedCrawler(logger, parsed.split, parsed.output_directory, parsed.lease_path, parsed.data_directory)
+	if parsed.command == "merge":
+		sharded_crawler.merge(parsed.compress)
+		return
+	if parsed.command == "status":
+		sharded_crawler.status( )
+		return
+	worker_name: str = parsed.worker_name if parsed.worker_name is not None else socket.gethostname( ) + "-" + str(parsed.shard_index)
+	sharded_crawler.crawl(worker_name, parsed.shard_index, parsed.shard_count, parsed.batch_size, parsed.lease_seconds, not parsed.no_steal, concurrency = parsed.concurrency, requests_per_second = parsed.requests_per_second, burst = parsed.burst, base_url = parsed.base_url, parse_processes = parsed.parse_processes, metrics_format = parsed.metrics_format, compress_output = parsed.compress)
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("crawl", use_queue = True).logger
+	main(logger)
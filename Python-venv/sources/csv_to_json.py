@@ -1,56 +1,134 @@
-from typing import Iterable, Tuple, List, Dict, Union, Optional
+from typing import Iterable, Iterator, Tuple, List, Dict, Union, Optional, Deque
 from pathlib import Path
-from multiprocessing.pool import Pool
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import deque
+from itertools import islice
 from logging import Logger, getLogger
 import multiprocessing
+import resource
+import sys
+import time
 import csv
 import json
 
 from my_logger import MyLogger
-from models.livedoor_news import LivedoorNews
+from models.livedoor_news import LivedoorNews, LivedoorNewsTable
+from models.record_index import RecordIndex
 
 
 class CsvToJson:
 	"""CSV→JSON変換器"""
 	
-	def __init__(self, logger: Optional[Logger] = None):
+	def __init__(self, logger: Optional[Logger] = None, output_format: str = "json", chunk_size: int = 10000, processes: int = max(multiprocessing.cpu_count( ) - 1, 1), csv_directory_path: Optional[str] = None, output_directory_path: Optional[str] = None):
+		"""変換器を生成します。\n
+		:param logger: ロガー
+		:param output_format: 出力形式（json：従来どおりの整形したJSON配列 / jsonl：1行1記事）
+		:param chunk_size: 1プロセスにまとめて渡す行数
+		:param processes: 変換するプロセス数
+		:param csv_directory_path: 元のCSVのディレクトリー（Noneで「data」）
+		:param output_directory_path: 出力するディレクトリー（Noneで「Python-venv/dataset/crawl」）"""
 		self.__logger: Logger = logger if logger is not None else getLogger("CsvToJson")
 		self.__sources_directory_path: str = str(Path(__file__).parent)
-		self.__csv_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../../data"))
-		self.__output_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+		self.__csv_directory_path: str = csv_directory_path if csv_directory_path is not None else str(Path(self.__sources_directory_path).joinpath("../../data"))
+		self.__output_directory_path: str = output_directory_path if output_directory_path is not None else str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+		self.__output_format: str = output_format
+		self.__chunk_size: int = max(chunk_size, 1)
+		self.__processes: int = max(processes, 1)
 	
 	def main(self):
 		self.__logger.info("元のCSVのデータをJSONに変換します。")
 		converting_files: Tuple[str, str, str, str] = ("debug", "develop", "test", "train")
-		with Pool(processes = multiprocessing.cpu_count( ) - 1) as pool:
-			results: Iterable[int] = pool.imap(csv_to_json, converting_files)
-			counts = tuple(results)
+		start_time: float = time.time( )
+		# ファイル単位でなく行のまとまり単位で並列化する（trainだけが極端に大きいため）
+		with ProcessPoolExecutor(max_workers = self.__processes) as executor:
+			counts: Tuple[int, ...] = tuple(map(lambda file_name: self.csv_to_json(file_name, executor), converting_files))
+		elapsed_time: float = time.time( ) - start_time
 		self.__logger.info("すべてJSONに変換しました。\ndebug：" + str(counts[0]) + " 個\ndevelop：" + str(counts[1]) + " 個\ntest：" + str(counts[2]) + " 個\ntrain：" + str(counts[3]) + " 個")
+		self.__logger.info("経過時間：" + str(round(elapsed_time, 2)) + " 秒，スループット：" + str(round(sum(counts) / max(elapsed_time, 0.000001), 1)) + " 行／秒，最大メモリー使用量：" + str(round(peak_rss_mebibytes( ), 1)) + " MiB")
 	
-	def csv_to_json(self, file_name: str) -> int:
+	def csv_to_json(self, file_name: str, executor: Optional[ProcessPoolExecutor] = None) -> int:
+		"""ひとつのCSVを変換します。行のまとまりごとに変換し，順番どおりにそのままファイルへ書き出すため，全行をメモリーに載せません。\n
+		:param file_name: CSVのファイル名
+		:param executor: 変換に使うプロセスプール（Noneでこのプロセスで変換）
+		:return: 変換した行数"""
+		csv_path: Path = Path(self.__csv_directory_path).joinpath(file_name + ".csv")
+		if not csv_path.exists( ):
+			self.__logger.error(str(csv_path) + " がありません。")
+			return 0
 		self.__logger.debug(file_name + " を変換します。")
-		with open(self.__csv_directory_path + "/" + file_name + ".csv", mode = "r") as csv_file:
+		count: int = 0
+		output_path: str = self.__output_directory_path + "/" + file_name + "." + self.__output_format
+		with open(str(csv_path), mode = "r") as csv_file, open(output_path, mode = "w") as json_file:
 			reader = csv.reader(csv_file)
-			articles: Tuple[dict, ...] = tuple(map(self.csv_row_to_livedoor_news_dict, reader))
-		json_string: str = json.dumps(articles, ensure_ascii = False, allow_nan = False, indent = "\t").replace("\n", "\r\n")
-		with open(self.__output_directory_path + "/" + file_name + ".json", mode = "w") as json_file:
-			json_file.write(json_string + "\r\n")
+			chunks: Iterator[List[List[str]]] = iter(lambda: list(islice(reader, self.__chunk_size)), [ ])
+			for chunk_string, chunk_count in self.__convert_chunks(chunks, executor):
+				if self.__output_format == "json":
+					json_file.write(("[\r\n" if count == 0 else ",\r\n") + chunk_string)
+				else:
+					json_file.write(chunk_string)
+				count += chunk_count
+			if self.__output_format == "json":
+				json_file.write("\r\n]\r\n" if 0 < count else "[]\r\n")
+		# クロール時に指定した範囲だけを読み込めるよう，レコードのバイト位置の索引も作っておく
+		RecordIndex.build(output_path)
 		self.__logger.debug(file_name + " の変換が終了しました。")
-		return len(articles)
+		return count
+	
+	def __convert_chunks(self, chunks: Iterator[List[List[str]]], executor: Optional[ProcessPoolExecutor]) -> Iterator[Tuple[str, int]]:
+		"""行のまとまりを変換し，順番どおりに返します。処理中のまとまりはプロセス数の2倍までに抑えます。"""
+		if executor is None:
+			yield from map(lambda chunk: convert_chunk(chunk, self.__output_format), chunks)
+			return
+		futures: Deque[Future] = deque( )
+		for chunk in chunks:
+			futures.append(executor.submit(convert_chunk, chunk, self.__output_format))
+			if self.__processes * 2 <= len(futures):
+				yield futures.popleft( ).result( )
+		while 0 < len(futures):
+			yield futures.popleft( ).result( )
+	
+	def csv_rows_to_table(self, rows: List[List[str]]) -> LivedoorNewsTable:
+		"""CSVの行のまとまりを，記事ごとのオブジェクトを作らずにひとつの表にします。"""
+		return LivedoorNewsTable.from_records(map(csv_row_to_record, rows))
 	
 	def csv_row_to_livedoor_news_dict(self, row: List[str]) -> Dict[str, Union[int, Optional[bool], str]]:
-		count: int = len(row)
-		if count == 4:
-			# 「.」「j」などが何を表しているか不明なため，また少なくともIDではないことから，削除
-			temp_id: str = row[3].replace(".", "").replace(".j", "").replace("j", "").replace("s", "")
-			return LivedoorNews(int(row[0]) + 2000, int(row[1]), int(row[2]), int(temp_id)).dict_like_json
-		return LivedoorNews(int(row[0]) + 2000, int(row[1]), int(row[2]), int(row[3]), row[4] == "1").dict_like_json
+		return LivedoorNews(**csv_row_to_record(row)).dict_like_json
 
 
 def csv_to_json(file_name: str) -> int:
 	return CsvToJson( ).csv_to_json(file_name)
 
 
+def csv_row_to_record(row: List[str]) -> Dict[str, Union[int, Optional[bool]]]:
+	"""CSVの1行を，LivedoorNewsTable.from_recordsに渡す辞書にします。"""
+	if len(row) == 4:
+		# 「.」「j」などが何を表しているか不明なため，また少なくともIDではないことから，削除
+		temp_id: str = row[3].replace(".", "").replace(".j", "").replace("j", "").replace("s", "")
+		return {"year": int(row[0]) + 2000, "month": int(row[1]), "category": int(row[2]), "id": int(temp_id), "is_series": None}
+	return {"year": int(row[0]) + 2000, "month": int(row[1]), "category": int(row[2]), "id": int(row[3]), "is_series": row[4] == "1"}
+
+
+def convert_chunk(rows: List[List[str]], output_format: str) -> Tuple[str, int]:
+	"""行のまとまりを変換します（プロセスプールから呼ぶため関数にしています）。\n
+	:param rows: CSVの行のリスト
+	:param output_format: json（JSON配列の要素として整形，区切りの「,」込み） / jsonl
+	:return: （変換後の文字列，行数）"""
+	converter: CsvToJson = CsvToJson( )
+	articles: Iterable[dict] = converter.csv_rows_to_table(rows).records( )
+	if output_format == "jsonl":
+		return "".join(map(lambda article: json.dumps(article, ensure_ascii = False, allow_nan = False) + "\n", articles)), len(rows)
+	# 配列全体をjson.dumps(indent = "\t")したときと同じになるよう，要素ごとに1段字下げする
+	elements: Iterable[str] = map(lambda article: "\t" + json.dumps(article, ensure_ascii = False, allow_nan = False, indent = "\t").replace("\n", "\r\n\t"), articles)
+	return ",\r\n".join(elements), len(rows)
+
+
+def peak_rss_mebibytes( ) -> float:
+	"""このプロセスと子プロセスのうち，最大のメモリー使用量（MiB）を返します。"""
+	peak: int = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+	# ru_maxrssの単位は，macOSではバイト，LinuxではKiB
+	return peak / (1024.0 ** 2 if sys.platform == "darwin" else 1024.0)
+
+
 if __name__ == "__main__":
 	logger: Logger = MyLogger("CsvToJson").logger
 	CsvToJson(logger).main( )
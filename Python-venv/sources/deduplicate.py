@@ -0,0 +1,156 @@
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Deque
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import deque, Counter
+from functools import lru_cache
+from itertools import islice
+from logging import Logger, getLogger
+import multiprocessing
+import hashlib
+import time
+import json
+import numpy
+
+from my_logger import MyLogger
+from csv_to_json import peak_rss_mebibytes
+from models.jsonl_shard import read_crawled_records
+from models.normaliser_engine import NormaliserEngine
+from models.minhash_index import MinHashIndex, minhash_signatures
+
+
+class Deduplicator:
+	"""クロールした記事（dataset/crawl/（分割））の本文から，ほぼ同じ記事（転載や軽い修正）をMinHashとLSHで見つけ，分割の中や分割をまたぐ重複のまとまりを報告します。\n
+	署名は「dataset/crawl/minhash.sqlite3」（models.minhash_index.MinHashIndex）に保存し，再実行時は新しくクロールした記事や本文が変わった記事だけを計算して追加します。"""
+	
+	def __init__(self, logger: Optional[Logger] = None, processes: int = max(multiprocessing.cpu_count( ) - 1, 1), chunk_size: int = 64, num_permutations: int = 128, bands: int = 16, shingle_size: int = 5, threshold: float = 0.8, progress_interval: float = 10.0, data_directory_path: Optional[str] = None):
+		"""重複検出器を生成します。\n
+		:param logger: ロガー
+		:param processes: 署名を計算するプロセス数
+		:param chunk_size: 1プロセスにまとめて渡す記事数
+		:param num_permutations: 署名の長さ（ハッシュ関数の数）
+		:param bands: LSHのバンド数（既定の128・16で，類似度0.8の組は95 ％，0.5の組は6 ％ほどが候補になる）
+		:param shingle_size: シングルの文字数
+		:param threshold: 重複とみなす推定Jaccard類似度の下限
+		:param progress_interval: 進捗を出力する間隔の秒数
+		:param data_directory_path: クロールした記事と，署名のデータベース・報告を置くディレクトリー（Noneで「Python-venv/dataset/crawl」）"""
+		self.__logger: Logger = logger if logger is not None else getLogger("Deduplicator")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__data_directory_path: str = data_directory_path if data_directory_path is not None else str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+		self.__processes: int = max(processes, 1)
+		self.__chunk_size: int = max(chunk_size, 1)
+		self.__parameters: Dict[str, int] = {"num_permutations": num_permutations, "bands": bands, "shingle_size": shingle_size}
+		self.__threshold: float = threshold
+		self.__progress_interval: float = progress_interval
+		self.__skipped_count: int = 0
+	
+	def main(self):
+		file_names: str = input("どの分割の重複を調べる？（debug / develop / test / train をカンマ区切りで，空欄でdevelop,test,train）：")
+		threshold: str = input("重複とみなす類似度の下限は？（空欄で0.8）：")
+		self.__threshold = float(threshold) if threshold != "" else 0.8
+		self.update(list(filter(lambda file_name: file_name != "", map(str.strip, file_names.split(",")))) if file_names != "" else ["develop", "test", "train"])
+		self.report( )
+	
+	@property
+	def database_path(self) -> str:
+		return str(Path(self.__data_directory_path).joinpath("minhash.sqlite3"))
+	
+	@property
+	def report_path(self) -> str:
+		return str(Path(self.__data_directory_path).joinpath("duplicates.json"))
+	
+	def update(self, file_names: List[str]) -> int:
+		"""分割の記事の署名を計算して索引に追加します。前回から本文が変わっていない記事は飛ばします（署名を計算し直しません）。\n
+		:param file_names: 分割の名前のリスト
+		:return: 署名を計算した記事数"""
+		count: int = 0
+		with MinHashIndex(self.database_path, **self.__parameters) as index, ProcessPoolExecutor(max_workers = self.__processes) as executor:
+			source_hashes: Dict[Tuple[str, int], str] = index.source_hashes( )
+			for file_name in file_names:
+				source_directory_path: Path = Path(self.__data_directory_path).joinpath(file_name)
+				if not source_directory_path.is_dir( ):
+					self.__logger.error(str(source_directory_path) + " がありません。")
+					continue
+				self.__logger.info(file_name + " の署名を計算します。")
+				split_count: int = 0
+				pair_count: int = 0
+				self.__skipped_count = 0
+				start_time: float = time.time( )
+				last_progress_time: float = start_time
+				records: Iterator[Tuple[int, str, str]] = self.__changed_contents(file_name, read_crawled_records(str(source_directory_path), file_name), source_hashes)
+				chunks: Iterator[List[Tuple[int, str, str]]] = iter(lambda: list(islice(records, self.__chunk_size)), [ ])
+				for ids, hashes, signatures, has_shingles in self.__signature_chunks(chunks, executor, index.parameters):
+					pair_count += index.add_many([file_name] * len(ids), ids, hashes, signatures, has_shingles)
+					split_count += len(ids)
+					if self.__progress_interval <= time.time( ) - last_progress_time:
+						last_progress_time = time.time( )
+						self.__disp_progress(file_name, split_count, self.__skipped_count, pair_count, last_progress_time - start_time)
+				self.__disp_progress(file_name, split_count, self.__skipped_count, pair_count, time.time( ) - start_time)
+				count += split_count
+			self.__logger.info("索引：" + str(index.counts( )))
+		return count
+	
+	def report(self, threshold: Optional[float] = None) -> Dict[str, Union[float, int, dict, list]]:
+		"""推定Jaccard類似度がthreshold以上の記事をつないだ重複のまとまりを，分割の中のものと分割をまたぐものに分けてログ出力し，「duplicates.json」に書き出します。\n
+		:param threshold: 重複とみなす推定Jaccard類似度の下限（Noneで生成時の値）
+		:return: 報告（{ 'threshold', 'clusters'（まとまりの数）, 'duplicate_articles'（まとまりの記事のうち，最初の1件以外の数）, 'within_split'（分割→まとまりの数）, 'cross_split'（「分割-分割」→まとまりの数）, 'details'（まとまりごとの{ 'articles', 'splits', 'similarity' }）}）"""
+		threshold = threshold if threshold is not None else self.__threshold
+		with MinHashIndex(self.database_path, **self.__parameters) as index:
+			clusters: List[Tuple[List[Tuple[str, int]], float]] = index.clusters(threshold)
+		within_split: Counter = Counter( )
+		cross_split: Counter = Counter( )
+		details: List[Dict[str, Union[float, list]]] = list( )
+		for articles, similarity in clusters:
+			splits: List[str] = sorted(set(map(lambda article: article[0], articles)))
+			if len(splits) == 1:
+				within_split[splits[0]] += 1
+			else:
+				cross_split["-".join(splits)] += 1
+			details.append({"articles": list(map(lambda article: {"split": article[0], "id": article[1]}, articles)), "splits": splits, "similarity": round(similarity, 4)})
+		report: Dict[str, Union[float, int, dict, list]] = {"threshold": threshold, "clusters": len(clusters), "duplicate_articles": sum(map(lambda cluster: len(cluster[0]) - 1, clusters)), "within_split": dict(within_split), "cross_split": dict(cross_split), "details": details}
+		with open(self.report_path, mode = "w", encoding = "utf-8") as report_file:
+			json.dump(report, report_file, ensure_ascii = False, indent = "\t")
+		self.__logger.info("類似度 " + str(threshold) + " 以上の重複のまとまり：" + str(len(clusters)) + " 個（重複した記事：" + str(report["duplicate_articles"]) + " 件）\n分割の中：" + str(dict(within_split)) + "\n分割をまたぐもの：" + str(dict(cross_split)) + "\n詳細：" + self.report_path)
+		return report
+	
+	def __changed_contents(self, file_name: str, records: Iterator[Dict[str, Union[int, Optional[bool], str]]], source_hashes: Dict[Tuple[str, int], str]) -> Iterator[Tuple[int, str, str]]:
+		"""署名を計算していない（または本文が変わった）記事だけを，（記事ID，本文，本文のハッシュ値）で返します。"""
+		for record in records:
+			content: str = record.get("content") or ""
+			content_hash: str = hashlib.blake2b(content.encode("utf-8"), digest_size = 20).hexdigest( )
+			if source_hashes.get((file_name, record.get("id"))) == content_hash:
+				self.__skipped_count += 1
+				continue
+			yield record.get("id"), content, content_hash
+	
+	def __signature_chunks(self, chunks: Iterator[List[Tuple[int, str, str]]], executor: ProcessPoolExecutor, parameters: Dict[str, int]) -> Iterator[Tuple[List[int], List[str], numpy.ndarray, numpy.ndarray]]:
+		"""記事のまとまりの署名を順番どおりに返します。処理中のまとまりはプロセス数の2倍までに抑えます。"""
+		futures: Deque[Tuple[List[Tuple[int, str, str]], Future]] = deque( )
+		for chunk in chunks:
+			futures.append((chunk, executor.submit(signature_chunk, list(map(lambda item: item[1], chunk)), parameters["shingle_size"], parameters["num_permutations"], parameters["seed"])))
+			if self.__processes * 2 <= len(futures):
+				chunk, future = futures.popleft( )
+				yield (list(map(lambda item: item[0], chunk)), list(map(lambda item: item[2], chunk))) + future.result( )
+		while 0 < len(futures):
+			chunk, future = futures.popleft( )
+			yield (list(map(lambda item: item[0], chunk)), list(map(lambda item: item[2], chunk))) + future.result( )
+	
+	def __disp_progress(self, file_name: str, count: int, skipped_count: int, pair_count: int, elapsed_time: float):
+		self.__logger.info(file_name + "：署名を計算 " + str(count) + " 件，変更なしで飛ばした記事 " + str(skipped_count) + " 件，候補の組 " + str(pair_count) + " 組，経過時間：" + str(round(elapsed_time, 2)) + " 秒，スループット：" + str(round(count / max(elapsed_time, 0.000001), 1)) + " 件／秒，最大メモリー使用量：" + str(round(peak_rss_mebibytes( ), 1)) + " MiB")
+
+
+@lru_cache(maxsize = None)
+def worker_engine( ) -> NormaliserEngine:
+	"""プロセスごとにひとつだけ正規化器を生成します（StringNormaliser.normaliseと同じ正規化で，GiNZAは読み込みません）。"""
+	return NormaliserEngine( )
+
+
+def signature_chunk(contents: List[str], shingle_size: int, num_permutations: int, seed: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""本文のまとまりを正規化し，MinHashの署名を計算します（プロセスプールから呼ぶため関数にしています）。\n
+	:return: （署名（記事数×num_permutations，uint32），本文が空でないか）"""
+	engine: NormaliserEngine = worker_engine( )
+	return minhash_signatures(list(map(lambda content: engine.normalise(content), contents)), shingle_size, num_permutations, seed)
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("Deduplicator").logger
+	Deduplicator(logger).main( )
@@ -0,0 +1,60 @@
+from typing import List, Optional, Set, Tuple
+from pathlib import Path
+from logging import Logger, getLogger
+import json
+
+from my_logger import MyLogger
+from models.jsonl_shard import JsonlShardWriter
+
+
+class JsonToJsonl:
+	"""1記事1ファイルのJSON（dataset/crawl/（分割）/（ID）.json）を，JSONLのシャードに変換します。"""
+	
+	def __init__(self, logger: Optional[Logger] = None, compress: bool = False):
+		"""変換器を生成します。\n
+		:param logger: ロガー
+		:param compress: シャードをgzip圧縮するか"""
+		self.__logger: Logger = logger if logger is not None else getLogger("JsonToJsonl")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__json_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+		self.__compress: bool = compress
+	
+	def main(self):
+		compress: str = input("gzip圧縮する？（y / n，空欄でn）：")
+		remove: str = input("変換後に元のJSONファイルを削除する？（y / n，空欄でn）：")
+		self.__compress = compress == "y"
+		self.__logger.info("1記事1ファイルのJSONをJSONLのシャードに変換します。")
+		counts: Tuple[int, ...] = tuple(map(lambda file_name: self.convert(file_name, remove == "y"), ("debug", "develop", "test", "train")))
+		self.__logger.info("すべて変換しました。\ndebug：" + str(counts[0]) + " 個\ndevelop：" + str(counts[1]) + " 個\ntest：" + str(counts[2]) + " 個\ntrain：" + str(counts[3]) + " 個")
+	
+	def convert(self, file_name: str, remove: bool = False) -> int:
+		"""ひとつの分割を変換します。すでにシャードにある記事は飛ばします。\n
+		:param file_name: 分割の名前（debug / develop / test / train）
+		:param remove: 変換後に元のJSONファイルを削除するか
+		:return: 変換した記事数"""
+		directory_path: Path = Path(self.__json_directory_path).joinpath(file_name)
+		if not directory_path.is_dir( ):
+			self.__logger.error(str(directory_path) + " がありません。")
+			return 0
+		self.__logger.debug(file_name + " を変換します。")
+		# ID順に並べる（ファイル名がIDでないものは対象外）
+		json_paths: List[Path] = sorted(filter(lambda path: path.stem.isdigit( ), directory_path.glob("*.json")), key = lambda path: int(path.stem))
+		count: int = 0
+		with JsonlShardWriter(str(directory_path), file_name, compress = self.__compress) as shard_writer:
+			written_ids: Set[int] = shard_writer.ids( )
+			for json_path in json_paths:
+				if int(json_path.stem) in written_ids:
+					continue
+				with open(str(json_path), mode = "r") as json_file:
+					record: dict = json.load(json_file)
+				shard_writer.write(record.get("id"), record)
+				count += 1
+		if remove:
+			tuple(map(lambda json_path: json_path.unlink( ), json_paths))
+		self.__logger.debug(file_name + " の変換が終了しました。")
+		return count
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("JsonToJsonl").logger
+	JsonToJsonl(logger).main( )
@@ -0,0 +1,121 @@
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Deque
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import deque
+from itertools import chain, islice
+from logging import Logger, getLogger
+import multiprocessing
+import time
+import numpy
+
+from my_logger import MyLogger
+from csv_to_json import peak_rss_mebibytes
+from preprocess import worker_normaliser
+from models.jsonl_shard import read_crawled_records
+from models.string_normaliser import StringNormaliser
+from models.rouge_oracle import OracleWriter, split_sentences, score_articles
+
+
+# ROUGEを数える単位
+UNITS: Tuple[str, ...] = ("token", "character")
+
+
+class OracleLabeller:
+	"""前処理した記事（dataset/learn/（分割））の本文の文ごとに，3行要約の各行とのROUGE-1 / 2 / Lを計算し，抽出型要約の学習に使うオラクルのラベルを付けます。\n
+	本文は正規化後の文字列を「。」で文に分け，要約の行と同じく形態素（または文字）に分けます。F値とラベルはmodels.rouge_oracle.OracleWriterの形式で「dataset/learn/（分割）」に書き出します。"""
+	
+	def __init__(self, logger: Optional[Logger] = None, processes: int = max(multiprocessing.cpu_count( ) - 1, 1), chunk_size: int = 64, batch_size: int = 256, unit: str = "token", progress_interval: float = 10.0):
+		"""ラベル付け器を生成します。\n
+		:param logger: ロガー
+		:param processes: 計算するプロセス数
+		:param chunk_size: 1プロセスにまとめて渡す記事数（まとめて配列演算で計算する記事数）
+		:param batch_size: 形態素解析でまとめて解析する文字列の数
+		:param unit: ROUGEを数える単位（token：GiNZAの表層形の形態素 / character：文字，GiNZAを使いません）
+		:param progress_interval: 進捗を出力する間隔の秒数"""
+		if unit not in UNITS:
+			raise ValueError("単位は" + " / ".join(UNITS) + "のどれかで指定してください（" + unit + "）。")
+		self.__logger: Logger = logger if logger is not None else getLogger("OracleLabeller")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__learn_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/learn"))
+		self.__processes: int = max(processes, 1)
+		self.__chunk_size: int = max(chunk_size, 1)
+		self.__batch_size: int = max(batch_size, 1)
+		self.__unit: str = unit
+		self.__progress_interval: float = progress_interval
+	
+	def main(self):
+		file_name: str = input("どれにラベルを付ける？（debug / develop / test / train）：")
+		unit: str = input("ROUGEを数える単位は？（token / character，空欄でtoken）：")
+		self.__unit = unit if unit in UNITS else "token"
+		self.label(file_name)
+	
+	def label(self, file_name: str) -> int:
+		"""ひとつの分割にラベルを付けます。記事を順に読み，まとまりごとにプロセスプールで計算して，順番どおりに書き出します（全記事をメモリーに載せません）。\n
+		:param file_name: 分割の名前（debug / develop / test / train）
+		:return: ラベルを付けた記事数"""
+		directory_path: str = self.__learn_directory_path + "/" + file_name
+		if not Path(directory_path).joinpath(file_name + ".index.sqlite3").exists( ):
+			self.__logger.error(directory_path + " に前処理した記事がありません。")
+			return 0
+		self.__logger.info(file_name + " の本文の文に，要約の各行とのROUGE（単位：" + self.__unit + "）でラベルを付けます。")
+		count: int = 0
+		sentence_count: int = 0
+		start_time: float = time.time( )
+		last_progress_time: float = start_time
+		records: Iterator[Dict[str, Union[int, Optional[bool], str, list]]] = read_crawled_records(directory_path, file_name)
+		chunks: Iterator[List[Dict[str, Union[int, Optional[bool], str, list]]]] = iter(lambda: list(islice(records, self.__chunk_size)), [ ])
+		with OracleWriter(directory_path, file_name) as oracle_writer, ProcessPoolExecutor(max_workers = self.__processes) as executor:
+			for ids, sentence_counts, scores, labels in self.__label_chunks(chunks, executor):
+				oracle_writer.write_many(ids, sentence_counts, scores, labels)
+				count += len(ids)
+				sentence_count += len(labels)
+				if self.__progress_interval <= time.time( ) - last_progress_time:
+					last_progress_time = time.time( )
+					self.__disp_progress(file_name, count, sentence_count, last_progress_time - start_time)
+		self.__disp_progress(file_name, count, sentence_count, time.time( ) - start_time)
+		self.__logger.info(file_name + " のラベル付けが終了しました。")
+		return count
+	
+	def __label_chunks(self, chunks: Iterator[List[Dict[str, Union[int, Optional[bool], str, list]]]], executor: ProcessPoolExecutor) -> Iterator[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]]:
+		"""記事のまとまりのラベルを順番どおりに返します。処理中のまとまりはプロセス数の2倍までに抑えます。"""
+		futures: Deque[Future] = deque( )
+		for chunk in chunks:
+			futures.append(executor.submit(label_chunk, chunk, self.__unit, self.__batch_size))
+			if self.__processes * 2 <= len(futures):
+				yield futures.popleft( ).result( )
+		while 0 < len(futures):
+			yield futures.popleft( ).result( )
+	
+	def __disp_progress(self, file_name: str, count: int, sentence_count: int, elapsed_time: float):
+		self.__logger.info(file_name + "：ラベル付け " + str(count) + " 件（" + str(sentence_count) + " 文），経過時間：" + str(round(elapsed_time, 2)) + " 秒，スループット：" + str(round(count / max(elapsed_time, 0.000001), 1)) + " 件／秒，最大メモリー使用量：" + str(round(peak_rss_mebibytes( ), 1)) + " MiB")
+
+
+def label_chunk(records: List[Dict[str, Union[int, Optional[bool], str, list]]], unit: str, batch_size: int) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+	"""記事のまとまりの，本文の文ごとのROUGEのF値とラベルを計算します（プロセスプールから呼ぶため関数にしています）。\n
+	:param records: 前処理した記事のリスト
+	:param unit: ROUGEを数える単位（token / character）
+	:param batch_size: 形態素解析でまとめて解析する文字列の数
+	:return: （記事ID，記事ごとの文の数，文ごとのF値（float16），文ごとのラベル）"""
+	sentences: List[List[str]] = list(map(lambda record: split_sentences(record.get("content") or ""), records))
+	lines: List[List[str]] = list(map(lambda record: split_sentences(record.get("summary") or ""), records))
+	segments: Iterator[Tuple[str, ...]] = tokenise_segments(list(map(lambda pair: pair[0] + pair[1], zip(sentences, lines))), unit, batch_size)
+	articles: List[Tuple[List[Tuple[str, ...]], List[Tuple[str, ...]]]] = list(map(lambda pair: (list(islice(segments, len(pair[0]))), list(islice(segments, len(pair[1])))), zip(sentences, lines)))
+	sentence_counts, scores, labels = score_articles(articles)
+	return numpy.array(list(map(lambda record: record.get("id"), records)), dtype = numpy.int64), sentence_counts, scores.astype(numpy.float16), labels
+
+
+def tokenise_segments(texts: List[List[str]], unit: str, batch_size: int) -> Iterator[Tuple[str, ...]]:
+	"""記事ごとの文と要約の行を，まとまり全体でまとめて形態素（または文字）に分け，順に返します。"""
+	strings: List[str] = list(chain.from_iterable(texts))
+	if unit == "character":
+		return map(tuple, strings)
+	normaliser: StringNormaliser = worker_normaliser( )
+	segments: List[Tuple[str, ...]] = list(normaliser.analyse_many(strings, with_stop_words = False, batch_size = batch_size))
+	if normaliser.token_cache is not None:
+		normaliser.token_cache.commit( )
+	return iter(segments)
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("OracleLabeller").logger
+	OracleLabeller(logger).main( )
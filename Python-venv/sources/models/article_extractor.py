@@ -0,0 +1,172 @@
+from typing import Dict, List, Optional, Pattern, Match, Tuple
+from abc import ABC, abstractmethod
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+import html as html_module
+import re
+
+try:
+	import lxml
+	FAST_PARSER: str = "lxml"
+except ImportError:
+	FAST_PARSER = "html.parser"
+
+
+class ExtractionError(Exception):
+	"""HTMLから記事を抽出できなかったことを表します。"""
+
+
+class MetaNotFoundError(ExtractionError):
+	"""タイトル・要約のmetaタグが見つからなかったことを表します。"""
+
+
+class ArticleBodyNotFoundError(ExtractionError):
+	"""本文が見つからなかった（記事が削除されている）ことを表します。"""
+
+
+SUMMARY_PATTERN: Pattern = re.compile("[\\W\\w]{1,}?。[\\W\\w]{1,}?。[\\W\\w]{1,}?。")
+
+
+def is_valid_article(title: str, summary: str, content: str) -> bool:
+	"""抽出結果が正しそうか確認します（タイトルと本文が2文字以上，要約が「。」区切りの3行）。"""
+	is_title: bool = 1 < len(title)
+	summary_match: Optional[Match] = SUMMARY_PATTERN.fullmatch(summary)
+	is_summary: bool = summary_match is not None and 1 < len(summary_match.group(0))
+	is_content: bool = 1 < len(content)
+	return is_title and is_summary and is_content
+
+
+class ArticleExtractor(ABC):
+	"""HTMLからタイトル，要約，本文を抽出する処理の基底クラスです。"""
+	
+	name: str = ""
+	
+	@abstractmethod
+	def extract(self, html: str) -> Dict[str, str]:
+		"""HTMLからタイトル，要約，本文を抽出します。\n
+		:param html: HTML形式の文字列
+		:return: { 'title': '(title)', 'summary': '(summary)', 'content': '(content)' }
+		:raise MetaNotFoundError: タイトル・要約が見つからなかった場合
+		:raise ArticleBodyNotFoundError: 本文が見つからなかった場合"""
+	
+	def _body_text(self, span_article: Tag) -> str:
+		"""本文のspanタグからscriptを除いた文字列を取り出します。"""
+		tuple(map(lambda script: script.decompose( ), span_article.find_all(name = "script")))
+		return span_article.get_text(separator = "", strip = True).replace("\r\n", "").replace("\n", "")
+
+
+class Html5libExtractor(ArticleExtractor):
+	"""html5libでHTML全体を解析して抽出します。遅いですが，タグに間違いがあるHTMLにもブラウザーと同じように対応します。"""
+	
+	name: str = "html5lib"
+	
+	def extract(self, html: str) -> Dict[str, str]:
+		beautiful_soup: BeautifulSoup = BeautifulSoup(markup = html, features = "html5lib")
+		try:
+			# 「。」区切りでひとまとまりになっているためmetaタグから要約を取得
+			meta_discription: Tag = beautiful_soup.find(name = "meta", attrs = {"name": "description"})
+			summary: str = meta_discription.get("content") + "。"
+			# 付加情報が付いていないためmetaタグからタイトルを取得
+			meta_ob_title: Tag = beautiful_soup.find(name = "meta", attrs = {"property": "ob:title"})
+			title: str = meta_ob_title.get("content")
+		except Exception as exception:
+			raise MetaNotFoundError("タイトル・要約のmetaタグが見つかりません。") from exception
+		try:
+			# 本文を取得（サイトの本文前後のタグに間違いがあるため正しく取れる保証はない）
+			span_article: Tag = beautiful_soup.find(name = "div", attrs = {"class": "articleBody"}).find(name = "span", attrs = {"itemprop": "articleBody"})
+			content: str = self._body_text(span_article)
+		except Exception as exception:
+			raise ArticleBodyNotFoundError("本文が見つかりません。") from exception
+		return {
+			"title": title,
+			"summary": summary,
+			"content": content
+		}
+
+
+class FastExtractor(ArticleExtractor):
+	"""metaタグは正規表現でheadタグの中だけを走査し，本文はSoupStrainerで本文のdivだけを（lxmlがあればlxmlで）解析して抽出します。"""
+	
+	name: str = "fast"
+	
+	def __init__(self):
+		self.__meta_pattern: Pattern = re.compile("<meta\\s[^>]*>", re.IGNORECASE)
+		self.__attribute_pattern: Pattern = re.compile("([^\\s=/>]+)\\s*=\\s*(?:\"([^\"]*)\"|'([^']*)'|([^\\s\"'=<>`]+))")
+		self.__head_end_pattern: Pattern = re.compile("</head\\s*>", re.IGNORECASE)
+		self.__body_strainer: SoupStrainer = SoupStrainer(name = "div", attrs = {"class": "articleBody"})
+	
+	def extract(self, html: str) -> Dict[str, str]:
+		head_end: Optional[Match] = self.__head_end_pattern.search(html)
+		metas: Dict[Tuple[str, str], str] = self.__scan_metas(html[: head_end.start( )] if head_end is not None else html)
+		description: Optional[str] = metas.get(("name", "description"))
+		title: Optional[str] = metas.get(("property", "ob:title"))
+		if description is None or title is None:
+			raise MetaNotFoundError("タイトル・要約のmetaタグが見つかりません。")
+		beautiful_soup: BeautifulSoup = BeautifulSoup(markup = html[head_end.end( ): ] if head_end is not None else html, features = FAST_PARSER, parse_only = self.__body_strainer)
+		span_articles: List[Tag] = list(filter(lambda span: span is not None, map(lambda div: div.find(name = "span", attrs = {"itemprop": "articleBody"}), beautiful_soup.find_all(name = "div", attrs = {"class": "articleBody"}))))
+		if len(span_articles) < 1:
+			raise ArticleBodyNotFoundError("本文が見つかりません。")
+		return {
+			"title": title,
+			"summary": description + "。",
+			"content": self._body_text(span_articles[0])
+		}
+	
+	def __scan_metas(self, head: str) -> Dict[Tuple[str, str], str]:
+		"""metaタグの（name or property，値）→contentの辞書を作ります。先に出現したものを優先します。"""
+		metas: Dict[Tuple[str, str], str] = dict( )
+		for meta_match in self.__meta_pattern.finditer(head):
+			attributes: Dict[str, str] = dict( )
+			for attribute_match in self.__attribute_pattern.finditer(meta_match.group(0)[5: ]):
+				key: str = attribute_match.group(1).lower( )
+				if key not in attributes:
+					value: str = next(filter(lambda group: group is not None, attribute_match.groups( )[1: ]))
+					attributes[key] = html_module.unescape(value)
+			if "content" not in attributes:
+				continue
+			for key in ("name", "property"):
+				if key in attributes and (key, attributes[key]) not in metas:
+					metas[(key, attributes[key])] = attributes["content"]
+		return metas
+
+
+class FallbackExtractor(ArticleExtractor):
+	"""速い抽出器で抽出し，失敗した場合や結果が正しくなさそうな場合だけ，遅いが確実な抽出器で抽出し直します。"""
+	
+	name: str = "fast+html5lib"
+	
+	def __init__(self, primary: Optional[ArticleExtractor] = None, fallback: Optional[ArticleExtractor] = None):
+		self.__primary: ArticleExtractor = primary if primary is not None else FastExtractor( )
+		self.__fallback: ArticleExtractor = fallback if fallback is not None else Html5libExtractor( )
+		self.__fallback_count: int = 0
+	
+	@property
+	def fallback_count(self) -> int:
+		"""遅い抽出器で抽出し直した回数"""
+		return self.__fallback_count
+	
+	def extract(self, html: str) -> Dict[str, str]:
+		try:
+			article: Dict[str, str] = self.__primary.extract(html)
+			if is_valid_article(article.get("title"), article.get("summary"), article.get("content")):
+				return article
+		except ArticleBodyNotFoundError:
+			# 本文のdivが文字列としても存在しなければ，削除済みで確定（削除済みの記事は多いため抽出し直さない）
+			if "articleBody" not in html:
+				raise
+		except Exception:
+			pass
+		self.__fallback_count += 1
+		return self.__fallback.extract(html)
+
+
+def create_extractor(name: str) -> ArticleExtractor:
+	"""名前から抽出器を生成します。\n
+	:param name: 「html5lib」「fast」「fast+html5lib」のいずれか"""
+	extractors: Dict[str, type] = {
+		Html5libExtractor.name: Html5libExtractor,
+		FastExtractor.name: FastExtractor,
+		FallbackExtractor.name: FallbackExtractor
+	}
+	if name not in extractors:
+		raise ValueError("抽出器 " + name + " はありません。（" + " / ".join(extractors.keys( )) + "）")
+	return extractors[name]( )
@@ -0,0 +1,166 @@
+from typing import Dict, Optional, Tuple
+from logging import Logger, getLogger
+import threading
+import sqlite3
+import time
+
+
+class CrawlLease:
+	"""ひとつの分割のレコードを決まった大きさのバッチに分け，バッチごとの貸し出し（借りているワーカー名と期限）を記録するSQLiteデータベースです。\n
+	同じマシンの複数のワーカー（別プロセス）が同じファイルを開き，未処理のバッチや期限切れの（止まったワーカーが借りたままの）バッチを借りていきます。\n
+	NFSやSMBの上ではSQLiteのロックを信頼できないため，別のマシンとはファイルを共有せず，マシンごとのファイルでsteal = Falseとし，シャードで静的に分担してください。"""
+	
+	# 未処理
+	PENDING: str = "pending"
+	# 貸し出し中
+	LEASED: str = "leased"
+	# 処理済み
+	DONE: str = "done"
+	
+	def __init__(self, database_path: str, timeout: float = 60.0):
+		"""貸し出しデータベースを開きます（なければ作成します）。\n
+		:param database_path: SQLiteファイルのパス（同じマシンのワーカー全員で同じ，ローカルのファイル）
+		:param timeout: 他のワーカーの書き込みが終わるのを待つ秒数"""
+		self.__database_path: str = database_path
+		# 借りる処理は「BEGIN IMMEDIATE」で囲んで，他のワーカーと同じバッチを借りないようにするため，自動でトランザクションを始めない
+		self.__connection: sqlite3.Connection = sqlite3.connect(database_path, timeout = timeout, isolation_level = None)
+		# WALの共有メモリーは別のマシンと共有できないため，通常のロールバックジャーナルにする（以前WALで作ったファイルも戻す）
+		self.__connection.execute("PRAGMA journal_mode = DELETE")
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS crawl_lease (batch INTEGER PRIMARY KEY, range_from INTEGER NOT NULL, range_to INTEGER NOT NULL, status TEXT NOT NULL, owner TEXT NOT NULL DEFAULT '', expires_at REAL NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)")
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS crawl_lease_plan (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	@property
+	def database_path(self) -> str:
+		return self.__database_path
+	
+	def plan(self, length: int, batch_size: int) -> int:
+		"""レコード数をbatch_sizeずつのバッチに分けて登録します（登録済みなら，同じ分け方かを確かめるだけです）。\n
+		バッチ番号bは「b × batch_size」から「(b + 1) × batch_size」の手前までのレコードで，どのワーカーが登録しても同じ分け方になります。\n
+		:param length: レコード数
+		:param batch_size: 1バッチのレコード数
+		:return: バッチ数"""
+		self.__connection.execute("BEGIN IMMEDIATE")
+		try:
+			plan: Dict[str, int] = dict(self.__connection.execute("SELECT key, value FROM crawl_lease_plan").fetchall( ))
+			if 0 < len(plan):
+				if plan.get("length") != length or plan.get("batch_size") != batch_size:
+					raise ValueError(self.__database_path + " は，レコード数 " + str(plan.get("length")) + "，バッチの大きさ " + str(plan.get("batch_size")) + " で分けてあります（今回：" + str(length) + "，" + str(batch_size) + "）。")
+			else:
+				now_time: float = time.time( )
+				self.__connection.executemany("INSERT INTO crawl_lease (batch, range_from, range_to, status, updated_at) VALUES (?, ?, ?, ?, ?)", map(lambda batch: (batch, batch * batch_size, min((batch + 1) * batch_size, length), self.PENDING, now_time), range(batch_count(length, batch_size))))
+				self.__connection.executemany("INSERT INTO crawl_lease_plan (key, value) VALUES (?, ?)", (("length", length), ("batch_size", batch_size)))
+			self.__connection.execute("COMMIT")
+		except BaseException:
+			self.__connection.execute("ROLLBACK")
+			raise
+		return batch_count(length, batch_size)
+	
+	def claim(self, owner: str, shard_index: int = 0, shard_count: int = 1, lease_seconds: float = 600.0, steal: bool = True) -> Optional[Tuple[int, int, int]]:
+		"""バッチをひとつ借ります。\n
+		自分が借りたままのもの（止まったあと同じワーカー名で再実行した場合）→自分のシャード（バッチ番号をshard_countで割った余りがshard_index）の未処理・期限切れのもの→（stealなら）他のシャードの未処理・期限切れのものの順に，バッチ番号の小さいものから借ります。\n
+		:param owner: ワーカー名（ワーカーごとに重複しない名前）
+		:param shard_index: 自分のシャード番号（0～shard_count - 1）
+		:param shard_count: シャード数
+		:param lease_seconds: 貸し出しの期限の秒数（renewで延長しないと，期限後に他のワーカーが借りられる）
+		:param steal: 自分のシャードが尽きたら，他のシャードのバッチも借りるか
+		:return: （バッチ番号，開始インデックス，終了インデックス（含まない）），借りられるものがなければNone"""
+		now_time: float = time.time( )
+		self.__connection.execute("BEGIN IMMEDIATE")
+		try:
+			row: Optional[Tuple[int, int, int]] = self.__connection.execute("SELECT batch, range_from, range_to FROM crawl_lease WHERE status != ? AND (owner = ? OR status = ? OR expires_at < ?) AND (batch % ? = ? OR ?) ORDER BY owner = ? DESC, batch % ? = ? DESC, batch LIMIT 1", (self.DONE, owner, self.PENDING, now_time, shard_count, shard_index, steal, owner, shard_count, shard_index)).fetchone( )
+			if row is not None:
+				self.__connection.execute("UPDATE crawl_lease SET status = ?, owner = ?, expires_at = ?, attempts = attempts + 1, updated_at = ? WHERE batch = ?", (self.LEASED, owner, now_time + lease_seconds, now_time, row[0]))
+			self.__connection.execute("COMMIT")
+		except BaseException:
+			self.__connection.execute("ROLLBACK")
+			raise
+		return row
+	
+	def renew(self, batch: int, owner: str, lease_seconds: float = 600.0) -> bool:
+		"""借りているバッチの期限を今からlease_seconds後に延長します。\n
+		:return: 延長できたか（期限切れの間に他のワーカーが借りた場合などはFalse）"""
+		now_time: float = time.time( )
+		cursor: sqlite3.Cursor = self.__connection.execute("UPDATE crawl_lease SET expires_at = ?, updated_at = ? WHERE batch = ? AND owner = ? AND status = ?", (now_time + lease_seconds, now_time, batch, owner, self.LEASED))
+		return 0 < cursor.rowcount
+	
+	def complete(self, batch: int, owner: str) -> bool:
+		"""バッチを処理済みにします（期限切れの間に他のワーカーが借りていても，処理は終わったため処理済みにします）。\n
+		:return: 自分が借りたままだったか"""
+		now_time: float = time.time( )
+		is_owner: bool = self.__connection.execute("SELECT owner FROM crawl_lease WHERE batch = ?", (batch, )).fetchone( ) == (owner, )
+		self.__connection.execute("UPDATE crawl_lease SET status = ?, expires_at = 0, updated_at = ? WHERE batch = ?", (self.DONE, now_time, batch))
+		return is_owner
+	
+	def release(self, batch: int, owner: str):
+		"""処理を中断したバッチを，他のワーカーがすぐに借りられるよう未処理に戻します（自分が借りている場合だけ）。"""
+		self.__connection.execute("UPDATE crawl_lease SET status = ?, owner = '', expires_at = 0, updated_at = ? WHERE batch = ? AND owner = ? AND status = ?", (self.PENDING, time.time( ), batch, owner, self.LEASED))
+	
+	def counts(self) -> Dict[str, int]:
+		"""状態ごとのバッチ数を返します（期限切れの貸し出しは「expired」として数えます）。"""
+		rows: list = self.__connection.execute("SELECT CASE WHEN status = ? AND expires_at < ? THEN 'expired' ELSE status END, COUNT(*) FROM crawl_lease GROUP BY 1", (self.LEASED, time.time( ))).fetchall( )
+		return dict(rows)
+	
+	def owners(self) -> Dict[str, int]:
+		"""ワーカー名→貸し出し中のバッチ数を返します。"""
+		return dict(self.__connection.execute("SELECT owner, COUNT(*) FROM crawl_lease WHERE status = ? GROUP BY owner", (self.LEASED, )).fetchall( ))
+	
+	def close(self):
+		self.__connection.close( )
+
+
+class LeaseHeartbeat:
+	"""借りているバッチの期限を，別スレッドで定期的（期限の1/3ごと）に延長します（withの中で処理します）。\n
+	SQLiteの接続はスレッドをまたげないため，スレッドの中で貸し出しデータベースを開き直します。"""
+	
+	def __init__(self, database_path: str, batch: int, owner: str, lease_seconds: float = 600.0, logger: Optional[Logger] = None):
+		"""延長器を生成します。\n
+		:param database_path: 貸し出しデータベースのパス
+		:param batch: 借りているバッチ番号
+		:param owner: ワーカー名
+		:param lease_seconds: 貸し出しの期限の秒数
+		:param logger: ロガー"""
+		self.__logger: Logger = logger if logger is not None else getLogger("CrawlLease")
+		self.__database_path: str = database_path
+		self.__batch: int = batch
+		self.__owner: str = owner
+		self.__lease_seconds: float = lease_seconds
+		self.__stopped: threading.Event = threading.Event( )
+		self.__thread: threading.Thread = threading.Thread(target = self.__run, daemon = True)
+		self.__is_lost: bool = False
+	
+	def __enter__(self):
+		self.__thread.start( )
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.__stopped.set( )
+		self.__thread.join( )
+	
+	@property
+	def is_lost(self) -> bool:
+		"""延長できなかった（他のワーカーに借りられた）か"""
+		return self.__is_lost
+	
+	def __run(self):
+		with CrawlLease(self.__database_path) as lease:
+			while not self.__stopped.wait(self.__lease_seconds / 3.0):
+				try:
+					if lease.renew(self.__batch, self.__owner, self.__lease_seconds):
+						continue
+					self.__is_lost = True
+					self.__logger.warning("バッチ %d の期限を延長できませんでした（期限切れの間に他のワーカーが借りた可能性があります）。", self.__batch)
+					return
+				except sqlite3.Error as exception:
+					# 他のワーカーの書き込みが長引いた場合などは，次の回に延長し直す
+					self.__logger.warning("バッチ %d の期限を延長中にエラーが発生しました：%s", self.__batch, exception)
+
+
+def batch_count(length: int, batch_size: int) -> int:
+	"""レコード数をbatch_sizeずつに分けたときのバッチ数を返します。"""
+	return (length + batch_size - 1) // batch_size
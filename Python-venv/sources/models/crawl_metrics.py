@@ -0,0 +1,196 @@
+from typing import Dict, List, Optional, Tuple, Union
+from collections import Counter
+from pathlib import Path
+import threading
+import bisect
+import time
+import json
+import os
+
+
+class LatencyHistogram:
+	"""処理時間のヒストグラムです（Prometheusのhistogramと同じく，各バケットは上限以下の回数を数えます）。"""
+	
+	# バケットの上限の秒数（これを超えるものは+Infのバケットだけに入る）
+	DEFAULT_BOUNDS: Tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+	
+	def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BOUNDS):
+		self.__bounds: Tuple[float, ...] = bounds
+		# 最後は+Infのバケット（累積でなく，そのバケットだけの回数）
+		self.__counts: List[int] = [0] * (len(bounds) + 1)
+		self.__sum: float = 0.0
+		self.__max: float = 0.0
+	
+	@property
+	def bounds(self) -> Tuple[float, ...]:
+		return self.__bounds
+	
+	@property
+	def count(self) -> int:
+		return sum(self.__counts)
+	
+	@property
+	def sum(self) -> float:
+		return self.__sum
+	
+	def observe(self, seconds: float):
+		"""1回分の処理時間を記録します。"""
+		self.__counts[bisect.bisect_left(self.__bounds, seconds)] += 1
+		self.__sum += seconds
+		self.__max = max(self.__max, seconds)
+	
+	def cumulative_counts(self) -> List[int]:
+		"""バケットごとの，上限以下の回数を返します（最後は+Infで，全回数と同じ）。"""
+		counts: List[int] = list( )
+		total: int = 0
+		for count in self.__counts:
+			total += count
+			counts.append(total)
+		return counts
+	
+	def quantile(self, q: float) -> float:
+		"""バケットの中を線形補間して分位数を推定します（記録がなければ0）。\n
+		:param q: 0～1"""
+		count: int = self.count
+		if count < 1:
+			return 0.0
+		rank: float = q * count
+		lower: float = 0.0
+		total: int = 0
+		for bound, bucket_count in zip(self.__bounds + (self.__max, ), self.__counts):
+			if rank <= total + bucket_count and 0 < bucket_count:
+				return lower + (max(bound, lower) - lower) * (rank - total) / bucket_count
+			total += bucket_count
+			lower = bound
+		return self.__max
+	
+	def to_dict(self) -> Dict[str, Union[int, float, Dict[str, int]]]:
+		cumulative_counts: List[int] = self.cumulative_counts( )
+		return {
+			"count": cumulative_counts[-1],
+			"sum": self.__sum,
+			"mean": self.__sum / cumulative_counts[-1] if 0 < cumulative_counts[-1] else 0.0,
+			"max": self.__max,
+			"p50": self.quantile(0.5),
+			"p90": self.quantile(0.9),
+			"p99": self.quantile(0.99),
+			"buckets": dict(zip(list(map(str, self.__bounds)) + ["+Inf"], cumulative_counts))
+		}
+
+
+class CrawlMetrics:
+	"""クロールの段ごとの処理時間（ヒストグラム），転送バイト数，HTTPステータスコード，エラーの種類を集計し，JSONまたはPrometheusのテキスト形式で書き出します。"""
+	
+	# 段の名前
+	CACHE: str = "cache"
+	RATE_LIMIT: str = "rate_limit"
+	NETWORK: str = "network"
+	DECOMPRESS: str = "decompress"
+	PARSE: str = "parse"
+	EXTRACT: str = "extract"
+	VALIDATE: str = "validate"
+	WRITE: str = "write"
+	STATE: str = "state"
+	# 転送バイト数の種類
+	RECEIVED: str = "received"
+	DECOMPRESSED: str = "decompressed"
+	
+	def __init__(self):
+		self.__lock: threading.Lock = threading.Lock( )
+		self.__start_time: float = time.time( )
+		self.__histograms: Dict[str, LatencyHistogram] = dict( )
+		self.__bytes: Counter = Counter( )
+		self.__status_codes: Counter = Counter( )
+		self.__errors: Counter = Counter( )
+		self.__events: Counter = Counter( )
+	
+	def observe(self, stage: str, seconds: float):
+		"""段の処理時間を記録します。"""
+		with self.__lock:
+			if stage not in self.__histograms:
+				self.__histograms[stage] = LatencyHistogram( )
+			self.__histograms[stage].observe(seconds)
+	
+	def observe_many(self, seconds: Dict[str, float]):
+		"""段の名前→処理時間をまとめて記録します（別プロセスで計測したものなど）。"""
+		tuple(map(lambda item: self.observe(item[0], item[1]), seconds.items( )))
+	
+	def add_bytes(self, kind: str, size: int):
+		"""転送バイト数を加えます。\n
+		:param kind: RECEIVED（受信した，圧縮されたままのバイト数）/ DECOMPRESSED（展開後のバイト数）"""
+		with self.__lock:
+			self.__bytes[kind] += size
+	
+	def count_status(self, status: int):
+		"""HTTPステータスコードを数えます。"""
+		with self.__lock:
+			self.__status_codes[status] += 1
+	
+	def count_error(self, category: str):
+		"""エラーを種類ごとに数えます。"""
+		with self.__lock:
+			self.__errors[category] += 1
+	
+	def count_event(self, event: str):
+		"""キャッシュのヒットなど，その他の出来事を数えます。"""
+		with self.__lock:
+			self.__events[event] += 1
+	
+	def histogram(self, stage: str) -> Optional[LatencyHistogram]:
+		return self.__histograms.get(stage)
+	
+	def to_dict(self, gauges: Optional[Dict[str, float]] = None) -> dict:
+		"""集計結果を辞書にします。\n
+		:param gauges: 進捗の件数など，書き出すときの値（名前→値）"""
+		with self.__lock:
+			return {
+				"updated_at": time.time( ),
+				"uptime_seconds": time.time( ) - self.__start_time,
+				"gauges": dict(gauges) if gauges is not None else dict( ),
+				"stages": dict(map(lambda item: (item[0], item[1].to_dict( )), sorted(self.__histograms.items( )))),
+				"bytes": dict(self.__bytes),
+				"status_codes": dict(map(lambda item: (str(item[0]), item[1]), sorted(self.__status_codes.items( )))),
+				"errors": dict(sorted(self.__errors.items( ))),
+				"events": dict(sorted(self.__events.items( )))
+			}
+	
+	def to_prometheus(self, gauges: Optional[Dict[str, float]] = None, prefix: str = "crawl") -> str:
+		"""集計結果をPrometheusのテキスト形式（text/plain; version=0.0.4）にします。\n
+		:param gauges: 進捗の件数など，書き出すときの値（名前→値）
+		:param prefix: メトリクス名の前半"""
+		lines: List[str] = list( )
+		with self.__lock:
+			lines.append("# HELP " + prefix + "_uptime_seconds Seconds since the crawl started.")
+			lines.append("# TYPE " + prefix + "_uptime_seconds gauge")
+			lines.append(prefix + "_uptime_seconds " + prometheus_number(time.time( ) - self.__start_time))
+			for name, value in sorted((gauges if gauges is not None else dict( )).items( )):
+				lines.append("# TYPE " + prefix + "_" + name + " gauge")
+				lines.append(prefix + "_" + name + " " + prometheus_number(value))
+			lines.append("# HELP " + prefix + "_stage_seconds Time spent in each crawl stage.")
+			lines.append("# TYPE " + prefix + "_stage_seconds histogram")
+			for stage, histogram in sorted(self.__histograms.items( )):
+				for bound, count in zip(list(map(prometheus_number, histogram.bounds)) + ["+Inf"], histogram.cumulative_counts( )):
+					lines.append(prefix + "_stage_seconds_bucket{stage=\"" + stage + "\",le=\"" + bound + "\"} " + str(count))
+				lines.append(prefix + "_stage_seconds_sum{stage=\"" + stage + "\"} " + prometheus_number(histogram.sum))
+				lines.append(prefix + "_stage_seconds_count{stage=\"" + stage + "\"} " + str(histogram.count))
+			for name, label, counter in (("bytes", "kind", self.__bytes), ("http_responses", "status", self.__status_codes), ("errors", "category", self.__errors), ("events", "event", self.__events)):
+				lines.append("# TYPE " + prefix + "_" + name + "_total counter")
+				for key, count in sorted(counter.items( )):
+					lines.append(prefix + "_" + name + "_total{" + label + "=\"" + str(key) + "\"} " + str(count))
+		return "\n".join(lines) + "\n"
+	
+	def export(self, path: str, gauges: Optional[Dict[str, float]] = None):
+		"""集計結果をファイルに書き出します（拡張子が「.prom」ならPrometheusのテキスト形式，それ以外はJSON）。\n
+		読み込む側が書きかけのファイルを読まないように，一時ファイルに書いてから置き換えます。\n
+		:param path: 書き出すパス
+		:param gauges: 進捗の件数など，書き出すときの値（名前→値）"""
+		text: str = self.to_prometheus(gauges) if Path(path).suffix == ".prom" else json.dumps(self.to_dict(gauges), ensure_ascii = False, indent = "\t") + "\n"
+		temporary_path: str = path + ".tmp"
+		with open(temporary_path, mode = "w", encoding = "utf-8") as metrics_file:
+			metrics_file.write(text)
+		os.replace(temporary_path, path)
+
+
+def prometheus_number(value: float) -> str:
+	"""Prometheusのテキスト形式の数値にします（整数は小数点なし）。"""
+	return str(int(value)) if float(value).is_integer( ) else repr(float(value))
@@ -0,0 +1,103 @@
+from typing import Iterable, Optional, Set, Tuple, Dict
+import sqlite3
+import time
+
+
+class CrawlState:
+	"""記事IDごとのクロール状態を記録するSQLiteデータベースです。"""
+	
+	# 取得済み
+	DONE: str = "done"
+	# 本文が削除されていた
+	DELETED: str = "deleted"
+	# HTMLの構造が想定と違った（再クロールしても変わらないため再試行しない）
+	INVALID: str = "invalid"
+	# 通信エラーや書き込み失敗など一時的なエラー（再試行する）
+	ERROR: str = "error"
+	# 再試行の上限に達した
+	FAILED: str = "failed"
+	# 再開時に飛ばす状態
+	FINISHED_STATUSES: Tuple[str, ...] = (DONE, DELETED, INVALID, FAILED)
+	
+	def __init__(self, database_path: str, max_attempts: int = 5, backoff_base: float = 30.0, backoff_max: float = 3600.0, commit_interval: float = 5.0):
+		"""状態データベースを開きます（なければ作成します）。\n
+		:param database_path: SQLiteファイルのパス
+		:param max_attempts: 一時的なエラーの再試行を含めた最大試行回数
+		:param backoff_base: 再試行までの待ち秒数の基数（試行ごとに2倍）
+		:param backoff_max: 再試行までの待ち秒数の上限
+		:param commit_interval: コミット間隔の秒数（毎回コミットすると遅いため）"""
+		self.__max_attempts: int = max_attempts
+		self.__backoff_base: float = backoff_base
+		self.__backoff_max: float = backoff_max
+		self.__commit_interval: float = commit_interval
+		self.__last_commit_time: float = time.time( )
+		self.__connection: sqlite3.Connection = sqlite3.connect(database_path)
+		self.__connection.execute("PRAGMA journal_mode = WAL")
+		self.__connection.execute("PRAGMA synchronous = NORMAL")
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS crawl_state (id INTEGER PRIMARY KEY, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL, message TEXT NOT NULL DEFAULT '')")
+		self.__connection.commit( )
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	@property
+	def max_attempts(self) -> int:
+		"""再試行を含めた最大試行回数"""
+		return self.__max_attempts
+	
+	def finished_ids(self, ids: Optional[Iterable[int]] = None) -> Set[int]:
+		"""再開時に飛ばす（取得済み・削除済みなどの）IDを返します。\n
+		:param ids: 調べるID（Noneですべて）
+		:return: 飛ばすIDの集合"""
+		placeholders: str = ", ".join(map(lambda _: "?", self.FINISHED_STATUSES))
+		rows: Iterable[Tuple[int]] = self.__connection.execute("SELECT id FROM crawl_state WHERE status IN (" + placeholders + ")", self.FINISHED_STATUSES)
+		finished: Set[int] = set(map(lambda row: row[0], rows))
+		return finished if ids is None else finished.intersection(ids)
+	
+	def ids_with_status(self, status: str) -> Set[int]:
+		"""指定した状態のIDを返します。"""
+		return set(map(lambda row: row[0], self.__connection.execute("SELECT id FROM crawl_state WHERE status = ?", (status, ))))
+	
+	def attempts(self, id: int) -> int:
+		"""これまでの試行回数を返します。"""
+		row: Optional[Tuple[int]] = self.__connection.execute("SELECT attempts FROM crawl_state WHERE id = ?", (id, )).fetchone( )
+		return row[0] if row is not None else 0
+	
+	def mark(self, id: int, status: str, message: str = ""):
+		"""試行結果を記録します。\n
+		:param id: 記事ID
+		:param status: 状態（DONE，DELETED，INVALID，ERROR，FAILED）
+		:param message: エラー内容など"""
+		self.__connection.execute("INSERT INTO crawl_state (id, status, attempts, updated_at, message) VALUES (?, ?, 1, ?, ?) ON CONFLICT(id) DO UPDATE SET status = excluded.status, attempts = attempts + 1, updated_at = excluded.updated_at, message = excluded.message", (id, status, time.time( ), message))
+		self.__commit_if_needed( )
+	
+	def mark_error(self, id: int, message: str = "") -> Optional[float]:
+		"""一時的なエラーを記録し，再試行までの待ち秒数を返します。\n
+		:param id: 記事ID
+		:param message: エラー内容
+		:return: 再試行までの待ち秒数，試行回数の上限に達した場合None"""
+		attempts: int = self.attempts(id) + 1
+		if self.__max_attempts <= attempts:
+			self.mark(id, self.FAILED, message)
+			return None
+		self.mark(id, self.ERROR, message)
+		return min(self.__backoff_base * (2.0 ** (attempts - 1)), self.__backoff_max)
+	
+	def counts(self) -> Dict[str, int]:
+		"""状態ごとの件数を返します。"""
+		return dict(self.__connection.execute("SELECT status, COUNT(*) FROM crawl_state GROUP BY status").fetchall( ))
+	
+	def commit(self):
+		self.__connection.commit( )
+		self.__last_commit_time = time.time( )
+	
+	def close(self):
+		self.commit( )
+		self.__connection.close( )
+	
+	def __commit_if_needed(self):
+		if self.__commit_interval <= time.time( ) - self.__last_commit_time:
+			self.commit( )
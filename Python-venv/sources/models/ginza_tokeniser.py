@@ -0,0 +1,76 @@
+from typing import Dict, List, Tuple, Iterable, Iterator, Union
+from spacy.lang.ja import Japanese
+from spacy.tokens.doc import Doc
+from spacy.tokens import Token
+import spacy
+
+from .my_tuple import MyTuple
+
+
+class GinzaTokeniser:
+	"""GiNZAで形態素解析します（StringNormaliserが，形態素解析サーバーに接続できないときにプロセス内で使うものと，サーバーが使うもの）。"""
+	
+	def __init__(self, model_name: str = "ja_ginza"):
+		"""モデルを読み込みます（数秒かかり，数百MBのメモリーを使います）。\n
+		:param model_name: spaCyのモデル名"""
+		self.__japanese_processor: Japanese = spacy.load(model_name)
+		meta: dict = self.__japanese_processor.meta
+		# キャッシュのキーに含める，モデル名とバージョン
+		self.__model_version: str = str(meta.get("lang", "")) + "_" + str(meta.get("name", "")) + "-" + str(meta.get("version", ""))
+	
+	@property
+	def model_version(self) -> str:
+		"""モデル名とバージョン（例：ja_ginza-4.0.0）"""
+		return self.__model_version
+	
+	def analyse(self, strings: Iterable[str], with_stop_words: bool = False, batch_size: int = 256, n_process: int = 1) -> Iterator[Tuple[str, ...]]:
+		"""複数の文字列をnlp.pipeでまとめて形態素解析し，1件ずつ返します。\n
+		:param strings: 解析文字列のイテラブル
+		:param with_stop_words: 品詞などで形態素を絞り込むか
+		:param batch_size: まとめて解析する文字列の数
+		:param n_process: 解析するプロセス数（2以上はspaCy 2.2.2以降だけ）
+		:return: 文字列ごとの，形態素に分割したタプルのイテレーター"""
+		documents: Iterator[Doc] = self.__pipe(strings, STOP_WORDS_UNNEEDED_PIPES if with_stop_words else SURFACE_UNNEEDED_PIPES, batch_size, n_process)
+		for document in documents:
+			# 文に分けずに文書の形態素を順に見る（documents.sentsを平らにしたものと同じ順）
+			tokens: MyTuple[Token, ...] = MyTuple(document)
+			if with_stop_words:
+				tokens.filter(is_content_token)
+			# 文字列化（表層形の文字列のみにする）
+			yield tokens.map(str).tuple
+	
+	def surface_mismatches(self, strings: List[str], batch_size: int = 256) -> List[int]:
+		"""表層形だけの解析（使わない部品を無効にする）が，すべての部品を使った解析と同じ形態素の区切りになるかを確かめます。\n
+		:param strings: 解析文字列のリスト
+		:param batch_size: まとめて解析する文字列の数
+		:return: 区切りが違った文字列のインデックスのリスト"""
+		surfaces: Iterator[Tuple[str, ...]] = self.analyse(strings, with_stop_words = False, batch_size = batch_size)
+		documents: Iterator[Doc] = self.__pipe(strings, tuple( ), batch_size)
+		mismatches: List[int] = list( )
+		for i, (surface, document) in enumerate(zip(surfaces, documents)):
+			if surface != tuple(map(str, document)):
+				mismatches.append(i)
+		return mismatches
+	
+	def __pipe(self, strings: Iterable[str], unneeded_pipes: Tuple[str, ...], batch_size: int, n_process: int = 1) -> Iterator[Doc]:
+		"""使わない部品を無効にしてnlp.pipeで解析します。\n
+		n_processはspaCy 2.2.2で追加された引数のため，requirements.txtのspaCy 2.2.0でも動くよう，2以上の場合だけ渡します。"""
+		options: Dict[str, Union[int, List[str]]] = {
+			"batch_size": batch_size,
+			"disable": list(filter(lambda pipe_name: pipe_name in unneeded_pipes, self.__japanese_processor.pipe_names))
+		}
+		if 1 < n_process:
+			options["n_process"] = n_process
+		return self.__japanese_processor.pipe(strings, **options)
+
+
+# 形態素解析の結果に使わないGiNZAのパイプラインの部品
+# 品詞などで絞り込む場合：固有表現抽出は使わない（品詞の補正に係り受け解析は使う）
+STOP_WORDS_UNNEEDED_PIPES: Tuple[str, ...] = ("ner", )
+# 表層形だけの場合：GiNZAの品詞の補正（JapaneseCorrector）は形態素を結合し直し，係り受け解析は文の区切りを決めるため，形態素の区切りが変わらないよう固有表現抽出だけを使わない
+SURFACE_UNNEEDED_PIPES: Tuple[str, ...] = ("ner", )
+
+
+def is_content_token(token: Token) -> bool:
+	"""morphological_analyse_with_stop_wordsで残す形態素か（助詞・助動詞・記号などや，「する」「こと」などでないか）を返します。"""
+	return token.pos_ != "ADP" and token.pos_ != "AUX" and token.pos_ != "PUNCT" and token.pos_ != "SYM" and token.pos_ != "INTJ" and token.pos_ != "SCONJ" and token.pos_ != "DET" and token.pos_ != "PART" and token.pos_ != "X" and "非自立可能" not in token.tag_ and token.lemma_ != "する" and token.lemma_ != "こと" and token.lemma_ != "ある" and token.lemma_ != "いる" and token.lemma_ != "有る" and token.orth_ != "いう" and token.orth_ != "つい" and token.orth_ != "まあ"
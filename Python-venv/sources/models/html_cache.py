@@ -0,0 +1,140 @@
+from typing import Iterable, List, Optional, Tuple
+from pathlib import Path
+import hashlib
+import sqlite3
+import threading
+import time
+import gzip
+import zlib
+
+
+# 圧縮HTMLを読めなかった（削除された，壊れていた）ときの例外
+BLOB_ERRORS: Tuple[type, ...] = (OSError, EOFError, zlib.error)
+
+
+class HtmlCache:
+	"""取得したHTMLを圧縮して保存するキャッシュです。gzipで圧縮した本体は内容のハッシュ値で保存し，記事ID→ハッシュ値の索引をSQLiteで持ちます。"""
+	
+	def __init__(self, directory_path: str, max_bytes: int = 10 * 1024 ** 3):
+		"""キャッシュを開きます（なければ作成します）。\n
+		:param directory_path: キャッシュのディレクトリー
+		:param max_bytes: 圧縮後の合計サイズの上限（超えた場合は古いものから削除）"""
+		self.__directory_path: Path = Path(directory_path)
+		self.__directory_path.mkdir(parents = True, exist_ok = True)
+		self.__max_bytes: int = max_bytes
+		# 通信スレッドからも書き込むため
+		self.__lock: threading.Lock = threading.Lock( )
+		self.__connection: sqlite3.Connection = sqlite3.connect(str(self.__directory_path.joinpath("index.sqlite3")), check_same_thread = False)
+		self.__connection.execute("PRAGMA journal_mode = WAL")
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS html_cache (id INTEGER PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL, stored_at REAL NOT NULL)")
+		self.__connection.execute("CREATE INDEX IF NOT EXISTS html_cache_stored_at ON html_cache (stored_at)")
+		self.__connection.commit( )
+		self.__total_bytes: int = self.__connection.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM html_cache)").fetchone( )[0]
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	@property
+	def total_bytes(self) -> int:
+		"""圧縮後の合計サイズ"""
+		return self.__total_bytes
+	
+	def put(self, id: int, html: str):
+		"""HTMLを圧縮して保存します。\n
+		:param id: 記事ID
+		:param html: HTML"""
+		raw: bytes = html.encode("utf-8")
+		digest: str = hashlib.sha256(raw).hexdigest( )
+		blob_path: Path = self.blob_path(digest)
+		# 圧縮はロックの外で済ませる（確認からロックまでの間に削除された場合は，ロックの中で圧縮し直す）
+		compressed: Optional[bytes] = compress(raw) if not blob_path.exists( ) else None
+		with self.__lock:
+			if not blob_path.exists( ):
+				if compressed is None:
+					compressed = compress(raw)
+				blob_path.parent.mkdir(exist_ok = True)
+				# 書きかけのファイルを読まないよう，一時ファイルに書いてから置き換え
+				temporary_path: Path = blob_path.with_name(blob_path.name + ".tmp")
+				temporary_path.write_bytes(compressed)
+				temporary_path.replace(blob_path)
+				self.__total_bytes += len(compressed)
+			size: int = blob_path.stat( ).st_size
+			old_digest: Optional[Tuple[str]] = self.__connection.execute("SELECT digest FROM html_cache WHERE id = ?", (id, )).fetchone( )
+			self.__connection.execute("INSERT OR REPLACE INTO html_cache (id, digest, size, stored_at) VALUES (?, ?, ?, ?)", (id, digest, size, time.time( )))
+			if old_digest is not None and old_digest[0] != digest:
+				self.__remove_unreferenced(old_digest[0])
+			self.__evict( )
+			self.__connection.commit( )
+	
+	def get(self, id: int) -> Optional[str]:
+		"""保存済みのHTMLを返します。\n
+		:param id: 記事ID
+		:return: HTML，なければNone
+		:raise BLOB_ERRORS: 本体が壊れていた場合"""
+		blob_path: Optional[Path] = self.path(id)
+		if blob_path is None:
+			return None
+		try:
+			return read_blob(str(blob_path))
+		except FileNotFoundError:
+			# 索引を引いてから読むまでの間に，別のスレッドのputで古いものとして削除された
+			return None
+	
+	def path(self, id: int) -> Optional[Path]:
+		"""記事IDに対応する圧縮HTMLのパスを返します（なければNone）。"""
+		with self.__lock:
+			row: Optional[Tuple[str]] = self.__connection.execute("SELECT digest FROM html_cache WHERE id = ?", (id, )).fetchone( )
+		return self.blob_path(row[0]) if row is not None else None
+	
+	def items(self, ids: Optional[Iterable[int]] = None) -> List[Tuple[int, str]]:
+		"""保存済みの（記事ID，圧縮HTMLのパス）の一覧を返します。\n
+		:param ids: 絞り込むID（Noneですべて）"""
+		with self.__lock:
+			rows: List[Tuple[int, str]] = self.__connection.execute("SELECT id, digest FROM html_cache ORDER BY id").fetchall( )
+		id_set: Optional[set] = set(ids) if ids is not None else None
+		return list(map(lambda row: (row[0], str(self.blob_path(row[1]))), filter(lambda row: id_set is None or row[0] in id_set, rows)))
+	
+	def blob_path(self, digest: str) -> Path:
+		"""ハッシュ値に対応する圧縮HTMLのパスを返します。"""
+		return self.__directory_path.joinpath(digest[: 2], digest + ".html.gz")
+	
+	def close(self):
+		with self.__lock:
+			self.__connection.commit( )
+			self.__connection.close( )
+	
+	def __evict(self):
+		"""合計サイズが上限を超えていれば，古いものから削除します。"""
+		while self.__max_bytes < self.__total_bytes:
+			row: Optional[Tuple[int, str]] = self.__connection.execute("SELECT id, digest FROM html_cache ORDER BY stored_at LIMIT 1").fetchone( )
+			if row is None:
+				return
+			self.__connection.execute("DELETE FROM html_cache WHERE id = ?", (row[0], ))
+			self.__remove_unreferenced(row[1])
+	
+	def __remove_unreferenced(self, digest: str):
+		"""どの記事IDからも参照されなくなった本体を削除します。"""
+		if self.__connection.execute("SELECT 1 FROM html_cache WHERE digest = ? LIMIT 1", (digest, )).fetchone( ) is not None:
+			return
+		blob_path: Path = self.blob_path(digest)
+		if blob_path.exists( ):
+			self.__total_bytes -= blob_path.stat( ).st_size
+			blob_path.unlink( )
+
+
+def compress(raw: bytes) -> bytes:
+	"""gzipで圧縮します。"""
+	return gzip.compress(raw, compresslevel = 6)
+
+
+def read_blob(blob_path: str) -> str:
+	"""圧縮HTMLを読み込み，文字列にします（別プロセスからも呼べるよう関数にしています）。"""
+	with open(blob_path, mode = "rb") as blob_file:
+		compressed: bytes = blob_file.read( )
+	# 空のgzipは作らないため，空なら書きかけか壊れたもの（展開すると空文字列になり，気付けないため）
+	if len(compressed) < 1:
+		raise EOFError(blob_path + " が空です。")
+	return gzip.decompress(compressed).decode("utf-8")
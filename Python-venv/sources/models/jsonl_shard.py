@@ -0,0 +1,234 @@
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from pathlib import Path
+import json
+import sqlite3
+import gzip
+import zlib
+
+
+class JsonlShardWriter:
+	"""記事を上限サイズごとのJSONLファイル（シャード）に追記し，記事ID→（シャード，バイト位置）の索引をSQLiteで持ちます。\n
+	圧縮する場合は，まとめて書き込むごとにひとつのgzipメンバーとして追記するため，メンバーの先頭から読めば1記事だけ取り出せます。\n
+	シャードごとの圧縮の有無も索引に記録し，前回と圧縮の有無を変えて開いた場合は，同じ番号のシャードに追記せず次の番号から書き込みます。"""
+	
+	def __init__(self, directory_path: str, prefix: str, max_shard_bytes: int = 256 * 1024 ** 2, compress: bool = False, flush_records: int = 256):
+		"""書き込み器を開きます（既存のシャードがあれば続きから追記します）。\n
+		:param directory_path: シャードと索引を置くディレクトリー
+		:param prefix: シャードのファイル名の前半（例：train → train-00000.jsonl）
+		:param max_shard_bytes: 1シャードの上限バイト数（超えたら次のシャードへ）
+		:param compress: gzip圧縮するか
+		:param flush_records: まとめて書き込む記事数"""
+		self.__directory_path: Path = Path(directory_path)
+		self.__directory_path.mkdir(parents = True, exist_ok = True)
+		self.__prefix: str = prefix
+		self.__max_shard_bytes: int = max_shard_bytes
+		self.__compress: bool = compress
+		self.__flush_records: int = max(flush_records, 1)
+		# （記事ID，JSONLの1行）
+		self.__buffer: List[Tuple[int, bytes]] = list( )
+		self.__connection: sqlite3.Connection = open_index(self.__directory_path, prefix)
+		last_shard: Optional[Tuple[int]] = self.__connection.execute("SELECT MAX(shard) FROM (SELECT shard FROM records UNION ALL SELECT shard FROM shards)").fetchone( )
+		self.__shard: int = last_shard[0] if last_shard is not None and last_shard[0] is not None else 0
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	def ids(self) -> Set[int]:
+		"""書き込み済み（まとめて書き込む前のものを含む）の記事IDを返します。"""
+		return set(map(lambda row: row[0], self.__connection.execute("SELECT id FROM records"))).union(map(lambda item: item[0], self.__buffer))
+	
+	def write(self, id: int, record: Dict[str, Union[int, Optional[bool], str]]):
+		"""記事を1行のJSONとして書き込みます（flush_records件ごとにまとめてファイルへ書き込みます）。\n
+		:param id: 記事ID
+		:param record: 記事のJSON風の辞書"""
+		line: bytes = (json.dumps(record, ensure_ascii = False, allow_nan = False) + "\n").encode("utf-8")
+		self.__buffer.append((id, line))
+		if self.__flush_records <= len(self.__buffer):
+			self.flush( )
+	
+	def flush(self):
+		"""溜めている記事をシャードに書き込み，索引を更新します。"""
+		if len(self.__buffer) < 1:
+			return
+		shard_path: Path = self.__shard_path( )
+		if shard_path.exists( ) and self.__max_shard_bytes <= shard_path.stat( ).st_size:
+			self.__shard += 1
+			shard_path = self.__shard_path( )
+		# 圧縮の有無が違うシャードには追記しない（同じ番号で拡張子だけ違うファイルができるため）
+		while not self.__is_same_compression(self.__shard):
+			self.__shard += 1
+			shard_path = self.__shard_path( )
+		rows: List[Tuple[int, int, int, int, int]] = list( )
+		with open(str(shard_path), mode = "ab") as shard_file:
+			block_offset: int = shard_file.tell( )
+			offset: int = 0 if self.__compress else block_offset
+			for id, line in self.__buffer:
+				# 圧縮しない場合はファイル先頭からの位置，圧縮する場合はメンバー内での位置
+				rows.append((id, self.__shard, block_offset if self.__compress else offset, offset if self.__compress else 0, len(line)))
+				offset += len(line)
+			data: bytes = b"".join(map(lambda item: item[1], self.__buffer))
+			shard_file.write(gzip.compress(data, compresslevel = 6) if self.__compress else data)
+			shard_file.flush( )
+		self.__connection.execute("INSERT OR IGNORE INTO shards (shard, compressed) VALUES (?, ?)", (self.__shard, int(self.__compress)))
+		self.__connection.executemany("INSERT OR REPLACE INTO records (id, shard, block_offset, offset, length) VALUES (?, ?, ?, ?, ?)", rows)
+		self.__connection.commit( )
+		self.__buffer.clear( )
+	
+	def close(self):
+		self.flush( )
+		self.__connection.close( )
+	
+	def __shard_path(self) -> Path:
+		return shard_path(self.__directory_path, self.__prefix, self.__shard, self.__compress)
+	
+	def __is_same_compression(self, shard: int) -> bool:
+		"""シャードが未使用か，今と同じ圧縮の有無で書き込まれているかを返します。"""
+		row: Optional[Tuple[int]] = self.__connection.execute("SELECT compressed FROM shards WHERE shard = ?", (shard, )).fetchone( )
+		if row is not None:
+			return bool(row[0]) == self.__compress
+		# 圧縮の有無を記録する前の索引では，ファイルの有無で判断する
+		return not shard_path(self.__directory_path, self.__prefix, shard, not self.__compress).exists( )
+
+
+class JsonlShardReader:
+	"""JsonlShardWriterで書き込んだシャードを読み込みます。"""
+	
+	def __init__(self, directory_path: str, prefix: str):
+		"""読み込み器を開きます。\n
+		:param directory_path: シャードと索引のあるディレクトリー
+		:param prefix: シャードのファイル名の前半"""
+		self.__directory_path: Path = Path(directory_path)
+		self.__prefix: str = prefix
+		self.__connection: sqlite3.Connection = open_index(self.__directory_path, prefix)
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	def __len__(self) -> int:
+		return self.__connection.execute("SELECT COUNT(*) FROM records").fetchone( )[0]
+	
+	def ids(self) -> Set[int]:
+		"""書き込み済みの記事IDを返します。"""
+		return set(map(lambda row: row[0], self.__connection.execute("SELECT id FROM records")))
+	
+	def get(self, id: int) -> Optional[Dict[str, Union[int, Optional[bool], str]]]:
+		"""記事IDの記事だけを読み込みます。\n
+		:param id: 記事ID
+		:return: 記事のJSON風の辞書，なければNone"""
+		row: Optional[Tuple[int, int, int, int]] = self.__connection.execute("SELECT shard, block_offset, offset, length FROM records WHERE id = ?", (id, )).fetchone( )
+		if row is None:
+			return None
+		shard, block_offset, offset, length = row
+		with open(str(self.__find_shard(shard)), mode = "rb") as shard_file:
+			shard_file.seek(block_offset)
+			if not self.__is_compressed(shard):
+				return json.loads(shard_file.read(length).decode("utf-8"))
+			# 該当のgzipメンバーだけを，記事の末尾まで展開
+			decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+			data: bytes = b""
+			while len(data) < offset + length:
+				chunk: bytes = shard_file.read(65536)
+				if chunk == b"":
+					break
+				data += decompressor.decompress(chunk)
+				if decompressor.eof:
+					break
+		return json.loads(data[offset: offset + length].decode("utf-8"))
+	
+	def __iter__(self) -> Iterator[Dict[str, Union[int, Optional[bool], str]]]:
+		"""すべての記事を書き込み順に読み込みます（同じIDを書き直した場合は最新のものだけ）。"""
+		current_ids: Dict[Tuple[int, int, int], int] = dict(map(lambda row: ((row[1], row[2], row[3]), row[0]), self.__connection.execute("SELECT id, shard, block_offset, offset FROM records")))
+		shards: List[int] = sorted(set(map(lambda key: key[0], current_ids.keys( ))))
+		for shard in shards:
+			for position, line in self.__read_shard(shard):
+				if (shard, ) + position in current_ids:
+					yield json.loads(line.decode("utf-8"))
+	
+	def close(self):
+		self.__connection.close( )
+	
+	def __read_shard(self, shard: int) -> Iterator[Tuple[Tuple[int, int], bytes]]:
+		"""シャードを先頭から1行ずつ読み込み，（（ブロック位置，位置），行）を返します。"""
+		with open(str(self.__find_shard(shard)), mode = "rb") as shard_file:
+			if not self.__is_compressed(shard):
+				offset: int = 0
+				for line in shard_file:
+					yield (offset, 0), line
+					offset += len(line)
+				return
+			# gzipメンバーごとに展開しながら読む（シャード全体をメモリーに載せない）
+			block_offset: int = 0
+			consumed: int = 0
+			offset = 0
+			pending: bytes = b""
+			decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+			chunk: bytes = shard_file.read(1024 ** 2)
+			while chunk != b"":
+				pending += decompressor.decompress(chunk)
+				consumed += len(chunk)
+				lines: List[bytes] = pending.split(b"\n")
+				pending = lines.pop( )
+				for line in lines:
+					yield (block_offset, offset), line + b"\n"
+					offset += len(line) + 1
+				if decompressor.eof:
+					# 次のメンバーは，今のメンバーの後ろの未使用部分から始まる
+					chunk = decompressor.unused_data
+					consumed -= len(chunk)
+					block_offset = consumed
+					offset = 0
+					pending = b""
+					decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+					if chunk == b"":
+						chunk = shard_file.read(1024 ** 2)
+				else:
+					chunk = shard_file.read(1024 ** 2)
+	
+	def __find_shard(self, shard: int) -> Path:
+		return shard_path(self.__directory_path, self.__prefix, shard, self.__is_compressed(shard))
+	
+	def __is_compressed(self, shard: int) -> bool:
+		"""索引に記録したシャードの圧縮の有無を返します。\n
+		:raise ValueError: 記録がなく，圧縮したものとしないものの両方のファイルがあって判断できない場合"""
+		row: Optional[Tuple[int]] = self.__connection.execute("SELECT compressed FROM shards WHERE shard = ?", (shard, )).fetchone( )
+		if row is not None:
+			return bool(row[0])
+		# 圧縮の有無を記録する前の索引では，どちらかのファイルしかなければそれとする
+		exists: Tuple[bool, bool] = tuple(map(lambda compress: shard_path(self.__directory_path, self.__prefix, shard, compress).exists( ), (False, True)))
+		if all(exists):
+			raise ValueError("シャード " + str(shard) + " の圧縮の有無が索引になく，圧縮したものとしないものの両方のファイルがあります。")
+		return exists[1]
+
+
+def read_crawled_records(directory_path: str, prefix: str) -> Iterator[Dict[str, Union[int, Optional[bool], str]]]:
+	"""クロールした記事を読み込みます。シャードの索引があればシャードから，なければ従来の1記事1ファイルの「（ID）.json」からID順に読み込みます。\n
+	:param directory_path: 分割のディレクトリー（例：dataset/crawl/train）
+	:param prefix: シャードのファイル名の前半（分割の名前）"""
+	path: Path = Path(directory_path)
+	if path.joinpath(prefix + ".index.sqlite3").exists( ):
+		with JsonlShardReader(directory_path, prefix) as reader:
+			yield from reader
+		return
+	for json_path in sorted(filter(lambda json_path: json_path.stem.isdigit( ), path.glob("*.json")), key = lambda json_path: int(json_path.stem)):
+		with open(str(json_path), mode = "r") as json_file:
+			yield json.load(json_file)
+
+
+def open_index(directory_path: Path, prefix: str) -> sqlite3.Connection:
+	"""記事ID→（シャード，ブロック位置，位置，長さ）と，シャード→圧縮の有無の索引を開きます（なければ作成します）。"""
+	connection: sqlite3.Connection = sqlite3.connect(str(directory_path.joinpath(prefix + ".index.sqlite3")))
+	connection.execute("CREATE TABLE IF NOT EXISTS records (id INTEGER PRIMARY KEY, shard INTEGER NOT NULL, block_offset INTEGER NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL)")
+	connection.execute("CREATE TABLE IF NOT EXISTS shards (shard INTEGER PRIMARY KEY, compressed INTEGER NOT NULL)")
+	connection.commit( )
+	return connection
+
+
+def shard_path(directory_path: Path, prefix: str, shard: int, compress: bool) -> Path:
+	"""シャードのパスを返します。"""
+	return directory_path.joinpath(prefix + "-" + str(shard).zfill(5) + (".jsonl.gz" if compress else ".jsonl"))
@@ -0,0 +1,89 @@
+from typing import Dict, List, NamedTuple, Tuple
+from http.client import HTTPConnection, HTTPSConnection, HTTPException, HTTPResponse, HTTPMessage
+from urllib.parse import urlsplit, SplitResult
+import threading
+
+
+class HttpResult(NamedTuple):
+	"""HTTPレスポンスの内容です。"""
+	status: int
+	headers: HTTPMessage
+	body: bytes
+
+
+class KeepAliveClient:
+	"""スレッドごとにHTTP接続を使い回す（keep-alive）クライアントです。"""
+	
+	def __init__(self, timeout: float = 30.0):
+		"""クライアントを生成します。\n
+		:param timeout: 接続・受信のタイムアウト秒数"""
+		self.__timeout: float = timeout
+		self.__local: threading.local = threading.local( )
+		self.__lock: threading.Lock = threading.Lock( )
+		self.__all_connections: List[HTTPConnection] = list( )
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	def get(self, url: str, headers: Dict[str, str]) -> HttpResult:
+		"""GETリクエストを送ります。切断済みの接続だった場合は1度だけ再接続します。\n
+		:param url: URL
+		:param headers: リクエストヘッダー
+		:return: レスポンス"""
+		split_url: SplitResult = urlsplit(url)
+		key: Tuple[str, str] = (split_url.scheme, split_url.netloc)
+		path: str = (split_url.path if split_url.path != "" else "/") + ("?" + split_url.query if split_url.query != "" else "")
+		try:
+			return self.__request(key, path, headers)
+		except (HTTPException, ConnectionError):
+			self.__discard(key)
+			return self.__request(key, path, headers)
+	
+	def close(self):
+		"""すべての接続を閉じます。"""
+		with self.__lock:
+			tuple(map(lambda connection: connection.close( ), self.__all_connections))
+			self.__all_connections.clear( )
+		self.__local = threading.local( )
+	
+	def __request(self, key: Tuple[str, str], path: str, headers: Dict[str, str]) -> HttpResult:
+		connection: HTTPConnection = self.__connection(key)
+		try:
+			connection.request("GET", path, headers = headers)
+			response: HTTPResponse = connection.getresponse( )
+			body: bytes = response.read( )
+		except Exception:
+			self.__discard(key)
+			raise
+		if response.will_close:
+			self.__discard(key)
+		return HttpResult(response.status, response.msg, body)
+	
+	def __connection(self, key: Tuple[str, str]) -> HTTPConnection:
+		"""このスレッドの接続を返します（なければ生成します）。"""
+		connections: Dict[Tuple[str, str], HTTPConnection] = self.__thread_connections( )
+		if key not in connections:
+			scheme, netloc = key
+			connection: HTTPConnection = HTTPSConnection(netloc, timeout = self.__timeout) if scheme == "https" else HTTPConnection(netloc, timeout = self.__timeout)
+			connections[key] = connection
+			with self.__lock:
+				self.__all_connections.append(connection)
+		return connections[key]
+	
+	def __discard(self, key: Tuple[str, str]):
+		"""このスレッドの接続を閉じて破棄します。"""
+		connection: HTTPConnection = self.__thread_connections( ).pop(key, None)
+		if connection is None:
+			return
+		connection.close( )
+		with self.__lock:
+			if connection in self.__all_connections:
+				self.__all_connections.remove(connection)
+	
+	def __thread_connections(self) -> Dict[Tuple[str, str], HTTPConnection]:
+		if not hasattr(self.__local, "connections"):
+			self.__local.connections = dict( )
+		return self.__local.connections
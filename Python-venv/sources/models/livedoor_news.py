@@ -1,11 +1,14 @@
-from typing import Dict, Union, Optional
+from typing import Dict, Union, Optional, Iterable, Iterator, List, Tuple
+import numpy
 
 
 class LivedoorNews:
-	"""Livedoorニュースの記事です。"""
+	"""Livedoorニュースの記事です。実体はLivedoorNewsTableの1行で，このクラスはその行を指すだけのビューです。"""
+	
+	__slots__ = ("__table", "__row")
 	
 	def __init__(self, year: int, month: int, category: int, id: int, is_series: Optional[bool] = None, title: str = "", summary: str = "", content: str = ""):
-		"""記事インスタンスを生成します。\n
+		"""記事インスタンスを生成します（1行だけのLivedoorNewsTableを作り，その行を指します）。\n
 		:param year: 公開年
 		:param month: 公開月
 		:param category: 記事カテゴリー（フォークのため詳細は不明）
@@ -14,80 +17,220 @@ class LivedoorNews:
 		:param title: 記事タイトル
 		:param summary: 「ざっくり言うと」（3行要約），行は「。」区切り
 		:param content: 記事の中身"""
-		self.__year: int = year
-		self.__month: int = month
-		self.__category: int = category
-		self.__id: int = id
-		self.__is_series: bool = is_series
-		self.__title: str = title
-		self.__summary: str = summary
-		self.__content: str = content
+		self.__table: LivedoorNewsTable = LivedoorNewsTable.from_records(({"year": year, "month": month, "category": category, "id": id, "is_series": is_series, "title": title, "summary": summary, "content": content}, ))
+		self.__row: int = 0
+	
+	@classmethod
+	def view(cls, table: "LivedoorNewsTable", row: int) -> "LivedoorNews":
+		"""表の1行を指す記事インスタンスを生成します（値はコピーしません）。"""
+		news: LivedoorNews = cls.__new__(cls)
+		news.__table = table
+		news.__row = row
+		return news
 	
 	@property
 	def year(self) -> int:
 		"""公開年"""
-		return self.__year
+		return int(self.__table.years[self.__row])
 	
 	@property
 	def month(self) -> int:
 		"""公開月"""
-		return self.__month
+		return int(self.__table.months[self.__row])
 	
 	@property
 	def category(self) -> int:
 		"""記事カテゴリー"""
-		return self.__category
+		return int(self.__table.categories[self.__row])
 	
 	@property
 	def id(self) -> int:
 		"""記事ID（URLの最後の部分）"""
-		return self.__id
+		return int(self.__table.ids[self.__row])
 	
 	@property
-	def is_series(self) -> bool:
+	def is_series(self) -> Optional[bool]:
 		"""記事タイプが直列か（直列→True，並列→False）"""
-		return self.__is_series
+		return decode_is_series(self.__table.is_series[self.__row])
 	
 	@property
 	def title(self) -> str:
 		"""記事タイトル"""
-		return self.__title
+		return self.__table.titles[self.__row]
 	
 	@title.setter
 	def title(self, value: str):
 		"""記事タイトル"""
-		self.__title = value
+		self.__table.titles[self.__row] = value
 	
 	@property
 	def summary(self) -> str:
 		"""「ざっくり言うと」（3行要約），行は「。」区切り"""
-		return self.__summary
+		return self.__table.summaries[self.__row]
 	
 	@summary.setter
 	def summary(self, value: str):
 		"""「ざっくり言うと」（3行要約），行は「。」区切り"""
-		self.__summary = value
+		self.__table.summaries[self.__row] = value
 	
 	@property
 	def content(self) -> str:
 		"""記事の中身"""
-		return self.__content
+		return self.__table.contents[self.__row]
 	
 	@content.setter
 	def content(self, value: str):
 		"""記事の中身"""
-		self.__content = value
+		self.__table.contents[self.__row] = value
 	
 	@property
 	def dict_like_json(self) -> Dict[str, Union[int, Optional[bool], str]]:
 		"""インスタンスの状態をJSON風の辞書で表現します"""
+		return self.__table.record(self.__row)
+
+
+class StringArena:
+	"""文字列の列を，UTF-8で連結したひとつのbytesと，各文字列の開始位置の配列で持ちます。\n
+	一度作った後の書き換えは，書き換えた行だけを辞書で持ちます。"""
+	
+	def __init__(self, data: bytes = b"", offsets: Optional[numpy.ndarray] = None):
+		"""文字列の列を生成します。\n
+		:param data: 全文字列をUTF-8で連結したもの
+		:param offsets: 各文字列の開始位置（末尾に全体の長さを加えた，要素数＋1の配列）"""
+		self.__data: bytes = data
+		self.__offsets: numpy.ndarray = offsets if offsets is not None else numpy.zeros(1, dtype = numpy.int64)
+		self.__overrides: Dict[int, str] = dict( )
+	
+	@classmethod
+	def from_strings(cls, strings: Iterable[str]) -> "StringArena":
+		encoded: List[bytes] = list(map(lambda string: string.encode("utf-8"), strings))
+		offsets: numpy.ndarray = numpy.zeros(len(encoded) + 1, dtype = numpy.int64)
+		numpy.cumsum(numpy.fromiter(map(len, encoded), dtype = numpy.int64, count = len(encoded)), out = offsets[1: ])
+		return cls(b"".join(encoded), offsets)
+	
+	def __len__(self) -> int:
+		return len(self.__offsets) - 1
+	
+	def __getitem__(self, row: int) -> str:
+		if row in self.__overrides:
+			return self.__overrides[row]
+		return self.__data[self.__offsets[row]: self.__offsets[row + 1]].decode("utf-8")
+	
+	def __setitem__(self, row: int, value: str):
+		if not (0 <= row < len(self)):
+			raise IndexError(row)
+		self.__overrides[row] = value
+	
+	@property
+	def nbytes(self) -> int:
+		"""おおよそのメモリー使用量（書き換えた行を除く）"""
+		return len(self.__data) + self.__offsets.nbytes
+	
+	def take(self, rows: numpy.ndarray) -> "StringArena":
+		"""指定した行だけを持つ，新しい文字列の列を返します。"""
+		return StringArena.from_strings(map(self.__getitem__, rows.tolist( )))
+
+
+class LivedoorNewsTable:
+	"""Livedoorニュースの記事の表です。数値の列はNumPy配列，文字列の列はStringArenaで持ちます。"""
+	
+	def __init__(self, years: numpy.ndarray, months: numpy.ndarray, categories: numpy.ndarray, ids: numpy.ndarray, is_series: numpy.ndarray, titles: StringArena, summaries: StringArena, contents: StringArena):
+		"""表を生成します。\n
+		:param years: 公開年（int16）
+		:param months: 公開月（int8）
+		:param categories: 記事カテゴリー（int16）
+		:param ids: 記事ID（int64）
+		:param is_series: 記事タイプ（int8，直列→1，並列→0，不明→-1）
+		:param titles: 記事タイトル
+		:param summaries: 3行要約
+		:param contents: 記事の中身"""
+		self.years: numpy.ndarray = years
+		self.months: numpy.ndarray = months
+		self.categories: numpy.ndarray = categories
+		self.ids: numpy.ndarray = ids
+		self.is_series: numpy.ndarray = is_series
+		self.titles: StringArena = titles
+		self.summaries: StringArena = summaries
+		self.contents: StringArena = contents
+	
+	@classmethod
+	def from_records(cls, records: Iterable[Dict[str, Union[int, Optional[bool], str]]]) -> "LivedoorNewsTable":
+		"""JSON風の辞書の列から表を生成します。\n
+		:param records: LivedoorNews.dict_like_jsonと同じ形の辞書の列"""
+		columns: Tuple[List, ...] = (list( ), list( ), list( ), list( ), list( ), list( ), list( ), list( ))
+		for record in records:
+			columns[0].append(record.get("year"))
+			columns[1].append(record.get("month"))
+			columns[2].append(record.get("category"))
+			columns[3].append(record.get("id"))
+			columns[4].append(encode_is_series(record.get("is_series")))
+			columns[5].append(record.get("title") or "")
+			columns[6].append(record.get("summary") or "")
+			columns[7].append(record.get("content") or "")
+		return cls(numpy.array(columns[0], dtype = numpy.int16), numpy.array(columns[1], dtype = numpy.int8), numpy.array(columns[2], dtype = numpy.int16), numpy.array(columns[3], dtype = numpy.int64), numpy.array(columns[4], dtype = numpy.int8), StringArena.from_strings(columns[5]), StringArena.from_strings(columns[6]), StringArena.from_strings(columns[7]))
+	
+	def __len__(self) -> int:
+		return len(self.ids)
+	
+	def __getitem__(self, row: int) -> LivedoorNews:
+		if row < 0:
+			row += len(self)
+		if not (0 <= row < len(self)):
+			raise IndexError(row)
+		return LivedoorNews.view(self, row)
+	
+	def __iter__(self) -> Iterator[LivedoorNews]:
+		return map(lambda row: LivedoorNews.view(self, row), range(len(self)))
+	
+	@property
+	def nbytes(self) -> int:
+		"""おおよそのメモリー使用量"""
+		return self.years.nbytes + self.months.nbytes + self.categories.nbytes + self.ids.nbytes + self.is_series.nbytes + self.titles.nbytes + self.summaries.nbytes + self.contents.nbytes
+	
+	def mask(self, year: Optional[int] = None, month: Optional[int] = None, category: Optional[int] = None, is_series: Optional[bool] = None) -> numpy.ndarray:
+		"""条件に合う行をTrueとする配列を返します（Noneの条件は問いません）。"""
+		mask: numpy.ndarray = numpy.ones(len(self), dtype = bool)
+		if year is not None:
+			mask &= self.years == year
+		if month is not None:
+			mask &= self.months == month
+		if category is not None:
+			mask &= self.categories == category
+		if is_series is not None:
+			mask &= self.is_series == encode_is_series(is_series)
+		return mask
+	
+	def filter(self, year: Optional[int] = None, month: Optional[int] = None, category: Optional[int] = None, is_series: Optional[bool] = None) -> "LivedoorNewsTable":
+		"""条件に合う行だけの新しい表を返します（Noneの条件は問いません）。"""
+		return self.take(numpy.flatnonzero(self.mask(year, month, category, is_series)))
+	
+	def take(self, rows: numpy.ndarray) -> "LivedoorNewsTable":
+		"""指定した行だけの新しい表を返します。"""
+		return LivedoorNewsTable(self.years[rows], self.months[rows], self.categories[rows], self.ids[rows], self.is_series[rows], self.titles.take(rows), self.summaries.take(rows), self.contents.take(rows))
+	
+	def record(self, row: int) -> Dict[str, Union[int, Optional[bool], str]]:
+		"""1行をJSON風の辞書で返します。"""
 		return {
-			"year": self.__year,
-			"month": self.__month,
-			"category": self.__category,
-			"id": self.__id,
-			"is_series": self.__is_series,
-			"title": self.__title,
-			"summary": self.__summary,
-			"content": self.__content
-			}
+			"year": int(self.years[row]),
+			"month": int(self.months[row]),
+			"category": int(self.categories[row]),
+			"id": int(self.ids[row]),
+			"is_series": decode_is_series(self.is_series[row]),
+			"title": self.titles[row],
+			"summary": self.summaries[row],
+			"content": self.contents[row]
+		}
+	
+	def records(self) -> Iterator[Dict[str, Union[int, Optional[bool], str]]]:
+		"""全行をJSON風の辞書で1行ずつ返します。"""
+		return map(self.record, range(len(self)))
+
+
+def encode_is_series(is_series: Optional[bool]) -> int:
+	"""記事タイプを数値にします（直列→1，並列→0，不明→-1）。"""
+	return -1 if is_series is None else int(is_series)
+
+
+def decode_is_series(value: int) -> Optional[bool]:
+	"""数値にした記事タイプを戻します。"""
+	return None if value < 0 else bool(value)
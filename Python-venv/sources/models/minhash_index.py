@@ -0,0 +1,228 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from itertools import chain, islice
+import sqlite3
+import numpy
+
+
+# シングルのハッシュ値を作る多項式の係数（FNVの素数）
+SHINGLE_PRIME: numpy.uint64 = numpy.uint64(0x100000001b3)
+# 一度に計算するハッシュ関数の数（シングル数×この数の配列を作るため，メモリーを抑える）
+PERMUTATION_BLOCK: int = 16
+
+
+class MinHashIndex:
+	"""記事ごとのMinHashの署名と，LSHのバンドごとのバケット，バケットが同じになった記事の組（推定Jaccard類似度つき）を記録するSQLiteデータベースです。\n
+	署名は一度計算したら保存し，新しくクロールした記事や本文が変わった記事だけを追加して，既存のバケットと突き合わせます（既存の記事の署名は計算し直しません）。\n
+	記事は（分割，記事ID）で区別するため，同じ記事IDが複数の分割にある場合も重複として見つかります。"""
+	
+	def __init__(self, database_path: str, num_permutations: int = 128, bands: int = 16, shingle_size: int = 5, seed: int = 1):
+		"""索引を開きます（なければ作成します）。\n
+		:param database_path: SQLiteファイルのパス
+		:param num_permutations: 署名の長さ（ハッシュ関数の数）
+		:param bands: LSHのバンド数（num_permutationsを割り切る数，バンドあたりの行数をrとすると，類似度sの組が候補になる確率は1 - (1 - s^r)^bands）
+		:param shingle_size: シングル（本文の連続する文字）の文字数
+		:param seed: ハッシュ関数を決める乱数の種"""
+		if num_permutations % bands != 0:
+			raise ValueError("署名の長さ（" + str(num_permutations) + "）はバンド数（" + str(bands) + "）で割り切れる数にしてください。")
+		self.__database_path: str = database_path
+		self.__num_permutations: int = num_permutations
+		self.__bands: int = bands
+		self.__shingle_size: int = shingle_size
+		self.__seed: int = seed
+		self.__connection: sqlite3.Connection = sqlite3.connect(database_path, timeout = 60.0)
+		self.__connection.execute("PRAGMA journal_mode = WAL")
+		self.__connection.execute("PRAGMA synchronous = NORMAL")
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS minhash_parameters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+		# 本文が空の記事は署名をNULLにし，バケットに入れない
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS signatures (article INTEGER PRIMARY KEY, split TEXT NOT NULL, id INTEGER NOT NULL, source_hash TEXT NOT NULL, signature BLOB, UNIQUE (split, id))")
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS buckets (band INTEGER NOT NULL, key INTEGER NOT NULL, article INTEGER NOT NULL, PRIMARY KEY (band, key, article)) WITHOUT ROWID")
+		self.__connection.execute("CREATE INDEX IF NOT EXISTS buckets_article ON buckets (article)")
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS pairs (article_a INTEGER NOT NULL, article_b INTEGER NOT NULL, similarity REAL NOT NULL, PRIMARY KEY (article_a, article_b)) WITHOUT ROWID")
+		self.__connection.execute("CREATE INDEX IF NOT EXISTS pairs_article_b ON pairs (article_b)")
+		self.__connection.execute("CREATE TEMP TABLE IF NOT EXISTS new_buckets (band INTEGER NOT NULL, key INTEGER NOT NULL, article INTEGER NOT NULL)")
+		self.__check_parameters( )
+		self.__connection.commit( )
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	@property
+	def database_path(self) -> str:
+		return self.__database_path
+	
+	@property
+	def parameters(self) -> Dict[str, int]:
+		"""署名の計算に使う値（num_permutations，bands，shingle_size，seed）"""
+		return {"num_permutations": self.__num_permutations, "bands": self.__bands, "shingle_size": self.__shingle_size, "seed": self.__seed}
+	
+	def source_hashes(self) -> Dict[Tuple[str, int], str]:
+		"""（分割，記事ID）→署名を計算したときの本文のハッシュ値を返します。"""
+		return dict(map(lambda row: ((row[0], row[1]), row[2]), self.__connection.execute("SELECT split, id, source_hash FROM signatures")))
+	
+	def add_many(self, splits: Sequence[str], ids: Sequence[int], source_hashes: Sequence[str], signatures: numpy.ndarray, has_shingles: numpy.ndarray) -> int:
+		"""記事の署名を追加し（すでにあれば置き換え），バケットが同じになった記事との組を記録します。\n
+		:param splits: 記事ごとの分割の名前
+		:param ids: 記事ID
+		:param source_hashes: 本文のハッシュ値
+		:param signatures: 署名（記事数×num_permutations，uint32，minhash_signaturesの結果）
+		:param has_shingles: 本文が空でないか
+		:return: 記録した記事の組の数"""
+		keys: List[Tuple[str, int]] = list(zip(splits, map(int, ids)))
+		self.__connection.executemany("INSERT INTO signatures (split, id, source_hash, signature) VALUES (?, ?, ?, ?) ON CONFLICT (split, id) DO UPDATE SET source_hash = excluded.source_hash, signature = excluded.signature", map(lambda item: (item[0][0], item[0][1], item[1], item[2].tobytes( ) if item[3] else None), zip(keys, source_hashes, signatures, has_shingles)))
+		articles: numpy.ndarray = numpy.array(list(map(lambda key: self.__connection.execute("SELECT article FROM signatures WHERE split = ? AND id = ?", key).fetchone( )[0], keys)), dtype = numpy.int64)
+		# 本文が変わった記事の，前回のバケットと組を消す
+		self.__connection.executemany("DELETE FROM buckets WHERE article = ?", map(lambda article: (article, ), articles.tolist( )))
+		self.__connection.executemany("DELETE FROM pairs WHERE article_a = ? OR article_b = ?", map(lambda article: (article, article), articles.tolist( )))
+		indexed: numpy.ndarray = numpy.flatnonzero(numpy.asarray(has_shingles, dtype = bool))
+		rows: List[Tuple[int, int, int]] = list(zip(numpy.tile(numpy.arange(self.__bands), len(indexed)).tolist( ), band_keys(signatures[indexed], self.__bands).ravel( ).tolist( ), numpy.repeat(articles[indexed], self.__bands).tolist( )))
+		self.__connection.executemany("INSERT OR IGNORE INTO buckets (band, key, article) VALUES (?, ?, ?)", rows)
+		self.__connection.execute("DELETE FROM new_buckets")
+		self.__connection.executemany("INSERT INTO new_buckets (band, key, article) VALUES (?, ?, ?)", rows)
+		# 追加した記事どうしの組も含め，少なくとも1つのバンドが同じ記事の組（小さい方を先に）
+		candidates: List[Tuple[int, int]] = self.__connection.execute("SELECT DISTINCT MIN(new_buckets.article, buckets.article), MAX(new_buckets.article, buckets.article) FROM new_buckets JOIN buckets ON buckets.band = new_buckets.band AND buckets.key = new_buckets.key AND buckets.article != new_buckets.article").fetchall( )
+		if 0 < len(candidates):
+			known: Dict[int, numpy.ndarray] = dict(zip(articles[indexed].tolist( ), signatures[indexed]))
+			known.update(self.__signatures(set(chain.from_iterable(candidates)) - set(known.keys( ))))
+			left: numpy.ndarray = numpy.stack(list(map(lambda pair: known[pair[0]], candidates)))
+			right: numpy.ndarray = numpy.stack(list(map(lambda pair: known[pair[1]], candidates)))
+			self.__connection.executemany("INSERT OR REPLACE INTO pairs (article_a, article_b, similarity) VALUES (?, ?, ?)", map(lambda item: (item[0][0], item[0][1], item[1]), zip(candidates, similarities(left, right).tolist( ))))
+		self.__connection.commit( )
+		return len(candidates)
+	
+	def clusters(self, threshold: float = 0.8) -> List[Tuple[List[Tuple[str, int]], float]]:
+		"""推定Jaccard類似度がthreshold以上の組をつないだ，重複する記事のまとまりを返します（大きいものから）。\n
+		:param threshold: 重複とみなす推定Jaccard類似度の下限
+		:return: （（分割，記事ID）のリスト，まとまりの中の組の類似度の最小値）のリスト"""
+		pairs: List[Tuple[int, int, float]] = self.__connection.execute("SELECT article_a, article_b, similarity FROM pairs WHERE ? <= similarity", (threshold, )).fetchall( )
+		parents: Dict[int, int] = dict( )
+		for article_a, article_b, _ in pairs:
+			root_a, root_b = find_root(parents, article_a), find_root(parents, article_b)
+			if root_a != root_b:
+				parents[max(root_a, root_b)] = min(root_a, root_b)
+		members: Dict[int, List[int]] = dict( )
+		for article in parents.keys( ):
+			members.setdefault(find_root(parents, article), list( )).append(article)
+		minimum_similarities: Dict[int, float] = dict( )
+		for article_a, _, similarity in pairs:
+			root: int = find_root(parents, article_a)
+			minimum_similarities[root] = min(minimum_similarities.get(root, 1.0), similarity)
+		names: Dict[int, Tuple[str, int]] = self.__names(list(parents.keys( )))
+		clusters: List[Tuple[List[Tuple[str, int]], float]] = list(map(lambda item: (sorted(map(names.get, item[1])), minimum_similarities[item[0]]), members.items( )))
+		return sorted(clusters, key = lambda cluster: (-len(cluster[0]), cluster[0]))
+	
+	def counts(self) -> Dict[str, int]:
+		"""署名を記録した記事数（articles），本文が空の記事数（empty），記録した記事の組の数（pairs）を返します。"""
+		articles, empty = self.__connection.execute("SELECT COUNT(*), COUNT(*) - COUNT(signature) FROM signatures").fetchone( )
+		return {"articles": articles, "empty": empty, "pairs": self.__connection.execute("SELECT COUNT(*) FROM pairs").fetchone( )[0]}
+	
+	def close(self):
+		self.__connection.close( )
+	
+	def __check_parameters(self):
+		"""署名の計算に使う値を記録します（記録済みなら，同じ値かを確かめます）。"""
+		recorded: Dict[str, int] = dict(self.__connection.execute("SELECT key, value FROM minhash_parameters").fetchall( ))
+		if len(recorded) < 1:
+			self.__connection.executemany("INSERT INTO minhash_parameters (key, value) VALUES (?, ?)", self.parameters.items( ))
+			return
+		if recorded != self.parameters:
+			raise ValueError(self.__database_path + " は " + str(recorded) + " で署名を計算してあります（今回：" + str(self.parameters) + "）。別のファイルを指定してください。")
+	
+	def __signatures(self, articles: set) -> Dict[int, numpy.ndarray]:
+		"""記録済みの記事の署名を読み込みます。"""
+		signatures: Dict[int, numpy.ndarray] = dict( )
+		article_iterator = iter(sorted(articles))
+		# SQLiteの変数の数の上限を超えないように分けて読む
+		for chunk in iter(lambda: list(islice(article_iterator, 500)), [ ]):
+			rows: List[Tuple[int, bytes]] = self.__connection.execute("SELECT article, signature FROM signatures WHERE article IN (" + ", ".join("?" * len(chunk)) + ")", chunk).fetchall( )
+			signatures.update(map(lambda row: (row[0], numpy.frombuffer(row[1], dtype = numpy.uint32)), rows))
+		return signatures
+	
+	def __names(self, articles: List[int]) -> Dict[int, Tuple[str, int]]:
+		"""記事の番号→（分割，記事ID）を返します。"""
+		names: Dict[int, Tuple[str, int]] = dict( )
+		article_iterator = iter(articles)
+		for chunk in iter(lambda: list(islice(article_iterator, 500)), [ ]):
+			names.update(map(lambda row: (row[0], (row[1], row[2])), self.__connection.execute("SELECT article, split, id FROM signatures WHERE article IN (" + ", ".join("?" * len(chunk)) + ")", chunk)))
+		return names
+
+
+def find_root(parents: Dict[int, int], article: int) -> int:
+	"""Union-Findの根を返します（たどった記事は根に付け替えます）。"""
+	root: int = parents.setdefault(article, article)
+	while parents[root] != root:
+		root = parents[root]
+	while parents[article] != root:
+		parents[article], article = root, parents[article]
+	return root
+
+
+def shingle_hashes(text: str, shingle_size: int = 5) -> numpy.ndarray:
+	"""本文のシングル（shingle_size文字ずつずらした連続する文字）のハッシュ値を，文字コードの配列からまとめて計算します。\n
+	Pythonのhashは実行ごとに値が変わるため使わず，プロセスや実行をまたいで同じ値になるようにします。\n
+	:param text: 正規化した本文
+	:param shingle_size: シングルの文字数（本文がこれより短ければ本文全体をひとつのシングルにします）
+	:return: シングルごとのハッシュ値（uint64）"""
+	codes: numpy.ndarray = numpy.frombuffer(text.encode("utf-32-le"), dtype = numpy.uint32).astype(numpy.uint64)
+	size: int = min(shingle_size, len(codes))
+	if size < 1:
+		return numpy.zeros(0, dtype = numpy.uint64)
+	hashes: numpy.ndarray = numpy.zeros(len(codes) - size + 1, dtype = numpy.uint64)
+	for offset in range(size):
+		hashes = hashes * SHINGLE_PRIME + codes[offset: len(codes) - size + 1 + offset]
+	return mix_bits(hashes)
+
+
+def permutations(num_permutations: int = 128, seed: int = 1) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""MinHashのハッシュ関数h(x) = (a × x + b mod 2^64)の上位32ビット（aは奇数）の，aとbを返します。"""
+	generator: numpy.random.Generator = numpy.random.default_rng(seed)
+	multipliers: numpy.ndarray = generator.integers(0, numpy.iinfo(numpy.uint64).max, size = num_permutations, dtype = numpy.uint64, endpoint = True) | numpy.uint64(1)
+	increments: numpy.ndarray = generator.integers(0, numpy.iinfo(numpy.uint64).max, size = num_permutations, dtype = numpy.uint64, endpoint = True)
+	return multipliers, increments
+
+
+def minhash_signatures(texts: Sequence[str], shingle_size: int = 5, num_permutations: int = 128, seed: int = 1) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""本文のまとまりのMinHashの署名を計算します。全ての本文のシングルを1本の配列に並べ，ハッシュ関数PERMUTATION_BLOCK個ずつ，記事ごとの最小値をまとめて求めます。\n
+	:param texts: 正規化した本文のリスト
+	:param shingle_size: シングルの文字数
+	:param num_permutations: 署名の長さ（ハッシュ関数の数）
+	:param seed: ハッシュ関数を決める乱数の種
+	:return: （署名（記事数×num_permutations，uint32，本文が空の記事は全て最大値），本文が空でないか）"""
+	shingles: List[numpy.ndarray] = list(map(lambda text: shingle_hashes(text, shingle_size), texts))
+	lengths: numpy.ndarray = numpy.fromiter(map(len, shingles), dtype = numpy.int64, count = len(shingles))
+	signatures: numpy.ndarray = numpy.full((len(texts), num_permutations), numpy.iinfo(numpy.uint32).max, dtype = numpy.uint32)
+	has_shingles: numpy.ndarray = 0 < lengths
+	if not numpy.any(has_shingles):
+		return signatures, has_shingles
+	hashes: numpy.ndarray = numpy.concatenate(shingles)
+	# シングルのある記事の，最初のシングルの位置
+	starts: numpy.ndarray = (numpy.cumsum(lengths) - lengths)[has_shingles]
+	multipliers, increments = permutations(num_permutations, seed)
+	for block in range(0, num_permutations, PERMUTATION_BLOCK):
+		values: numpy.ndarray = ((multipliers[block: block + PERMUTATION_BLOCK, None] * hashes[None, :] + increments[block: block + PERMUTATION_BLOCK, None]) >> numpy.uint64(32)).astype(numpy.uint32)
+		signatures[has_shingles, block: block + PERMUTATION_BLOCK] = numpy.minimum.reduceat(values, starts, axis = 1).T
+	return signatures, has_shingles
+
+
+def band_keys(signatures: numpy.ndarray, bands: int = 16) -> numpy.ndarray:
+	"""署名をバンドに分け，バンドごとの値をひとつのハッシュ値（SQLiteに入れられるint64）にします。\n
+	:return: 記事数×バンド数のハッシュ値"""
+	rows: numpy.ndarray = signatures.reshape(len(signatures), bands, -1).astype(numpy.uint64)
+	keys: numpy.ndarray = numpy.zeros((len(signatures), bands), dtype = numpy.uint64)
+	for row in range(rows.shape[2]):
+		keys = keys * SHINGLE_PRIME + rows[:, :, row]
+	return mix_bits(keys).view(numpy.int64)
+
+
+def similarities(left: numpy.ndarray, right: numpy.ndarray) -> numpy.ndarray:
+	"""署名の組ごとの推定Jaccard類似度（署名の値が一致する割合）を返します。"""
+	return (left == right).mean(axis = 1)
+
+
+def mix_bits(values: numpy.ndarray) -> numpy.ndarray:
+	"""64ビットの値のビットをかき混ぜます（splitmix64の最後の段）。"""
+	values = (values ^ (values >> numpy.uint64(30))) * numpy.uint64(0xbf58476d1ce4e5b9)
+	values = (values ^ (values >> numpy.uint64(27))) * numpy.uint64(0x94d049bb133111eb)
+	return values ^ (values >> numpy.uint64(31))
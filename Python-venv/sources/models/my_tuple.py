@@ -1,55 +1,193 @@
 from functools import reduce
-from typing import Callable, Iterable, Any, Optional
+from typing import Callable, Dict, Iterable, Iterator, Any, List, Optional, Tuple, Deque
 from logging import Logger
+from collections import deque
+from itertools import islice
 from multiprocessing import Pool
-from multiprocessing.pool import IMapIterator
+from multiprocessing.pool import AsyncResult
 import multiprocessing
+import threading
+import inspect
+import pickle
+import queue
+import atexit
 
 
 class MyTuple(tuple):
-	"""map，reduce，filterをメソッドとして実装した，独自tupleです。"""
+	"""map，reduce，filterをメソッドとして実装した，独自tupleです。\n
+	imapより後のmap，filterは，モジュールの（pickleできる）関数なら別プロセス側でひとつの関数にまとめて実行し，lambdaなどはこのプロセスで実行します。結果はtupleやlistを取り出すまで計算しません。"""
 	
 	def __init__(self, iterator: Iterable):
 		# super(MyTuple, self).__init__(iterator)
 		self.__iterator: Iterable = iterator
+		# 別プロセスでまとめて実行する，まだ実行していない処理（（"map" / "filter"，関数）のリスト）
+		self.__stages: List[Tuple[str, Callable]] = list( )
+		self.__num_of_process: int = 1
+		self.__ordered: bool = True
+		self.__chunksize: Optional[int] = None
 	
 	@property
 	def tuple(self) -> tuple:
-		"""処理結果を標準tupleで返します。"""
-		return tuple(self.__iterator)
+		"""処理結果を標準tupleで返します（結果は一度だけ計算して保持するため，何度取り出しても同じです）。"""
+		return self.to_tuple( ).__iterator
 	
 	@property
 	def list(self) -> list:
-		"""処理結果を標準listで返します。"""
-		return list(self.__iterator)
+		"""処理結果を標準listで返します（結果は一度だけ計算して保持するため，何度取り出しても同じです）。"""
+		return list(self.to_tuple( ).__iterator)
 	
 	def to_tuple(self):
-		self.__iterator = tuple(self.__iterator)
+		self.__iterator = tuple(self.__flushed( ))
 		return self
 	
 	def map(self, function: Callable):
-		"""引数の写像を計算します。"""
-		self.__iterator = map(function, self.__iterator)
+		"""引数の写像を計算します（imapの後でモジュールの関数なら，別プロセス側でimapの関数に続けて計算します）。"""
+		if 0 < len(self.__stages) and is_module_function(function):
+			self.__stages.append(("map", function))
+		else:
+			self.__iterator = map(function, self.__flushed( ))
 		return self
 	
-	def imap(self, function: Callable, num_of_process: int = multiprocessing.cpu_count( ) - 1):
-		"""引数の写像を並列（別プロセス）で計算します。"""
-		with Pool(processes = num_of_process) as pool:
-			result: IMapIterator = pool.imap(function, self.__iterator)
-			self.__iterator = tuple(result)
+	def imap(self, function: Callable, num_of_process: int = max(multiprocessing.cpu_count( ) - 1, 1), ordered: bool = True, chunksize: Optional[int] = None):
+		"""引数の写像を並列（別プロセス）で計算します。\n
+		プロセスプールは同じプロセス数のもの（shared_pool）を使い回し，結果は取り出すときに少しずつ計算します。\n
+		:param function: 関数（別プロセスに渡すため，lambdaでなくモジュールの関数であること）
+		:param num_of_process: プロセス数
+		:param ordered: 元の順番どおりに返すか（Falseで終わった順に返すため速い）
+		:param chunksize: 1プロセスにまとめて渡す要素数（Noneで要素数とプロセス数から自動で決めます）"""
+		self.__stages.append(("map", function))
+		self.__num_of_process = max(num_of_process, 1)
+		self.__ordered = self.__ordered and ordered
+		self.__chunksize = chunksize if chunksize is not None else self.__chunksize
 		return self
 	
 	def reduce(self, function: Callable):
 		"""畳み込み演算します。"""
-		self.__iterator = reduce(function, self.__iterator)
+		self.__iterator = reduce(function, self.__flushed( ))
 		return self
 	
 	def filter(self, function: Callable[[Any], bool]):
-		"""抽出をします。"""
-		self.__iterator = filter(function, self.__iterator)
+		"""抽出をします（imapの後でモジュールの関数なら，別プロセス側で抽出します）。"""
+		if 0 < len(self.__stages) and is_module_function(function):
+			self.__stages.append(("filter", function))
+		else:
+			self.__iterator = filter(function, self.__flushed( ))
 		return self
 	
 	def print_count(self, message: str = "", logger: Optional[Logger] = None):
-		self.__iterator = tuple(self.__iterator)
+		self.__iterator = tuple(self.__flushed( ))
 		logger.info(message + str(len(self.__iterator))) if logger is not None else print(message + str(len(self.__iterator)))
 		return self
+	
+	def __flushed(self) -> Iterable:
+		"""別プロセスで実行する処理があれば，まとめてプロセスプールに流すイテレーターにします。"""
+		if len(self.__stages) < 1:
+			return self.__iterator
+		length: Optional[int] = len(self.__iterator) if hasattr(self.__iterator, "__len__") else None
+		chunksize: int = self.__chunksize if self.__chunksize is not None else auto_chunksize(length, self.__num_of_process)
+		self.__iterator = parallel_map(FusedStages(tuple(self.__stages)), self.__iterator, self.__num_of_process, self.__ordered, chunksize)
+		self.__stages = list( )
+		self.__ordered = True
+		self.__chunksize = None
+		return self.__iterator
+
+
+class FusedStages:
+	"""続けて行うmap，filterをひとつにまとめた，別プロセスで実行する関数です。\n
+	filterで除いた要素も含めて，（残すか，値）を返します（入力1件に出力1件とするため）。"""
+	
+	def __init__(self, stages: Tuple[Tuple[str, Callable], ...]):
+		self.__stages: Tuple[Tuple[str, Callable], ...] = stages
+	
+	def __call__(self, value: Any) -> Tuple[bool, Any]:
+		for kind, function in self.__stages:
+			if kind == "map":
+				value = function(value)
+			elif not function(value):
+				return False, None
+		return True, value
+
+
+# 自動で決める，1プロセスにまとめて渡す要素数の上限
+MAX_AUTO_CHUNKSIZE: int = 4096
+# プロセス数→使い回すプロセスプール
+shared_pools: Dict[int, Any] = dict( )
+shared_pools_lock: threading.Lock = threading.Lock( )
+
+
+def shared_pool(num_of_process: int = max(multiprocessing.cpu_count( ) - 1, 1)):
+	"""プロセス数ごとにひとつだけ作り，このプロセスが終わるまで使い回すプロセスプールを返します。"""
+	with shared_pools_lock:
+		if num_of_process not in shared_pools:
+			shared_pools[num_of_process] = Pool(processes = num_of_process)
+		return shared_pools[num_of_process]
+
+
+def close_shared_pools( ):
+	"""使い回しているプロセスプールをすべて終了します。"""
+	with shared_pools_lock:
+		for pool in shared_pools.values( ):
+			pool.close( )
+			pool.join( )
+		shared_pools.clear( )
+
+
+atexit.register(close_shared_pools)
+
+
+def is_module_function(function: Callable) -> bool:
+	"""別プロセスでまとめて実行する，モジュールの（pickleできる）関数かを返します（lambda，関数の中で定義した関数，メソッド，printなどの組み込み関数はこのプロセスで実行します）。"""
+	if not inspect.isfunction(function) or "<locals>" in function.__qualname__:
+		return False
+	try:
+		pickle.dumps(function)
+		return True
+	except Exception:
+		return False
+
+
+def auto_chunksize(length: Optional[int], num_of_process: int) -> int:
+	"""1プロセスにまとめて渡す要素数を決めます（要素数が分かればPool.mapと同じく1プロセスあたり4回に分ける，分からなければ32）。\n
+	まとまりはこのプロセスでリストにしてから渡すため，MAX_AUTO_CHUNKSIZE個までにします。"""
+	if length is None:
+		return 32
+	chunksize, extra = divmod(length, num_of_process * 4)
+	return min(max(chunksize + (1 if extra else 0), 1), MAX_AUTO_CHUNKSIZE)
+
+
+def parallel_map(function: FusedStages, iterable: Iterable, num_of_process: int, ordered: bool, chunksize: int) -> Iterator:
+	"""使い回すプロセスプールで写像を計算し，filterで除いたもの以外を少しずつ返します。\n
+	入力（imapより前のmap，filterを含む）は，プールの内部のスレッドでなく，結果を取り出すこのスレッドでchunksize個ずつ計算してプールに渡します（入力の計算が同じプールを使うと，内部のスレッドが止まって進まなくなるため）。\n
+	処理中・取り出し待ちのまとまりは（プロセス数×4）個までに抑えます（入力を先に全部読み込まないため）。"""
+	pool = shared_pool(num_of_process)
+	iterator: Iterator = iter(iterable)
+	chunks: Iterator[list] = iter(lambda: list(islice(iterator, chunksize)), [ ])
+	max_in_flight: int = num_of_process * 4
+	if ordered:
+		pending: Deque[AsyncResult] = deque( )
+		for chunk in chunks:
+			pending.append(pool.map_async(function, chunk, len(chunk)))
+			if max_in_flight <= len(pending):
+				yield from kept_values(pending.popleft( ).get( ))
+		while 0 < len(pending):
+			yield from kept_values(pending.popleft( ).get( ))
+		return
+	# 終わった順に受け取る（例外もそのまま受け取り，取り出したときに送出する）
+	finished: queue.SimpleQueue = queue.SimpleQueue( )
+	in_flight: int = 0
+	for chunk in chunks:
+		pool.map_async(function, chunk, len(chunk), callback = finished.put, error_callback = finished.put)
+		in_flight += 1
+		if max_in_flight <= in_flight:
+			in_flight -= 1
+			yield from kept_values(finished.get( ))
+	while 0 < in_flight:
+		in_flight -= 1
+		yield from kept_values(finished.get( ))
+
+
+def kept_values(results: Any) -> Iterator:
+	"""まとまりの（残すか，値）のリストから，filterで除いたもの以外の値を返します（例外なら送出します）。"""
+	if isinstance(results, BaseException):
+		raise results
+	return map(lambda result: result[1], filter(lambda result: result[0], results))
@@ -0,0 +1,138 @@
+# Apache License, Version 2.0の「mojimoji」（by Studio Ousia）を用いています。
+from typing import Dict, Pattern, Match, Union
+from functools import lru_cache
+from kanjize import kanji2int
+import re
+import mojimoji
+import unicodedata
+
+
+# 半角→全角にする記号
+SIGN_HALF: str = "\"#%&'()*+" + "<=>?@" + "[\\]^`" + "{|}~" + "‐"
+SIGN_FULL: str = "＂＃％＆＇（）＊＋" + "＜＝＞？＠" + "［＼］＾｀" + "｛｜｝〜" + "-"
+SIGN_TABLE: Dict[int, int] = str.maketrans(SIGN_HALF, SIGN_FULL)
+# 全角英数字→半角英数字
+LATIN_FULL: str = "".join(map(chr, list(range(0xff10, 0xff10 + 10)) + list(range(0xff21, 0xff21 + 26)) + list(range(0xff41, 0xff41 + 26))))
+LATIN_HALF: str = "".join(map(chr, list(range(0x0030, 0x0030 + 10)) + list(range(0x0041, 0x0041 + 26)) + list(range(0x0061, 0x0061 + 26))))
+LATIN_TABLE: Dict[int, int] = str.maketrans(LATIN_FULL, LATIN_HALF)
+# 漢数字
+KANJI_NUMBER_PATTERN: Pattern = re.compile("[〇一二三四五六七八九十百千万億兆]{1,}")
+# 位取りがなく，数字だけが並んでるパターン（例：「二五二」であって「二百五十二」でない）
+DIVIDED_KANJI_NUMBER_PATTERN: Pattern = re.compile("[〇一二三四五六七八九]{1,}")
+KANJI_DIGIT_TABLE: Dict[int, int] = str.maketrans("〇一二三四五六七八九", "0123456789")
+KANJI_DIGITS: Dict[str, int] = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+KANJI_SMALL_UNITS: Dict[str, int] = {"十": 10, "百": 100, "千": 1000}
+KANJI_LARGE_UNITS: Dict[str, int] = {"万": 10 ** 4, "億": 10 ** 8, "兆": 10 ** 12}
+# 「　」{2, ∞}
+SPACES_PATTERN: Pattern = re.compile("[ 　]{2,}")
+
+
+class NormaliserEngine:
+	"""StringNormaliser.normaliseの6段の処理を，表や正規表現を一度だけ作っておき，まとめて行う正規化器です。\n
+	文字単位の置き換え（改行→空白，半角記号→全角，全角英数字→半角）はひとつのtranslateにまとめ，漢数字は専用の変換器で1回の走査で算用数字にします。
+	結果はstaged_normalise（段ごとの処理）や，benchmark_normaliser.original_normalise（NormaliserEngineを入れる前の処理）と完全に一致します。"""
+	
+	def __init__(self):
+		# CRLFは「　」ふたつになるが，後の「　」{2, ∞}→「　」{1}で従来どおりひとつになる
+		self.__table: Dict[int, Union[int, str]] = {ord("\r"): "　", ord("\n"): "　"}
+		self.__table.update(SIGN_TABLE)
+		self.__table.update(LATIN_TABLE)
+	
+	def normalise(self, string: str, delimiter: str = "。") -> str:
+		"""フルコースで文字列を正規化します（StringNormaliser.normaliseと同じ結果）。\n
+		:param string: 正規化前文字列
+		:param delimiter: 文区切り文字（例：「。」）
+		:return: 正規化後の文字列"""
+		if not is_fusable_delimiter(delimiter):
+			return staged_normalise(string, delimiter)
+		translated: str = unicodedata.normalize("NFD", string).translate(self.__table)
+		spaces_replaced: str = SPACES_PATTERN.sub("　", delimiter_pattern(delimiter).sub(delimiter, translated))
+		kan_suji_replaced: str = KANJI_NUMBER_PATTERN.sub(kanji_number_to_arabic_number_fast, spaces_replaced)
+		return mojimoji.han_to_zen(kan_suji_replaced, digit = False, ascii = False)
+
+
+@lru_cache(maxsize = None)
+def is_fusable_delimiter(delimiter: str) -> bool:
+	"""区切り文字が，translateを空白の除去より先に行っても結果が変わらないもの（正規表現の特殊文字，空白，改行，置き換え対象の文字を含まない）かを返します。"""
+	translated_characters: str = SIGN_HALF + SIGN_FULL + LATIN_FULL + LATIN_HALF + " 　\r\n"
+	return re.escape(delimiter) == delimiter and all(map(lambda character: character not in translated_characters, delimiter))
+
+
+@lru_cache(maxsize = None)
+def delimiter_pattern(delimiter: str) -> Pattern:
+	"""delimiterCRLF or SPACEの正規表現（区切り文字ごとに一度だけコンパイル）"""
+	return re.compile(delimiter + "(([ 　]{0,}(\r\n)|(\n)|(\r))|([ 　]{1,}))")
+
+
+def kanji_number_to_arabic_number_fast(kanji_match: Match) -> str:
+	"""漢数字を算用数字にします（kanjize.kanji2intと同じ解釈を1回の走査で）。"""
+	kanji_string: str = kanji_match.group(0)
+	digits: str = kanji_string.translate(KANJI_DIGIT_TABLE)
+	if digits.isascii( ):
+		return digits
+	# kanji2intと同じく，位取りがある場合の「〇」は無視する
+	result: int = 0
+	section: int = 0
+	digit: int = 0
+	for kanji in kanji_string:
+		if kanji in KANJI_DIGITS:
+			digit = KANJI_DIGITS[kanji]
+		elif kanji in KANJI_SMALL_UNITS:
+			section += (digit if digit else 1) * KANJI_SMALL_UNITS[kanji]
+			digit = 0
+		elif kanji in KANJI_LARGE_UNITS:
+			result += (section + digit) * KANJI_LARGE_UNITS[kanji]
+			section = 0
+			digit = 0
+	return str(result + section + digit)
+
+
+def staged_normalise(string: str, delimiter: str = "。") -> str:
+	"""従来どおり段ごとに文字列を正規化します（NormaliserEngineの差分確認の基準）。"""
+	unicode_normalised: str = unicode_normalise(string)
+	crlf2space1: str = replace_carriage_return_line_feed_to_space(unicode_normalised)
+	# 今回あまり必要なさそうだが，↑により空白2連続が発生する可能性があるため，念のため。
+	crlf2space2: str = replace_crlf_to_space_with_delimiter(crlf2space1, delimiter)
+	sign_replaced: str = replace_sign_to_full_width(crlf2space2)
+	kan_suji_replaced: str = replace_number_to_arabic(sign_replaced)
+	return replace_full_to_half_width(kan_suji_replaced)
+
+
+def unicode_normalise(string: str) -> str:
+	"""Unicode正規化形式Dに正規化します。"""
+	return unicodedata.normalize("NFD", string)
+
+
+def replace_carriage_return_line_feed_to_space(before_string: str) -> str:
+	"""CRLF，LF，CRを空白文字に置き換えます。"""
+	return before_string.replace("\r\n", "　").replace("\n", "　").replace("\r", "　")
+
+
+def replace_crlf_to_space_with_delimiter(before_string: str, delimiter: str) -> str:
+	"""delimiterCRLF or SPACE→除去，[^delimiter]*CRLF→置換，「　」{2, ∞}→「　」{1}　※ delimiter：（例：「。」）"""
+	remove_crlf: str = delimiter_pattern(delimiter).sub(delimiter, before_string)
+	replaced_crlf: str = replace_carriage_return_line_feed_to_space(remove_crlf)
+	return SPACES_PATTERN.sub("　", replaced_crlf)
+
+
+def replace_sign_to_full_width(before_string: str) -> str:
+	"""ASCII半角記号は正規表現などいろいろと影響しそうなので全角記号に置き換えます。"""
+	return before_string.translate(SIGN_TABLE)
+
+
+def replace_number_to_arabic(before_string: str) -> str:
+	"""漢数字を算用数字に置き換えます。"""
+	return KANJI_NUMBER_PATTERN.sub(kanji_number_to_arabic_number, before_string)
+
+
+def kanji_number_to_arabic_number(kanji_match: Match) -> str:
+	kanji_string: str = kanji_match.group(0)
+	if DIVIDED_KANJI_NUMBER_PATTERN.fullmatch(kanji_string):
+		return "".join(map(lambda kanji: str(kanji2int(kanji)), kanji_string))
+	return str(kanji2int(kanji_string))
+
+
+def replace_full_to_half_width(before_string: str) -> str:
+	"""英数字は半角に揃えます。"""
+	translate_latin: str = before_string.translate(LATIN_TABLE)
+	return mojimoji.han_to_zen(translate_latin, digit = False, ascii = False)
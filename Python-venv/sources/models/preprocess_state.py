@@ -0,0 +1,34 @@
+from typing import Dict, Iterable, Tuple
+import sqlite3
+
+
+class PreprocessState:
+	"""前処理した記事IDごとの，元の記事のハッシュ値を記録するSQLiteデータベースです（元の記事が変わっていなければ前処理を飛ばすため）。"""
+	
+	def __init__(self, database_path: str):
+		"""状態データベースを開きます（なければ作成します）。\n
+		:param database_path: SQLiteファイルのパス"""
+		self.__connection: sqlite3.Connection = sqlite3.connect(database_path)
+		self.__connection.execute("PRAGMA journal_mode = WAL")
+		self.__connection.execute("PRAGMA synchronous = NORMAL")
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS preprocess_state (id INTEGER PRIMARY KEY, source_hash TEXT NOT NULL)")
+		self.__connection.commit( )
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	def source_hashes(self) -> Dict[int, str]:
+		"""記事ID→前処理したときの元の記事のハッシュ値を返します。"""
+		return dict(self.__connection.execute("SELECT id, source_hash FROM preprocess_state"))
+	
+	def mark_many(self, rows: Iterable[Tuple[int, str]]):
+		"""前処理した記事を記録します。\n
+		:param rows: （記事ID，元の記事のハッシュ値）のイテラブル"""
+		self.__connection.executemany("INSERT OR REPLACE INTO preprocess_state (id, source_hash) VALUES (?, ?)", rows)
+		self.__connection.commit( )
+	
+	def close(self):
+		self.__connection.close( )
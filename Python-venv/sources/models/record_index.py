@@ -0,0 +1,94 @@
+from typing import Dict, Iterator, Optional, Union
+from array import array
+from pathlib import Path
+import json
+import mmap
+
+
+class RecordIndex:
+	"""JSON配列（csv_to_json.pyの整形した出力）またはJSONLの，各レコードの（開始，終了）バイト位置の索引です。\n
+	索引は「（データファイル名）.idx」に，レコードごとに符号なし64ビット整数2つ（開始，終了）で保存します。"""
+	
+	# 1レコードあたりのバイト数（開始，終了の2つ）
+	RECORD_BYTES: int = array("Q").itemsize * 2
+	
+	@staticmethod
+	def index_path(data_path: str) -> str:
+		"""データファイルに対応する索引ファイルのパスを返します。"""
+		return data_path + ".idx"
+	
+	@staticmethod
+	def is_fresh(data_path: str) -> bool:
+		"""索引がデータファイルより新しいか（作り直す必要がないか）を返します。"""
+		index_path: Path = Path(RecordIndex.index_path(data_path))
+		return index_path.exists( ) and Path(data_path).stat( ).st_mtime <= index_path.stat( ).st_mtime
+	
+	@staticmethod
+	def build(data_path: str) -> int:
+		"""データファイルを先頭から1回だけ走査して索引を作ります。\n
+		JSONLは1行が1レコード，JSON配列は「\\t{」の行から「\\t}」で始まる行までが1レコードです（csv_to_json.pyの出力形式）。\n
+		:param data_path: データファイルのパス
+		:return: レコード数"""
+		is_jsonl: bool = data_path.endswith(".jsonl")
+		offsets: array = array("Q")
+		position: int = 0
+		start: Optional[int] = None
+		with open(data_path, mode = "rb") as data_file:
+			for line in data_file:
+				if is_jsonl:
+					if line.strip( ) != b"":
+						offsets.extend((position, position + len(line.rstrip( ))))
+				elif line.rstrip( ) == b"\t{":
+					start = position + 1
+				elif start is not None and line.startswith(b"\t}"):
+					offsets.extend((start, position + 2))
+					start = None
+				position += len(line)
+		with open(RecordIndex.index_path(data_path), mode = "wb") as index_file:
+			offsets.tofile(index_file)
+		return len(offsets) // 2
+
+
+class RecordRangeReader:
+	"""索引を使い，データファイルをメモリーマップして，指定した範囲のレコードだけを読み込みます。"""
+	
+	def __init__(self, data_path: str):
+		"""読み込み器を開きます（索引がないか古ければ作ります）。\n
+		:param data_path: データファイルのパス"""
+		if not RecordIndex.is_fresh(data_path):
+			RecordIndex.build(data_path)
+		self.__data_file = open(data_path, mode = "rb")
+		self.__index_file = open(RecordIndex.index_path(data_path), mode = "rb")
+		self.__length: int = Path(RecordIndex.index_path(data_path)).stat( ).st_size // RecordIndex.RECORD_BYTES
+		# 空ファイルはメモリーマップできない
+		self.__data: Optional[mmap.mmap] = mmap.mmap(self.__data_file.fileno( ), 0, access = mmap.ACCESS_READ) if 0 < Path(data_path).stat( ).st_size else None
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	def __len__(self) -> int:
+		return self.__length
+	
+	def read(self, range_from: int = 0, range_to: int = 0) -> Iterator[Dict[str, Union[int, Optional[bool], str]]]:
+		"""指定した範囲のレコードを1件ずつ読み込みます。索引も範囲の部分だけを読み込みます。\n
+		:param range_from: 何番目のレコードから読み込むか
+		:param range_to: 何番目の手前までのレコードを読み込むか（0で最後まで）
+		:return: レコードのイテレーター"""
+		range_to = self.__length if range_to == 0 else min(range_to, self.__length)
+		range_from = max(range_from, 0)
+		if range_to <= range_from:
+			return
+		offsets: array = array("Q")
+		self.__index_file.seek(range_from * RecordIndex.RECORD_BYTES)
+		offsets.fromfile(self.__index_file, (range_to - range_from) * 2)
+		for i in range(0, len(offsets), 2):
+			yield json.loads(self.__data[offsets[i]: offsets[i + 1]].decode("utf-8"))
+	
+	def close(self):
+		if self.__data is not None:
+			self.__data.close( )
+		self.__data_file.close( )
+		self.__index_file.close( )
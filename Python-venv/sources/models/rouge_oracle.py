@@ -0,0 +1,312 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from itertools import chain, count
+from pathlib import Path
+import numpy
+
+
+# 要約の行数（3行より少なければ空の行を補い，多ければ4行目以降を3行目に含める）
+SUMMARY_LINES: int = 3
+# 指標の並び（scoresの最後の軸）
+METRICS: Tuple[str, ...] = ("rouge1", "rouge2", "rougeL")
+# ROUGE-Lのビット並列計算で，1語に入れる要約の行の形態素数
+WORD_BITS: int = 64
+# バイトの値→1のビットの数
+BYTE_POPCOUNTS: numpy.ndarray = numpy.unpackbits(numpy.arange(256, dtype = numpy.uint8)[:, None], axis = 1).sum(axis = 1, dtype = numpy.uint8)
+
+
+class OracleWriter:
+	"""本文の文ごとの，要約の各行に対するROUGEのF値とオラクルのラベルを，記事を平らに並べた配列に書き出します。\n
+	「（名前）.rouge.bin」：文ごとに（要約の行3つ×ROUGE-1 / 2 / L）のF値（float16）をすべての記事について連結したもの（追記しながら書き出すため，全記事をメモリーに載せません）\n
+	「（名前）.oracle_labels.bin」：文ごとのラベル（uint8，ビットlが立っていれば要約のl行目に最も近い文）\n
+	「（名前）.oracle_offsets.npy」：記事ごとの最初の文の位置と，最後の記事の終わり（int64，記事数 + 1個）\n
+	「（名前）.oracle_ids.npy」：記事ID（int64）"""
+	
+	def __init__(self, directory_path: str, prefix: str):
+		"""書き込み器を開きます（既存のものは上書きします）。\n
+		:param directory_path: 書き出すディレクトリー
+		:param prefix: ファイル名の前半"""
+		self.__directory_path: Path = Path(directory_path)
+		self.__directory_path.mkdir(parents = True, exist_ok = True)
+		self.__prefix: str = prefix
+		self.__scores_file = open(str(scores_path(self.__directory_path, prefix)), mode = "wb")
+		self.__labels_file = open(str(labels_path(self.__directory_path, prefix)), mode = "wb")
+		self.__offsets: List[numpy.ndarray] = [numpy.zeros(1, dtype = numpy.int64)]
+		self.__position: int = 0
+		self.__ids: List[numpy.ndarray] = list( )
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	def write_many(self, ids: numpy.ndarray, sentence_counts: numpy.ndarray, scores: numpy.ndarray, labels: numpy.ndarray):
+		"""記事のまとまり（score_articlesの結果）を書き出します。\n
+		:param ids: 記事ID
+		:param sentence_counts: 記事ごとの文の数
+		:param scores: 文ごとのF値（文の数の合計×3×3）
+		:param labels: 文ごとのラベル"""
+		numpy.asarray(scores, dtype = numpy.float16).tofile(self.__scores_file)
+		numpy.asarray(labels, dtype = numpy.uint8).tofile(self.__labels_file)
+		self.__offsets.append(self.__position + numpy.cumsum(sentence_counts, dtype = numpy.int64))
+		self.__position += int(numpy.sum(sentence_counts))
+		self.__ids.append(numpy.asarray(ids, dtype = numpy.int64))
+	
+	def close(self):
+		self.__scores_file.close( )
+		self.__labels_file.close( )
+		numpy.save(str(oracle_offsets_path(self.__directory_path, self.__prefix)), numpy.concatenate(self.__offsets))
+		numpy.save(str(oracle_ids_path(self.__directory_path, self.__prefix)), numpy.concatenate(self.__ids + [numpy.zeros(0, dtype = numpy.int64)]))
+
+
+class OracleReader:
+	"""OracleWriterで書き出したものをメモリーマップして読み込みます。返す配列はコピーせず，ファイルをそのまま参照します。"""
+	
+	def __init__(self, directory_path: str, prefix: str):
+		"""読み込み器を開きます。\n
+		:param directory_path: 書き出したディレクトリー
+		:param prefix: ファイル名の前半"""
+		path: Path = Path(directory_path)
+		scores_file_path: Path = scores_path(path, prefix)
+		# 空ファイルはメモリーマップできない
+		self.scores: numpy.ndarray = numpy.memmap(str(scores_file_path), dtype = numpy.float16, mode = "r").reshape(-1, SUMMARY_LINES, len(METRICS)) if 0 < scores_file_path.stat( ).st_size else numpy.zeros((0, SUMMARY_LINES, len(METRICS)), dtype = numpy.float16)
+		self.labels: numpy.ndarray = numpy.memmap(str(labels_path(path, prefix)), dtype = numpy.uint8, mode = "r") if 0 < len(self.scores) else numpy.zeros(0, dtype = numpy.uint8)
+		self.offsets: numpy.ndarray = numpy.load(str(oracle_offsets_path(path, prefix)), mmap_mode = "r")
+		self.ids: numpy.ndarray = numpy.load(str(oracle_ids_path(path, prefix)), mmap_mode = "r")
+		self.__rows: Optional[dict] = None
+	
+	def __len__(self) -> int:
+		return len(self.ids)
+	
+	def row(self, id: int) -> int:
+		"""記事IDが何番目の記事かを返します。"""
+		if self.__rows is None:
+			self.__rows = dict(map(lambda item: (item[1], item[0]), enumerate(self.ids.tolist( ))))
+		return self.__rows[id]
+	
+	def article_scores(self, row: int) -> numpy.ndarray:
+		"""記事の文ごとの，要約の各行に対するROUGE-1 / 2 / LのF値を返します（文の数×3×3の配列）。"""
+		return self.scores[self.offsets[row]: self.offsets[row + 1]]
+	
+	def article_labels(self, row: int) -> numpy.ndarray:
+		"""記事の文ごとのラベル（ビットlが立っていれば要約のl行目に最も近い文）を返します。"""
+		return self.labels[self.offsets[row]: self.offsets[row + 1]]
+	
+	def oracle(self, row: int) -> numpy.ndarray:
+		"""要約の行ごとに，最も近い本文の文の番号（記事内で0から，要約の行が空などで決まらなければ-1）を返します。"""
+		flags: numpy.ndarray = (numpy.asarray(self.article_labels(row))[:, None] & (1 << numpy.arange(SUMMARY_LINES))) != 0
+		if len(flags) < 1:
+			return numpy.full(SUMMARY_LINES, -1, dtype = numpy.int64)
+		return numpy.where(flags.any(axis = 0), flags.argmax(axis = 0), -1)
+
+
+def split_sentences(text: str) -> List[str]:
+	"""正規化した本文を「。」で文に分けます（空の文は除きます）。"""
+	return list(filter(lambda sentence: sentence != "", text.split("。")))
+
+
+def pad_lines(lines: Sequence[Sequence[str]]) -> List[List[str]]:
+	"""要約の行ごとの形態素を3行にそろえます（TokenCorpusWriterと同じく，4行目以降は3行目に含め，足りなければ空の行を補います）。"""
+	padded: List[List[str]] = list(map(list, lines[: SUMMARY_LINES - 1])) + [list(chain.from_iterable(lines[SUMMARY_LINES - 1: ]))]
+	return padded + [[ ]] * (SUMMARY_LINES - len(padded))
+
+
+def encode_segments(segments: Sequence[Sequence[str]], token_ids: Dict[str, int]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+	"""形態素の列のリストを，IDを平らに並べた配列と区切り位置の配列にします。\n
+	:param segments: 形態素の列のリスト
+	:param token_ids: 形態素→ID（まとまりの中だけで使う連番，知らない形態素は追加します）
+	:return: （形態素ID（int32），区切り位置（int64，列の数 + 1個））"""
+	flat: List[str] = list(chain.from_iterable(segments))
+	# 形態素ごとのPythonの処理は初めて見た形態素だけにし，IDへの変換はmapでまとめて行う
+	new_tokens: List[str] = list(filter(lambda token: token not in token_ids, dict.fromkeys(flat)))
+	token_ids.update(zip(new_tokens, count(len(token_ids))))
+	tokens: numpy.ndarray = numpy.fromiter(map(token_ids.__getitem__, flat), dtype = numpy.int32, count = len(flat))
+	offsets: numpy.ndarray = numpy.concatenate([numpy.zeros(1, dtype = numpy.int64), numpy.cumsum(numpy.fromiter(map(len, segments), dtype = numpy.int64, count = len(segments)))])
+	return tokens, offsets
+
+
+def score_articles(articles: Sequence[Tuple[Sequence[Sequence[str]], Sequence[Sequence[str]]]]) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+	"""記事のまとまりについて，本文の全ての文と要約の各行のROUGE-1 / 2 / LのF値と，オラクルのラベルを計算します。\n
+	形態素をまとまりの中だけの連番のIDにし，まとまり全体を一度に配列演算で計算します（文と行の組ごとのPythonのループはありません）。\n
+	:param articles: 記事ごとの（本文の文ごとの形態素，要約の行ごとの形態素）
+	:return: （記事ごとの文の数，文ごとのF値（文の数の合計×要約の行3つ×METRICSの順の3つ，float32），文ごとのラベル（uint8））"""
+	token_ids: Dict[str, int] = dict( )
+	sentence_counts: numpy.ndarray = numpy.fromiter(map(lambda article: len(article[0]), articles), dtype = numpy.int64, count = len(articles))
+	sentence_tokens, sentence_offsets = encode_segments(list(chain.from_iterable(map(lambda article: article[0], articles))), token_ids)
+	line_tokens, line_offsets = encode_segments(list(chain.from_iterable(map(lambda article: pad_lines(article[1]), articles))), token_ids)
+	sentence_articles: numpy.ndarray = numpy.repeat(numpy.arange(len(articles)), sentence_counts)
+	scores: numpy.ndarray = rouge_scores(sentence_tokens, sentence_offsets, sentence_articles, line_tokens, line_offsets)
+	return sentence_counts, scores, oracle_labels(scores, sentence_counts)
+
+
+def rouge_scores(sentence_tokens: numpy.ndarray, sentence_offsets: numpy.ndarray, sentence_articles: numpy.ndarray, line_tokens: numpy.ndarray, line_offsets: numpy.ndarray) -> numpy.ndarray:
+	"""文ごとに，同じ記事の要約の各行に対するROUGE-1 / 2 / LのF値を計算します。\n
+	:param sentence_tokens: 全ての文の形態素IDを平らに並べたもの
+	:param sentence_offsets: 文の区切り位置（文の数 + 1個）
+	:param sentence_articles: 文ごとの記事の番号（まとまりの中で0から）
+	:param line_tokens: 全ての記事の要約の行（記事ごとに3行）の形態素IDを平らに並べたもの
+	:param line_offsets: 要約の行の区切り位置（記事数×3 + 1個）
+	:return: 文の数×要約の行3つ×METRICSの順の3つのF値（float32）"""
+	sentence_lengths: numpy.ndarray = numpy.diff(sentence_offsets)
+	line_lengths: numpy.ndarray = numpy.diff(line_offsets).reshape(-1, SUMMARY_LINES)[sentence_articles]
+	scores: numpy.ndarray = numpy.zeros((len(sentence_lengths), SUMMARY_LINES, len(METRICS)), dtype = numpy.float32)
+	for metric, n in enumerate((1, 2)):
+		overlaps, sentence_totals, line_totals = ngram_overlaps(sentence_tokens, sentence_offsets, sentence_articles, line_tokens, line_offsets, n)
+		scores[:, :, metric] = f_measure(overlaps, sentence_totals[:, None], line_totals)
+	lcs: numpy.ndarray = lcs_lengths(sentence_tokens, sentence_offsets, sentence_articles, line_tokens, line_offsets)
+	scores[:, :, 2] = f_measure(lcs, sentence_lengths[:, None], line_lengths)
+	return scores
+
+
+def oracle_labels(scores: numpy.ndarray, sentence_counts: numpy.ndarray) -> numpy.ndarray:
+	"""要約の行ごとに，ROUGE-1 / 2 / LのF値の平均が最も大きい文（同点なら先の文，全て0なら無し）のビットを立てたラベルを返します。\n
+	:param scores: rouge_scoresの結果
+	:param sentence_counts: 記事ごとの文の数
+	:return: 文ごとのラベル（uint8）"""
+	labels: numpy.ndarray = numpy.zeros(len(scores), dtype = numpy.uint8)
+	if len(scores) < 1:
+		return labels
+	means: numpy.ndarray = scores.mean(axis = 2)
+	sentence_articles: numpy.ndarray = numpy.repeat(numpy.arange(len(sentence_counts)), sentence_counts)
+	# 文のない記事を除いた，記事ごとの最初の文の位置
+	starts: numpy.ndarray = (numpy.cumsum(sentence_counts) - sentence_counts)[0 < sentence_counts]
+	for line in range(SUMMARY_LINES):
+		best: numpy.ndarray = numpy.zeros(len(sentence_counts), dtype = means.dtype)
+		best[0 < sentence_counts] = numpy.maximum.reduceat(means[:, line], starts)
+		is_best: numpy.ndarray = (means[:, line] == best[sentence_articles]) & (0 < means[:, line])
+		# 記事ごとに最初の最大の文だけ
+		candidates: numpy.ndarray = numpy.flatnonzero(is_best)
+		labels[candidates[numpy.unique(sentence_articles[candidates], return_index = True)[1]]] |= numpy.uint8(1 << line)
+	return labels
+
+
+def ngram_overlaps(sentence_tokens: numpy.ndarray, sentence_offsets: numpy.ndarray, sentence_articles: numpy.ndarray, line_tokens: numpy.ndarray, line_offsets: numpy.ndarray, n: int) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+	"""文と同じ記事の要約の各行で共通するn-gramの数（回数は少ない方まで数える）を，n-gramの出現回数の疎な表の突き合わせで数えます。\n
+	:return: （文×行の共通するn-gramの数，文ごとのn-gramの数，文×行の行のn-gramの数）"""
+	sentence_count: int = len(sentence_offsets) - 1
+	segments, grams, counts = ngram_counts(numpy.concatenate([sentence_tokens, line_tokens]), numpy.concatenate([sentence_offsets, sentence_offsets[-1] + line_offsets[1: ]]), n)
+	totals: numpy.ndarray = numpy.bincount(segments, weights = counts, minlength = sentence_count + len(line_offsets) - 1)
+	line_totals: numpy.ndarray = totals[sentence_count: ].reshape(-1, SUMMARY_LINES)[sentence_articles]
+	overlaps: numpy.ndarray = numpy.zeros((sentence_count, SUMMARY_LINES), dtype = numpy.float64)
+	is_sentence: numpy.ndarray = segments < sentence_count
+	gram_count: int = int(grams.max( )) + 1 if 0 < len(grams) else 1
+	# 行の（行の番号，n-gram）は並んでいるため，文の（同じ記事の行の番号，n-gram）を二分探索で引く
+	line_keys: numpy.ndarray = (segments[~is_sentence] - sentence_count) * gram_count + grams[~is_sentence]
+	line_counts: numpy.ndarray = counts[~is_sentence]
+	if len(line_keys) < 1:
+		return overlaps, totals[: sentence_count], line_totals
+	sentences: numpy.ndarray = segments[is_sentence]
+	for line in range(SUMMARY_LINES):
+		queries: numpy.ndarray = (sentence_articles[sentences] * SUMMARY_LINES + line) * gram_count + grams[is_sentence]
+		positions: numpy.ndarray = numpy.minimum(numpy.searchsorted(line_keys, queries), len(line_keys) - 1)
+		found: numpy.ndarray = line_keys[positions] == queries
+		overlaps[:, line] = numpy.bincount(sentences[found], weights = numpy.minimum(counts[is_sentence][found], line_counts[positions[found]]), minlength = sentence_count)
+	return overlaps, totals[: sentence_count], line_totals
+
+
+def ngram_counts(tokens: numpy.ndarray, offsets: numpy.ndarray, n: int) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+	"""形態素の列ごとのn-gramの出現回数を数えます（列をまたぐn-gramは数えません）。\n
+	:param tokens: 形態素IDを平らに並べたもの
+	:param offsets: 列の区切り位置
+	:param n: n-gramの長さ
+	:return: （列の番号，n-gramのID，出現回数）の3つの配列（列の番号，n-gramのIDの順に並べたもの）"""
+	if len(tokens) < n:
+		return numpy.zeros(0, dtype = numpy.int64), numpy.zeros(0, dtype = numpy.int64), numpy.zeros(0, dtype = numpy.int64)
+	segments: numpy.ndarray = segment_ids(offsets)
+	grams: numpy.ndarray = tokens.astype(numpy.int64)
+	token_count: int = int(tokens.max( )) + 1
+	for k in range(1, n):
+		# 前の位置のgramに次の形態素をつなげ，IDが大きくなりすぎないように連番に付け直す
+		grams = numpy.unique(grams[: -1] * token_count + tokens[k: ], return_inverse = True)[1].astype(numpy.int64)
+	valid: numpy.ndarray = segments[: len(grams)] == segments[n - 1: ]
+	gram_count: int = int(grams.max( )) + 1
+	keys, counts = numpy.unique(segments[: len(grams)][valid] * gram_count + grams[valid], return_counts = True)
+	return keys // gram_count, keys % gram_count, counts
+
+
+def lcs_lengths(sentence_tokens: numpy.ndarray, sentence_offsets: numpy.ndarray, sentence_articles: numpy.ndarray, line_tokens: numpy.ndarray, line_offsets: numpy.ndarray) -> numpy.ndarray:
+	"""文と同じ記事の要約の各行の最長共通部分列の長さを，ビット並列のアルゴリズム（Hyyrö）で全ての組について同時に計算します。\n
+	要約の行の形態素の位置をビットにし，文の形態素を1つずつ読んで，全ての（行，文）の組のビット列を配列演算で更新します。文は長い順に並べ，まだ続きのある組だけを更新します。\n
+	:return: 文×行の最長共通部分列の長さ（int64）"""
+	sentence_count: int = len(sentence_offsets) - 1
+	line_lengths: numpy.ndarray = numpy.diff(line_offsets)
+	words: int = max(-(-int(line_lengths.max(initial = 0)) // WORD_BITS), 1)
+	token_count: int = int(max(sentence_tokens.max(initial = 0), line_tokens.max(initial = 0))) + 1
+	# （行の番号，形態素）→行の中でその形態素がある位置のビット（最後の行は，見つからない形態素用の0）
+	line_segments: numpy.ndarray = segment_ids(line_offsets)
+	positions: numpy.ndarray = numpy.arange(len(line_tokens)) - line_offsets[line_segments]
+	keys, inverse = numpy.unique(line_segments * token_count + line_tokens, return_inverse = True)
+	masks: numpy.ndarray = numpy.zeros((len(keys) + 1, words), dtype = numpy.uint64)
+	numpy.bitwise_or.at(masks, (inverse, positions // WORD_BITS), numpy.left_shift(numpy.uint64(1), (positions % WORD_BITS).astype(numpy.uint64)))
+	sentence_lengths: numpy.ndarray = numpy.diff(sentence_offsets)
+	order: numpy.ndarray = numpy.argsort(-sentence_lengths, kind = "stable")
+	sorted_lengths: numpy.ndarray = sentence_lengths[order]
+	starts: numpy.ndarray = sentence_offsets[: -1][order]
+	bases: numpy.ndarray = (sentence_articles[order][None, :] * SUMMARY_LINES + numpy.arange(SUMMARY_LINES)[:, None]) * token_count
+	bits: numpy.ndarray = numpy.full((SUMMARY_LINES, sentence_count, words), numpy.iinfo(numpy.uint64).max, dtype = numpy.uint64)
+	# j番目の形態素がある（長さがjより大きい）文の数
+	active_counts: numpy.ndarray = numpy.searchsorted(-sorted_lengths, -numpy.arange(int(sorted_lengths.max(initial = 0))), side = "left")
+	for j, active in enumerate(active_counts.tolist( )):
+		queries: numpy.ndarray = bases[:, : active] + sentence_tokens[starts[: active] + j]
+		indices: numpy.ndarray = numpy.minimum(numpy.searchsorted(keys, queries), max(len(keys) - 1, 0))
+		indices = numpy.where(keys[indices] == queries, indices, len(keys)) if 0 < len(keys) else numpy.zeros_like(queries)
+		current: numpy.ndarray = bits[:, : active]
+		matched: numpy.ndarray = current & masks[indices]
+		# V = (V + U) | (V - U)（UはVの一部のビットのため，V - UはV ^ U）
+		bits[:, : active] = add_words(current, matched) | (current ^ matched)
+	# 最長共通部分列の長さは，行の長さまでのビットのうち0のものの数
+	lengths: numpy.ndarray = line_lengths.reshape(-1, SUMMARY_LINES)[sentence_articles[order]].T
+	valid_bits: numpy.ndarray = numpy.clip(lengths[:, :, None] - numpy.arange(words) * WORD_BITS, 0, WORD_BITS).astype(numpy.uint64)
+	valid_masks: numpy.ndarray = numpy.where(valid_bits == WORD_BITS, numpy.iinfo(numpy.uint64).max, numpy.left_shift(numpy.uint64(1), numpy.minimum(valid_bits, WORD_BITS - 1)) - numpy.uint64(1))
+	sorted_lcs: numpy.ndarray = lengths - popcount(bits & valid_masks).sum(axis = 2, dtype = numpy.int64)
+	lcs: numpy.ndarray = numpy.zeros((sentence_count, SUMMARY_LINES), dtype = numpy.int64)
+	lcs[order] = sorted_lcs.T
+	return lcs
+
+
+def popcount(values: numpy.ndarray) -> numpy.ndarray:
+	"""uint64の要素ごとに1のビットの数を数えます（numpy.bitwise_countはNumPy 2.0以降にしかなく，spaCy 2.2・GiNZA 2.2.1はNumPy 2で動かないため，バイトごとの表を引きます）。"""
+	values = numpy.ascontiguousarray(values, dtype = numpy.uint64)
+	return BYTE_POPCOUNTS[values.view(numpy.uint8)].reshape(values.shape + (8, )).sum(axis = -1, dtype = numpy.uint8)
+
+
+def add_words(left: numpy.ndarray, right: numpy.ndarray) -> numpy.ndarray:
+	"""最後の軸に64ビットずつ並べた多倍長の整数を足します（桁あふれは捨てます）。"""
+	if left.shape[-1] == 1:
+		return left + right
+	total: numpy.ndarray = numpy.empty_like(left)
+	carry: numpy.ndarray = numpy.zeros(left.shape[: -1], dtype = numpy.uint64)
+	for word in range(left.shape[-1]):
+		partial: numpy.ndarray = left[..., word] + right[..., word]
+		total[..., word] = partial + carry
+		carry = ((partial < left[..., word]) | (total[..., word] < partial)).astype(numpy.uint64)
+	return total
+
+
+def f_measure(overlaps: numpy.ndarray, candidate_totals: numpy.ndarray, reference_totals: numpy.ndarray) -> numpy.ndarray:
+	"""一致数と，文・要約の行それぞれの総数からF値を計算します（総数や一致数が0なら0）。"""
+	overlaps = overlaps.astype(numpy.float64)
+	precision: numpy.ndarray = numpy.divide(overlaps, candidate_totals, out = numpy.zeros_like(overlaps), where = numpy.broadcast_to(0 < candidate_totals, overlaps.shape))
+	recall: numpy.ndarray = numpy.divide(overlaps, reference_totals, out = numpy.zeros_like(overlaps), where = numpy.broadcast_to(0 < reference_totals, overlaps.shape))
+	return numpy.divide(2.0 * precision * recall, precision + recall, out = numpy.zeros_like(overlaps), where = 0 < precision + recall)
+
+
+def segment_ids(offsets: numpy.ndarray) -> numpy.ndarray:
+	"""区切り位置から，位置ごとの列の番号を返します。"""
+	return numpy.repeat(numpy.arange(len(offsets) - 1), numpy.diff(offsets))
+
+
+def scores_path(directory_path: Path, prefix: str) -> Path:
+	return directory_path.joinpath(prefix + ".rouge.bin")
+
+
+def labels_path(directory_path: Path, prefix: str) -> Path:
+	return directory_path.joinpath(prefix + ".oracle_labels.bin")
+
+
+def oracle_offsets_path(directory_path: Path, prefix: str) -> Path:
+	return directory_path.joinpath(prefix + ".oracle_offsets.npy")
+
+
+def oracle_ids_path(directory_path: Path, prefix: str) -> Path:
+	return directory_path.joinpath(prefix + ".oracle_ids.npy")
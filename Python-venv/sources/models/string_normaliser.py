@@ -1,119 +1,166 @@
-# Apache License, Version 2.0の「mojimoji」（by Studio Ousia）を用いています。
-from typing import List, Tuple, Pattern, Optional, Union, Match
-from itertools import chain
-from spacy.lang.ja import Japanese
-from spacy.tokens.doc import Doc
-from spacy.tokens import Token
+from typing import List, Tuple, Optional, Union, Iterable, Iterator
+from itertools import chain, islice, tee
+from pathlib import Path
 from logging import getLogger, Logger
 from pprint import pformat
-from kanjize import kanji2int
-import spacy
-import re
-import mojimoji
-import unicodedata
+import socket
 
-from .my_tuple import MyTuple
+from .normaliser_engine import NormaliserEngine
+from . import normaliser_engine
+from .token_cache import TokenCache
+from .token_client import TokenClient
 
 
 class StringNormaliser:
 	"""文字列正規化器。"""
 	
-	def __init__(self, logger: Logger = None):
-		self.__japanese_processor: Japanese = spacy.load("ja_ginza")
+	def __init__(self, logger: Logger = None, use_token_cache: bool = False, use_server: bool = True, server_address: Optional[str] = None):
+		"""正規化器を生成します。\n
+		形態素解析サーバー（serve_tokeniser.py）が起動していればそれに接続し，なければGiNZAをこのプロセスに読み込みます。\n
+		:param logger: ロガー
+		:param use_token_cache: 形態素解析の結果を「dataset/learn/token_cache.sqlite3」にキャッシュし，次回以降も使うか（書き込みはまとめて行うため，使う場合はtoken_cache.commit( )かclose( )を呼んでください）
+		:param use_server: 形態素解析サーバーに接続してみるか（Falseで必ずこのプロセスに読み込む）
+		:param server_address: 形態素解析サーバーのアドレス（Noneでmodels.token_client.DEFAULT_ADDRESS）"""
 		self.__logger: Logger = logger if logger is not None else getLogger("learn")
+		self.__tokeniser: Union[TokenClient, "GinzaTokeniser"] = create_tokeniser(use_server, server_address, self.__logger)
+		self.__engine: NormaliserEngine = NormaliserEngine( )
+		# キャッシュのキーに含める，モデル名とバージョン
+		self.__model_version: str = self.__tokeniser.model_version
+		self.__token_cache: Optional[TokenCache] = None
+		if use_token_cache:
+			learn_directory_path: Path = Path(__file__).parent.joinpath("../../dataset/learn")
+			learn_directory_path.mkdir(parents = True, exist_ok = True)
+			self.__token_cache = TokenCache(str(learn_directory_path.joinpath("token_cache.sqlite3")))
+	
+	@property
+	def uses_server(self) -> bool:
+		"""形態素解析サーバーに接続しているか"""
+		return isinstance(self.__tokeniser, TokenClient)
+	
+	@property
+	def token_cache(self) -> Optional[TokenCache]:
+		"""形態素解析の結果のキャッシュ（ヒット・ミスの回数はtoken_cache.counts( )），使わない場合None"""
+		return self.__token_cache
+	
+	def close(self):
+		"""キャッシュをデータベースに書き込んで閉じます（形態素解析サーバーとの接続も閉じます）。"""
+		if self.__token_cache is not None:
+			self.__token_cache.close( )
+			self.__token_cache = None
+		if isinstance(self.__tokeniser, TokenClient):
+			self.__tokeniser.close( )
 	
 	def normalise(self, string: str, delimiter: str = "。") -> str:
-		"""フルコースで文字列を正規化します。\n
+		"""フルコースで文字列を正規化します（表や正規表現を作り直さず，文字単位の置き換えをまとめて行うNormaliserEngineを使います）。\n
 		:param string: 正規化前文字列
 		:param delimiter: 文区切り文字（例：「。」）
 		:return: 正規化後の文字列"""
-		unicode_normalised: str = self.unicode_normalise(string)
-		crlf2space1: str = self.replace_carriage_return_line_feed_to_space(unicode_normalised)
-		# 今回あまり必要なさそうだが，↑により空白2連続が発生する可能性があるため，念のため。
-		crlf2space2: str = self.replace_crlf_to_space_with_delimiter(crlf2space1, delimiter)
-		sign_replaced: str = self.replace_sign_to_full_width(crlf2space2)
-		kan_suji_replaced: str = self.replace_number_to_arabic(sign_replaced)
-		return self.replace_full_to_half_width(kan_suji_replaced)
+		return self.__engine.normalise(string, delimiter)
 	
 	def unicode_normalise(self, string: str) -> str:
 		"""Unicode正規化形式Dに正規化します。"""
-		return unicodedata.normalize("NFD", string)
+		return normaliser_engine.unicode_normalise(string)
 	
 	def replace_carriage_return_line_feed_to_space(self, before_string: str) -> str:
 		"""CRLF，LF，CRを空白文字に置き換えます。そもそもCRって使うことあるのかー？"""
-		return before_string.replace("\r\n", "　").replace("\n", "　").replace("\r", "　")
+		return normaliser_engine.replace_carriage_return_line_feed_to_space(before_string)
 	
 	def replace_crlf_to_space_with_delimiter(self, before_string: str, delimiter: str) -> str:
 		"""delimiterCRLF or SPACE→除去，[^delimiter]*CRLF→置換，「　」{2, ∞}→「　」{1}　※ delimiter：（例：「。」）"""
-		pattern1: Pattern = re.compile(delimiter + "(([ 　]{0,}(\r\n)|(\n)|(\r))|([ 　]{1,}))")
-		remove_crlf: str = pattern1.sub(delimiter, before_string)
-		replaced_crlf: str = self.replace_carriage_return_line_feed_to_space(remove_crlf)
-		pattern2: Pattern = re.compile("[ 　]{2,}")
-		return pattern2.sub("　", replaced_crlf)
+		return normaliser_engine.replace_crlf_to_space_with_delimiter(before_string, delimiter)
 	
 	def replace_sign_to_full_width(self, before_string: str) -> str:
 		"""ASCII半角記号は正規表現などいろいろと影響しそうなので全角記号に置き換えます。"""
-		# 半角→全角にする記号
-		half: str = "\"#%&'()*+" + "<=>?@" + "[\]^`" + "{|}~" + "‐"
-		full: str = "＂＃％＆＇（）＊＋" + "＜＝＞？＠" + "［＼］＾｀" + "｛｜｝〜" + "-"
-		translate_table = str.maketrans(half, full)
-		return before_string.translate(translate_table)
+		return normaliser_engine.replace_sign_to_full_width(before_string)
 	
 	def replace_number_to_arabic(self, before_string: str) -> str:
 		"""漢数字を算用数字に置き換えます。"""
-		kanji_pattern: Pattern = re.compile("[〇一二三四五六七八九十百千万億兆]{1,}")
-		return kanji_pattern.sub(self.__kanji_number_to_arabic_number, before_string)
-	
-	def __kanji_number_to_arabic_number(self, kanji_match: Match) -> str:
-		# 位取りがなく，数字だけが並んでるパターン（例：「二五二」であって「二百五十二」でない）
-		divided_pattern: Pattern = re.compile("[〇一二三四五六七八九]{1,}")
-		kanji_string: str = kanji_match.group(0)
-		divided_match: Match = divided_pattern.fullmatch(kanji_string)
-		if divided_match:
-			return "".join(MyTuple(kanji_string).map(kanji2int).map(str).tuple)
-		return str(kanji2int(kanji_string))
+		return normaliser_engine.replace_number_to_arabic(before_string)
 	
 	def replace_full_to_half_width(self, before_string: str) -> str:
 		"""英数字は半角に揃えます。"""
-		translate_table = self.__set_translate_table_latin( )
-		translate_latin: str =  before_string.translate(translate_table)
-		return mojimoji.han_to_zen(translate_latin, digit = False, ascii = False)
-	
-	def __set_translate_table_latin(self) -> dict:
-		half_character = list( )
-		full_character = list( )
-		# 数字
-		for i in range(10):
-			half_character.append(chr(0x0030 + i))
-			full_character.append(chr(0xff10 + i))
-		# 英大文字
-		for i in range(26):
-			half_character.append(chr(0x0041 + i))
-			full_character.append(chr(0xff21 + i))
-		# 英小文字
-		for i in range(26):
-			half_character.append(chr(0x0061 + i))
-			full_character.append(chr(0xff41 + i))
-		half: str = "".join(half_character)
-		full: str = "".join(full_character)
-		return str.maketrans(full, half)
+		return normaliser_engine.replace_full_to_half_width(before_string)
 	
 	def morphological_analyse(self, string: str) -> Tuple[str, ...]:
 		"""形態素解析します。\n
 		:param string: 解析文字列
 		:return: 形態素に分割したタプル　例：('銀座', 'で', 'ランチ', 'を', 'ご', '一緒', 'し', 'ましょう')"""
-		documents: spacy.tokens.doc.Doc = self.__japanese_processor(string)
-		# documents.sents：[ [token11, token12, ...], [token21, token22, ...], sentence3, ...]　※ token：形態素
-		tokens: MyTuple[Token, ...] = MyTuple(tuple(chain.from_iterable(documents.sents)))
-		# 文字列化（表層形の文字列のみにする）
-		# tokens.filter(lambda token: token.pos_ != "ADP" and token.pos_ != "AUX" and token.pos_ != "PUNCT" and token.pos_ != "SYM")
-		return tokens.map(str).tuple
+		return next(self.analyse_many((string, )))
 	
 	def morphological_analyse_with_stop_words(self, string: str) -> Tuple[str, ...]:
 		"""形態素解析します。\n
 		:param string: 解析文字列
 		:return: 形態素に分割したタプル　例：('銀座', 'で', 'ランチ', 'を', 'ご', '一緒', 'し', 'ましょう')"""
-		documents: spacy.tokens.doc.Doc = self.__japanese_processor(string)
-		# documents.sents：[ [token11, token12, ...], [token21, token22, ...], sentence3, ...]　※ token：形態素
-		tokens: MyTuple[Token, ...] = MyTuple(tuple(chain.from_iterable(documents.sents)))
-		return tokens.filter(lambda token: token.pos_ != "ADP" and token.pos_ != "AUX" and token.pos_ != "PUNCT" and token.pos_ != "SYM" and token.pos_ != "INTJ" and token.pos_ != "SCONJ" and token.pos_ != "DET" and token.pos_ != "PART" and token.pos_ != "X" and "非自立可能" not in token.tag_ and token.lemma_ != "する" and token.lemma_ != "こと" and token.lemma_ != "ある" and token.lemma_ != "いる" and token.lemma_ != "有る" and token.orth_ != "いう" and token.orth_ != "つい" and token.orth_ != "まあ").map(str).tuple
+		return next(self.analyse_many((string, ), with_stop_words = True))
+	
+	def analyse_many(self, strings: Iterable[str], with_stop_words: bool = False, batch_size: int = 256, n_process: int = 1) -> Iterator[Tuple[str, ...]]:
+		"""複数の文字列をまとめて形態素解析し，1件ずつ返します（nlp.pipeに流すため，全件をメモリーに載せません）。キャッシュにある文字列は解析しません。\n
+		:param strings: 解析文字列のイテラブル
+		:param with_stop_words: morphological_analyse_with_stop_wordsと同じく，品詞などで形態素を絞り込むか
+		:param batch_size: まとめて解析する文字列の数
+		:param n_process: 解析するプロセス数（2以上はspaCy 2.2.2以降だけ）
+		:return: 文字列ごとの，形態素に分割したタプルのイテレーター"""
+		if self.__token_cache is None:
+			yield from self.__analyse(strings, with_stop_words, batch_size, n_process)
+			return
+		filter_version: str = STOP_WORDS_FILTER_VERSION if with_stop_words else SURFACE_FILTER_VERSION
+		# （文字列，キー，キャッシュした形態素の組（なければNone））
+		items: Iterator[Tuple[str, Tuple[str, str, str], Optional[Tuple[str, ...]]]] = map(lambda string: self.__look_up(string, filter_version), strings)
+		# キャッシュになかった文字列だけを解析に回し，元の順番で返す（teeが溜めるのは解析段が先読みした分だけ）
+		lookups, misses = tee(items)
+		analysed: Iterator[Tuple[str, ...]] = self.__analyse(map(lambda item: item[0], filter(lambda item: item[2] is None, misses)), with_stop_words, batch_size, n_process)
+		for string, key, tokens in lookups:
+			if tokens is None:
+				tokens = next(analysed)
+				self.__token_cache.put(key, tokens)
+			yield tokens
+	
+	def __look_up(self, string: str, filter_version: str) -> Tuple[str, Tuple[str, str, str], Optional[Tuple[str, ...]]]:
+		key: Tuple[str, str, str] = TokenCache.key(string, self.__model_version, filter_version)
+		return string, key, self.__token_cache.get(key)
+	
+	def __analyse(self, strings: Iterable[str], with_stop_words: bool, batch_size: int, n_process: int) -> Iterator[Tuple[str, ...]]:
+		"""キャッシュを使わずに形態素解析します（サーバーに接続していればサーバーで）。\n
+		サーバーの応答が時間内にない場合や接続が切れた場合は，GiNZAをこのプロセスに読み込み，応答のなかったまとまりから解析し直します。"""
+		if not isinstance(self.__tokeniser, TokenClient):
+			yield from self.__tokeniser.analyse(strings, with_stop_words, batch_size, n_process)
+			return
+		string_iterator: Iterator[str] = iter(strings)
+		for chunk in iter(lambda: list(islice(string_iterator, max(batch_size, 1))), [ ]):
+			try:
+				tokens: Tuple[Tuple[str, ...], ...] = tuple(self.__tokeniser.analyse(chunk, with_stop_words, batch_size))
+			except (socket.timeout, ConnectionError) as exception:
+				self.__fall_back_to_ginza(exception)
+				yield from self.__tokeniser.analyse(chain(chunk, string_iterator), with_stop_words, batch_size, n_process)
+				return
+			yield from tokens
+	
+	def __fall_back_to_ginza(self, exception: OSError):
+		"""形態素解析サーバーとの接続を閉じ，GiNZAをこのプロセスに読み込んで以降はそれで解析します。"""
+		self.__logger.warning("形態素解析サーバー（%s）から応答がないため，GiNZAを読み込んで解析し直します：%s", self.__tokeniser.address, repr(exception))
+		self.__tokeniser.close( )
+		from .ginza_tokeniser import GinzaTokeniser
+		self.__tokeniser = GinzaTokeniser( )
+		self.__model_version = self.__tokeniser.model_version
+
+
+# キャッシュのキーに含める，形態素の絞り込み方のバージョン（models.ginza_tokeniserのis_content_tokenや解析に使う部品を変えたら上げる）
+STOP_WORDS_FILTER_VERSION: str = "stop_words-1"
+SURFACE_FILTER_VERSION: str = "surface-2"
+
+
+def create_tokeniser(use_server: bool = True, server_address: Optional[str] = None, logger: Optional[Logger] = None) -> Union[TokenClient, "GinzaTokeniser"]:
+	"""形態素解析サーバーに接続できればそのクライアントを，できなければGiNZAを読み込んだ形態素解析器を返します。\n
+	クライアントだけを使う場合にspaCyを読み込まないよう，GinzaTokeniserは必要になってからインポートします。"""
+	logger = logger if logger is not None else getLogger("learn")
+	if use_server:
+		try:
+			client: TokenClient = TokenClient(server_address)
+			logger.debug("形態素解析サーバー（%s）に接続しました。", client.address)
+			return client
+		except PermissionError as exception:
+			logger.warning("形態素解析サーバーのUnixソケットが安全でないため，接続せずにGiNZAを読み込みます：%s", exception)
+		except OSError as exception:
+			logger.debug("形態素解析サーバーに接続できないため，GiNZAを読み込みます：%s", exception)
+	from .ginza_tokeniser import GinzaTokeniser
+	return GinzaTokeniser( )
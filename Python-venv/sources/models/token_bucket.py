@@ -0,0 +1,76 @@
+from typing import Dict, Optional
+import asyncio
+import time
+
+
+class TokenBucket:
+	"""トークンバケット方式のレート制限器です。"""
+	
+	def __init__(self, rate: float, capacity: float = 1.0):
+		"""レート制限器を生成します。\n
+		:param rate: 1秒あたりに補充するトークン数（＝1秒あたりのリクエスト数）
+		:param capacity: バケットの容量（連続で送れるリクエスト数の上限）"""
+		if rate <= 0.0:
+			raise ValueError("rate は正の数を指定してください。")
+		self.__rate: float = rate
+		self.__capacity: float = max(capacity, 1.0)
+		self.__tokens: float = self.__capacity
+		self.__updated_time: float = time.monotonic( )
+		# イベントループに紐づくため，最初のacquire時に生成
+		self.__lock: Optional[asyncio.Lock] = None
+	
+	@property
+	def rate(self) -> float:
+		"""1秒あたりに補充するトークン数"""
+		return self.__rate
+	
+	@property
+	def capacity(self) -> float:
+		"""バケットの容量"""
+		return self.__capacity
+	
+	def try_acquire(self, tokens: float = 1.0) -> float:
+		"""トークンを取得できれば消費します。\n
+		:param tokens: 消費するトークン数
+		:return: 取得できた場合0.0，できなかった場合は取得できるまでの待ち秒数"""
+		now_time: float = time.monotonic( )
+		self.__tokens = min(self.__capacity, self.__tokens + (now_time - self.__updated_time) * self.__rate)
+		self.__updated_time = now_time
+		if tokens <= self.__tokens:
+			self.__tokens -= tokens
+			return 0.0
+		return (tokens - self.__tokens) / self.__rate
+	
+	async def acquire(self, tokens: float = 1.0):
+		"""トークンを取得できるまで待ってから消費します。\n
+		:param tokens: 消費するトークン数"""
+		if self.__lock is None:
+			self.__lock = asyncio.Lock( )
+		# ロックで待ち順を保証する（先に待ち始めたものから取得）
+		async with self.__lock:
+			wait_seconds: float = self.try_acquire(tokens)
+			while 0.0 < wait_seconds:
+				await asyncio.sleep(wait_seconds)
+				wait_seconds = self.try_acquire(tokens)
+
+
+class HostRateLimiter:
+	"""ホストごとにトークンバケットを持つレート制限器です。"""
+	
+	def __init__(self, rate: float, capacity: float = 1.0):
+		"""レート制限器を生成します。\n
+		:param rate: ホストごとの1秒あたりのリクエスト数
+		:param capacity: ホストごとのバケットの容量"""
+		self.__rate: float = rate
+		self.__capacity: float = capacity
+		self.__buckets: Dict[str, TokenBucket] = dict( )
+	
+	def bucket(self, host: str) -> TokenBucket:
+		"""ホストのトークンバケットを返します（なければ生成します）。"""
+		if host not in self.__buckets:
+			self.__buckets[host] = TokenBucket(self.__rate, self.__capacity)
+		return self.__buckets[host]
+	
+	async def acquire(self, host: str, tokens: float = 1.0):
+		"""ホストのトークンを取得できるまで待ちます。"""
+		await self.bucket(host).acquire(tokens)
@@ -0,0 +1,98 @@
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import sqlite3
+import json
+import time
+
+
+class TokenCache:
+	"""形態素解析の結果（形態素の組）の2段のキャッシュです。メモリー上のLRUと，プロセスや実行をまたいで使えるSQLiteのデータベースを持ちます。\n
+	キーは（解析する文字列のハッシュ値，モデル名とバージョン，絞り込み方のバージョン）で，絞り込み方を変えた場合はそのバージョンの結果だけが使われなくなります。"""
+	
+	def __init__(self, database_path: str, max_memory_entries: int = 100000, commit_interval: float = 5.0):
+		"""キャッシュを開きます（なければ作成します）。\n
+		:param database_path: SQLiteファイルのパス
+		:param max_memory_entries: メモリー上に持つ最大件数
+		:param commit_interval: コミット間隔の秒数（毎回コミットすると遅いため）"""
+		self.__max_memory_entries: int = max(max_memory_entries, 0)
+		self.__commit_interval: float = commit_interval
+		self.__last_commit_time: float = time.time( )
+		# キー→形態素の組（最近使ったものほど後ろ）
+		self.__memory: "OrderedDict[Tuple[str, str, str], Tuple[str, ...]]" = OrderedDict( )
+		self.__memory_hits: int = 0
+		self.__disk_hits: int = 0
+		self.__misses: int = 0
+		# まだデータベースに書き込んでいない（キー，JSON）（複数のプロセスで使うときに書き込みのロックを短くするため，コミット時にまとめて書き込む）
+		self.__pending: Dict[Tuple[str, str, str], str] = dict( )
+		self.__connection: sqlite3.Connection = sqlite3.connect(database_path, timeout = 60.0)
+		self.__connection.execute("PRAGMA journal_mode = WAL")
+		self.__connection.execute("PRAGMA synchronous = NORMAL")
+		self.__connection.execute("CREATE TABLE IF NOT EXISTS tokens (text_hash TEXT NOT NULL, model TEXT NOT NULL, filter_version TEXT NOT NULL, tokens TEXT NOT NULL, PRIMARY KEY (text_hash, model, filter_version))")
+		self.__connection.commit( )
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	@staticmethod
+	def key(string: str, model: str, filter_version: str) -> Tuple[str, str, str]:
+		"""キャッシュのキーを返します。\n
+		:param string: 解析する（正規化済みの）文字列
+		:param model: モデル名とバージョン（例：ja_ginza-2.2.1）
+		:param filter_version: 形態素の絞り込み方のバージョン"""
+		return hashlib.blake2b(string.encode("utf-8"), digest_size = 20).hexdigest( ), model, filter_version
+	
+	def get(self, key: Tuple[str, str, str]) -> Optional[Tuple[str, ...]]:
+		"""キャッシュした形態素の組を返します（メモリー→データベースの順に探し，なければNone）。"""
+		tokens: Optional[Tuple[str, ...]] = self.__memory.get(key)
+		if tokens is not None:
+			self.__memory.move_to_end(key)
+			self.__memory_hits += 1
+			return tokens
+		if key in self.__pending:
+			self.__memory_hits += 1
+			return tuple(json.loads(self.__pending[key]))
+		row: Optional[Tuple[str]] = self.__connection.execute("SELECT tokens FROM tokens WHERE text_hash = ? AND model = ? AND filter_version = ?", key).fetchone( )
+		if row is None:
+			self.__misses += 1
+			return None
+		self.__disk_hits += 1
+		tokens = tuple(json.loads(row[0]))
+		self.__remember(key, tokens)
+		return tokens
+	
+	def put(self, key: Tuple[str, str, str], tokens: Tuple[str, ...]):
+		"""形態素の組をキャッシュします。"""
+		self.__remember(key, tokens)
+		self.__pending[key] = json.dumps(tokens, ensure_ascii = False)
+		self.__commit_if_needed( )
+	
+	def counts(self) -> Dict[str, int]:
+		"""ヒット・ミスの回数を返します。\n
+		:return: { 'memory_hits', 'disk_hits', 'misses' }"""
+		return {"memory_hits": self.__memory_hits, "disk_hits": self.__disk_hits, "misses": self.__misses}
+	
+	def commit(self):
+		self.__connection.executemany("INSERT OR REPLACE INTO tokens (text_hash, model, filter_version, tokens) VALUES (?, ?, ?, ?)", map(lambda item: item[0] + (item[1], ), self.__pending.items( )))
+		self.__connection.commit( )
+		self.__pending.clear( )
+		self.__last_commit_time = time.time( )
+	
+	def close(self):
+		self.commit( )
+		self.__connection.close( )
+	
+	def __remember(self, key: Tuple[str, str, str], tokens: Tuple[str, ...]):
+		if self.__max_memory_entries < 1:
+			return
+		self.__memory[key] = tokens
+		self.__memory.move_to_end(key)
+		while self.__max_memory_entries < len(self.__memory):
+			self.__memory.popitem(last = False)
+	
+	def __commit_if_needed(self):
+		if self.__commit_interval <= time.time( ) - self.__last_commit_time:
+			self.commit( )
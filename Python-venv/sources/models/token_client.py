@@ -0,0 +1,151 @@
+from typing import Dict, List, Optional, Tuple, Union, Iterable, Iterator
+from itertools import islice
+from pathlib import Path
+import tempfile
+import socket
+import stat
+import os
+import struct
+import json
+
+
+# 接続と応答を待つ既定の秒数（サーバーが止まったままでも待ち続けないため）
+DEFAULT_TIMEOUT: float = 120.0
+
+
+class TokenClient:
+	"""形態素解析サーバー（models.token_server.TokenServer）の薄いクライアントです。GinzaTokeniserと同じように使えます。\n
+	spaCyもモデルも読み込まないため，すぐに使い始められ，メモリーもほとんど使いません。"""
+	
+	def __init__(self, address: Optional[str] = None, timeout: Optional[float] = DEFAULT_TIMEOUT):
+		"""サーバーに接続します（接続できなければOSError，Unixソケットが自分のものでなければPermissionErrorを送出します）。\n
+		:param address: サーバーのアドレス（Unixソケットのパス，または「ホスト:ポート」，NoneでDEFAULT_ADDRESS）
+		:param timeout: 接続と応答を待つ秒数（過ぎるとsocket.timeoutを送出します，Noneで待ち続ける）"""
+		self.__address: str = address if address is not None else DEFAULT_ADDRESS
+		self.__socket: socket.socket = connect(self.__address, timeout)
+		self.__file = self.__socket.makefile(mode = "rb")
+		self.__model_version: str = self.__request({"command": "info"}).get("model_version")
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	@property
+	def address(self) -> str:
+		return self.__address
+	
+	@property
+	def model_version(self) -> str:
+		"""サーバーが読み込んだモデル名とバージョン（キャッシュのキーに含める）"""
+		return self.__model_version
+	
+	def analyse(self, strings: Iterable[str], with_stop_words: bool = False, batch_size: int = 256, n_process: int = 1) -> Iterator[Tuple[str, ...]]:
+		"""複数の文字列をbatch_size個ずつサーバーに送って形態素解析し，1件ずつ返します（全件をメモリーに載せません）。\n
+		:param strings: 解析文字列のイテラブル
+		:param with_stop_words: 品詞などで形態素を絞り込むか
+		:param batch_size: 1回に送る文字列の数（サーバーは他のクライアントの要求とまとめて解析します）
+		:param n_process: 使いません（GinzaTokeniserと同じ引数にするため）
+		:return: 文字列ごとの，形態素に分割したタプルのイテレーター"""
+		string_iterator: Iterator[str] = iter(strings)
+		for chunk in iter(lambda: list(islice(string_iterator, max(batch_size, 1))), [ ]):
+			response: Dict[str, Union[str, list]] = self.__request({"command": "analyse", "strings": chunk, "with_stop_words": with_stop_words})
+			yield from map(tuple, response.get("tokens"))
+	
+	def close(self):
+		self.__file.close( )
+		self.__socket.close( )
+	
+	def __request(self, message: dict) -> dict:
+		"""要求を送り，応答を受け取ります（サーバー側のエラーはRuntimeErrorにします）。"""
+		send_message(self.__socket, message)
+		response: Optional[dict] = receive_message(self.__file)
+		if response is None:
+			raise ConnectionError(self.__address + " の形態素解析サーバーが接続を閉じました。")
+		if response.get("error") is not None:
+			raise RuntimeError("形態素解析サーバーでエラーが発生しました：" + str(response.get("error")))
+		return response
+
+
+def socket_directory( ) -> Path:
+	"""既定のUnixソケットを置く，ユーザーごとのディレクトリーを返します（$XDG_RUNTIME_DIR，なければ一時ディレクトリーの「three-line-summary-（uid）」）。\n
+	共有の一時ディレクトリーに決まった名前で置くと，ほかのユーザーが先に偽のサーバーを置けるため，ユーザーごとに分けます。"""
+	runtime_directory: Optional[str] = os.environ.get("XDG_RUNTIME_DIR")
+	if runtime_directory:
+		return Path(runtime_directory)
+	return Path(tempfile.gettempdir( )).joinpath("three-line-summary-" + str(os.getuid( )))
+
+
+# Unixソケットが使えればユーザーごとのディレクトリーのパス，使えなければlocalhostのポート
+DEFAULT_ADDRESS: str = str(socket_directory( ).joinpath("three-line-summary-token-server.sock")) if hasattr(socket, "AF_UNIX") and hasattr(os, "getuid") else "127.0.0.1:50580"
+# メッセージの先頭に付ける，本文（UTF-8のJSON）のバイト数
+LENGTH_HEADER: struct.Struct = struct.Struct(">I")
+
+
+def is_unix_address(address: str) -> bool:
+	"""アドレスがUnixソケットのパスか（「ホスト:ポート」でないか）を返します。"""
+	return "/" in address or "\\" in address or ":" not in address
+
+
+def tcp_address(address: str) -> Tuple[str, int]:
+	"""「ホスト:ポート」を（ホスト，ポート）にします。"""
+	host, port = address.rsplit(":", 1)
+	return host, int(port)
+
+
+def check_owner(path: Path, is_socket: bool):
+	"""Unixソケット（またはそれを置くディレクトリー）を，ほかのユーザーが置いたり置き換えたりできないことを確かめます。\n
+	ソケットは自分のものであること，ディレクトリーは自分かrootのもので，ほかのユーザーが書き込めるならスティッキービット（/tmpなど）があることとします。\n
+	:param path: ソケットかディレクトリーのパス
+	:param is_socket: ソケットか
+	:raise PermissionError: 満たさない場合"""
+	status: os.stat_result = os.lstat(str(path))
+	if is_socket:
+		if not stat.S_ISSOCK(status.st_mode) or status.st_uid != os.getuid( ):
+			raise PermissionError(str(path) + " は自分のUnixソケットではありません。")
+		return
+	if not stat.S_ISDIR(status.st_mode) or status.st_uid not in (os.getuid( ), 0) or (status.st_mode & (stat.S_IWGRP | stat.S_IWOTH) and not status.st_mode & stat.S_ISVTX):
+		raise PermissionError(str(path) + " はほかのユーザーがUnixソケットを置き換えられるディレクトリーです。")
+
+
+def connect(address: str, timeout: Optional[float] = None) -> socket.socket:
+	"""サーバーに接続したソケットを返します（Unixソケットは，ほかのユーザーのものなら接続しません）。"""
+	if is_unix_address(address):
+		if hasattr(os, "getuid"):
+			check_owner(Path(address).parent, False)
+			check_owner(Path(address), True)
+		client_socket: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		client_socket.settimeout(timeout)
+		try:
+			client_socket.connect(address)
+		except OSError:
+			client_socket.close( )
+			raise
+	else:
+		client_socket = socket.create_connection(tcp_address(address), timeout)
+		client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+	return client_socket
+
+
+def send_message(destination: socket.socket, message: dict):
+	"""メッセージを「バイト数＋UTF-8のJSON」で送ります。"""
+	body: bytes = json.dumps(message, ensure_ascii = False).encode("utf-8")
+	destination.sendall(LENGTH_HEADER.pack(len(body)) + body)
+
+
+def receive_message(source) -> Optional[dict]:
+	"""「バイト数＋UTF-8のJSON」のメッセージをひとつ受け取ります。\n
+	:param source: ソケットのmakefile("rb")
+	:return: メッセージ，相手が（メッセージの間で）接続を閉じていればNone
+	:raise ConnectionError: メッセージの途中で接続が閉じられた場合"""
+	header: bytes = source.read(LENGTH_HEADER.size)
+	if len(header) < 1:
+		return None
+	if len(header) < LENGTH_HEADER.size:
+		raise ConnectionError("メッセージのバイト数の途中で接続が閉じられました（" + str(len(header)) + " / " + str(LENGTH_HEADER.size) + " バイト）。")
+	length: int = LENGTH_HEADER.unpack(header)[0]
+	body: bytes = source.read(length)
+	if len(body) < length:
+		raise ConnectionError("メッセージの本文の途中で接続が閉じられました（" + str(len(body)) + " / " + str(length) + " バイト）。")
+	return json.loads(body.decode("utf-8"))
@@ -0,0 +1,118 @@
+from typing import List, Optional, Sequence
+from pathlib import Path
+import numpy
+
+
+class TokenCorpusWriter:
+	"""前処理した記事を，形態素IDを平らに並べた1本の配列と，記事ごとの区切り位置の配列に書き出します。\n
+	「（名前）.tokens.bin」：形態素ID（int32）をすべての記事について連結したもの（追記しながら書き出すため，全記事をメモリーに載せません）\n
+	「（名前）.offsets.npy」：記事ごとに（タイトル，要約1行目，2行目，3行目，本文の開始位置，本文の終了位置）の6つ（int64）\n
+	「（名前）.ids.npy」：記事ID（int64）"""
+	
+	# 区切り位置の列
+	TITLE: int = 0
+	SUMMARY: int = 1
+	CONTENT: int = 4
+	END: int = 5
+	SUMMARY_LINES: int = 3
+	
+	def __init__(self, directory_path: str, prefix: str):
+		"""書き込み器を開きます（既存のものは上書きします）。\n
+		:param directory_path: 書き出すディレクトリー
+		:param prefix: ファイル名の前半"""
+		self.__directory_path: Path = Path(directory_path)
+		self.__directory_path.mkdir(parents = True, exist_ok = True)
+		self.__prefix: str = prefix
+		self.__tokens_file = open(str(tokens_path(self.__directory_path, prefix)), mode = "wb")
+		self.__position: int = 0
+		self.__offsets: List[List[int]] = list( )
+		self.__ids: List[int] = list( )
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.close( )
+	
+	def write(self, id: int, title: numpy.ndarray, summary_lines: Sequence[numpy.ndarray], content: numpy.ndarray):
+		"""1記事を書き出します。要約が3行より少なければ空の行を補い，多ければ4行目以降を3行目に含めます。\n
+		:param id: 記事ID
+		:param title: タイトルの形態素ID
+		:param summary_lines: 要約の行ごとの形態素ID
+		:param content: 本文の形態素ID"""
+		lines: List[numpy.ndarray] = list(summary_lines[: self.SUMMARY_LINES - 1]) + [numpy.concatenate(list(summary_lines[self.SUMMARY_LINES - 1: ]) + [numpy.zeros(0, dtype = numpy.int32)])]
+		lines += [numpy.zeros(0, dtype = numpy.int32)] * (self.SUMMARY_LINES - len(lines))
+		offsets: List[int] = list( )
+		for segment in [title] + lines + [content]:
+			offsets.append(self.__position)
+			numpy.asarray(segment, dtype = numpy.int32).tofile(self.__tokens_file)
+			self.__position += len(segment)
+		offsets.append(self.__position)
+		self.__offsets.append(offsets)
+		self.__ids.append(id)
+	
+	def close(self):
+		self.__tokens_file.close( )
+		numpy.save(str(offsets_path(self.__directory_path, self.__prefix)), numpy.array(self.__offsets, dtype = numpy.int64).reshape(-1, self.END + 1))
+		numpy.save(str(ids_path(self.__directory_path, self.__prefix)), numpy.array(self.__ids, dtype = numpy.int64))
+
+
+class TokenCorpusReader:
+	"""TokenCorpusWriterで書き出したものをメモリーマップして読み込みます。返す配列はコピーせず，ファイルをそのまま参照します。"""
+	
+	def __init__(self, directory_path: str, prefix: str):
+		"""読み込み器を開きます。\n
+		:param directory_path: 書き出したディレクトリー
+		:param prefix: ファイル名の前半"""
+		path: Path = Path(directory_path)
+		tokens_file_path: Path = tokens_path(path, prefix)
+		# 空ファイルはメモリーマップできない
+		self.tokens: numpy.ndarray = numpy.memmap(str(tokens_file_path), dtype = numpy.int32, mode = "r") if 0 < tokens_file_path.stat( ).st_size else numpy.zeros(0, dtype = numpy.int32)
+		self.offsets: numpy.ndarray = numpy.load(str(offsets_path(path, prefix)), mmap_mode = "r")
+		self.ids: numpy.ndarray = numpy.load(str(ids_path(path, prefix)), mmap_mode = "r")
+		self.__rows: Optional[dict] = None
+	
+	def __len__(self) -> int:
+		return len(self.ids)
+	
+	def row(self, id: int) -> int:
+		"""記事IDが何番目の記事かを返します。"""
+		if self.__rows is None:
+			self.__rows = dict(map(lambda item: (item[1], item[0]), enumerate(self.ids.tolist( ))))
+		return self.__rows[id]
+	
+	def article(self, row: int) -> numpy.ndarray:
+		"""記事全体（タイトル，要約，本文）の形態素IDを返します。"""
+		return self.tokens[self.offsets[row, TokenCorpusWriter.TITLE]: self.offsets[row, TokenCorpusWriter.END]]
+	
+	def title(self, row: int) -> numpy.ndarray:
+		"""タイトルの形態素IDを返します。"""
+		return self.tokens[self.offsets[row, TokenCorpusWriter.TITLE]: self.offsets[row, TokenCorpusWriter.SUMMARY]]
+	
+	def summary_line(self, row: int, line: int) -> numpy.ndarray:
+		"""要約の行（0～2）の形態素IDを返します。"""
+		return self.tokens[self.offsets[row, TokenCorpusWriter.SUMMARY + line]: self.offsets[row, TokenCorpusWriter.SUMMARY + line + 1]]
+	
+	def summary(self, row: int) -> numpy.ndarray:
+		"""要約3行の形態素IDを返します。"""
+		return self.tokens[self.offsets[row, TokenCorpusWriter.SUMMARY]: self.offsets[row, TokenCorpusWriter.CONTENT]]
+	
+	def content(self, row: int) -> numpy.ndarray:
+		"""本文の形態素IDを返します。"""
+		return self.tokens[self.offsets[row, TokenCorpusWriter.CONTENT]: self.offsets[row, TokenCorpusWriter.END]]
+	
+	def lengths(self, start: int, end: int) -> numpy.ndarray:
+		"""記事ごとの，タイトル・要約3行・本文それぞれの形態素数を返します（記事数×5の配列）。"""
+		return numpy.diff(numpy.asarray(self.offsets[start: end]), axis = 1)
+
+
+def tokens_path(directory_path: Path, prefix: str) -> Path:
+	return directory_path.joinpath(prefix + ".tokens.bin")
+
+
+def offsets_path(directory_path: Path, prefix: str) -> Path:
+	return directory_path.joinpath(prefix + ".offsets.npy")
+
+
+def ids_path(directory_path: Path, prefix: str) -> Path:
+	return directory_path.joinpath(prefix + ".ids.npy")
@@ -0,0 +1,211 @@
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Future
+from socketserver import BaseServer, StreamRequestHandler, ThreadingMixIn, TCPServer
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+from logging import Logger, getLogger
+import threading
+import socketserver
+import socket
+import queue
+import time
+import os
+
+from .ginza_tokeniser import GinzaTokeniser
+from .token_client import DEFAULT_ADDRESS, is_unix_address, tcp_address, check_owner, send_message, receive_message
+
+
+class TokenServer:
+	"""GiNZAのモデルを一度だけ読み込んで常駐し，Unixソケットまたはlocalhostで形態素解析の要求を受け付けるサーバーです。\n
+	クライアントごとのスレッドは要求をキューに入れて待つだけで，解析はひとつのスレッドが行います。同時に届いた要求はmax_wait秒まで待ってmax_batch_size個までまとめ，ひとつのnlp.pipeで解析します（マイクロバッチ）。"""
+	
+	def __init__(self, tokeniser: GinzaTokeniser, address: Optional[str] = None, max_batch_size: int = 256, max_wait: float = 0.005, logger: Optional[Logger] = None):
+		"""サーバーを生成します（startで待ち受けを始めます）。\n
+		:param tokeniser: 形態素解析器（読み込み済みのモデル）
+		:param address: 待ち受けるアドレス（Unixソケットのパス，または「ホスト:ポート」，Noneでmodels.token_client.DEFAULT_ADDRESS）
+		:param max_batch_size: まとめて解析する文字列の数の上限
+		:param max_wait: 最初の要求が届いてから，他の要求を待つ最長の秒数
+		:param logger: ロガー"""
+		self.__logger: Logger = logger if logger is not None else getLogger("TokenServer")
+		self.__tokeniser: GinzaTokeniser = tokeniser
+		self.__address: str = address if address is not None else DEFAULT_ADDRESS
+		self.__max_batch_size: int = max(max_batch_size, 1)
+		self.__max_wait: float = max_wait
+		# （文字列のリスト，品詞などで絞り込むか，結果を渡すFuture）
+		self.__requests: queue.SimpleQueue = queue.SimpleQueue( )
+		# 止めた後に要求がキューに入らないよう，止めたかの確認とキューに入れるのをまとめて行う
+		self.__requests_lock: threading.Lock = threading.Lock( )
+		self.__counts: Counter = Counter( )
+		self.__stopped: threading.Event = threading.Event( )
+		self.__server: Optional[BaseServer] = None
+		self.__threads: List[threading.Thread] = list( )
+	
+	def __enter__(self):
+		self.start( )
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.stop( )
+	
+	@property
+	def address(self) -> str:
+		"""待ち受けているアドレス（ポート0を指定した場合は割り当てられたポート）"""
+		if self.__server is not None and not is_unix_address(self.__address):
+			return self.__server.server_address[0] + ":" + str(self.__server.server_address[1])
+		return self.__address
+	
+	def counts(self) -> Dict[str, int]:
+		"""要求数（requests），解析した文字列の数（strings），nlp.pipeを呼んだ回数（batches）を返します。"""
+		return dict(self.__counts)
+	
+	def start(self):
+		"""別スレッドで待ち受けと解析を始めます。"""
+		self.__server = self.__create_server( )
+		self.__stopped.clear( )
+		self.__threads = [threading.Thread(target = self.__server.serve_forever, daemon = True), threading.Thread(target = self.__batch_worker, daemon = True)]
+		tuple(map(lambda thread: thread.start( ), self.__threads))
+	
+	def serve_forever(self):
+		"""待ち受けを始め，Ctrl + Cなどで止めるまで戻りません。"""
+		self.start( )
+		try:
+			while not self.__stopped.wait(60.0):
+				self.__logger.info("要求数：%d，解析した文字列：%d 個，nlp.pipeの回数：%d", self.__counts["requests"], self.__counts["strings"], self.__counts["batches"])
+		except KeyboardInterrupt:
+			pass
+		finally:
+			self.stop( )
+	
+	def stop(self):
+		"""待ち受けと解析を止めます。解析されずに残った要求は，待っているクライアントが止まったままにならないよう，エラーで応答します。"""
+		if self.__server is None:
+			return
+		with self.__requests_lock:
+			self.__stopped.set( )
+		self.__server.shutdown( )
+		self.__server.server_close( )
+		tuple(map(lambda thread: thread.join( ), self.__threads))
+		self.__server = None
+		while True:
+			try:
+				pending: Tuple[List[str], bool, Future] = self.__requests.get_nowait( )
+			except queue.Empty:
+				break
+			pending[2].set_exception(ConnectionError("形態素解析サーバーを止めたため，解析できませんでした。"))
+		if is_unix_address(self.__address):
+			Path(self.__address).unlink(missing_ok = True)
+	
+	def analyse(self, strings: List[str], with_stop_words: bool) -> List[List[str]]:
+		"""解析のキューに入れ，他の要求とまとめて解析されるのを待ちます（クライアントごとのスレッドから呼びます）。"""
+		future: Future = Future( )
+		with self.__requests_lock:
+			if self.__stopped.is_set( ):
+				raise ConnectionError("形態素解析サーバーを止めています。")
+			self.__requests.put((strings, with_stop_words, future))
+		return future.result( )
+	
+	def handle(self, message: dict) -> dict:
+		"""要求ひとつに対する応答を返します（エラーは応答の「error」でクライアントに伝えます）。"""
+		try:
+			if message.get("command") == "info":
+				return {"model_version": self.__tokeniser.model_version}
+			if message.get("command") == "analyse":
+				self.__counts["requests"] += 1
+				return {"tokens": self.analyse(list(message.get("strings")), bool(message.get("with_stop_words")))}
+			return {"error": "不明な要求です：" + str(message.get("command"))}
+		except ConnectionError as exception:
+			# 止めたときに残っていた要求（異常ではないため，トレースバックは出力しない）
+			return {"error": repr(exception)}
+		except Exception as exception:
+			self.__logger.exception("形態素解析中にエラーが発生しました。")
+			return {"error": repr(exception)}
+	
+	def __create_server(self) -> BaseServer:
+		token_server: TokenServer = self
+		
+		class TokenRequestHandler(StreamRequestHandler):
+			def handle(self):
+				# 接続を閉じるまで，要求を受け取っては応答する
+				while True:
+					try:
+						message: Optional[dict] = receive_message(self.rfile)
+						if message is None:
+							return
+						send_message(self.connection, token_server.handle(message))
+					except ConnectionError:
+						# 応答を待ちきれずにクライアントが接続を閉じた場合など（異常ではないため，トレースバックは出力しない）
+						return
+		
+		if is_unix_address(self.__address):
+			# ユーザーごとのディレクトリーは自分だけが使えるように作り，ほかのユーザーが置き換えられるディレクトリーには置かない
+			Path(self.__address).parent.mkdir(mode = 0o700, parents = True, exist_ok = True)
+			if hasattr(os, "getuid"):
+				check_owner(Path(self.__address).parent, False)
+			# 前回止まったときに残ったソケットファイルは，接続できなければ消す
+			if Path(self.__address).exists( ) and not is_listening(self.__address):
+				Path(self.__address).unlink( )
+			return ThreadingUnixStreamServer(self.__address, TokenRequestHandler)
+		return ThreadingTCPServer(tcp_address(self.__address), TokenRequestHandler)
+	
+	def __batch_worker(self):
+		"""【解析スレッド】要求をまとめて解析し，それぞれのFutureに結果を渡します。"""
+		while not self.__stopped.is_set( ):
+			try:
+				first: Tuple[List[str], bool, Future] = self.__requests.get(timeout = 0.5)
+			except queue.Empty:
+				continue
+			batch: List[Tuple[List[str], bool, Future]] = [first]
+			size: int = len(first[0])
+			deadline: float = time.monotonic( ) + self.__max_wait
+			while size < self.__max_batch_size:
+				try:
+					item: Tuple[List[str], bool, Future] = self.__requests.get(timeout = max(deadline - time.monotonic( ), 0.0))
+				except queue.Empty:
+					break
+				batch.append(item)
+				size += len(item[0])
+			# 絞り込むかどうかで使うパイプラインの部品が違うため，分けて解析する
+			for with_stop_words in (False, True):
+				self.__analyse_batch(list(filter(lambda item: item[1] == with_stop_words, batch)), with_stop_words)
+	
+	def __analyse_batch(self, batch: List[Tuple[List[str], bool, Future]], with_stop_words: bool):
+		"""要求をひとつのnlp.pipeで解析し，要求ごとに分け直します。"""
+		if len(batch) < 1:
+			return
+		strings: List[str] = list(chain.from_iterable(map(lambda item: item[0], batch)))
+		try:
+			tokens: List[List[str]] = list(map(list, self.__tokeniser.analyse(strings, with_stop_words, batch_size = self.__max_batch_size)))
+		except Exception as exception:
+			tuple(map(lambda item: item[2].set_exception(exception), batch))
+			return
+		self.__counts["strings"] += len(strings)
+		self.__counts["batches"] += 1
+		offset: int = 0
+		for item in batch:
+			item[2].set_result(tokens[offset: offset + len(item[0])])
+			offset += len(item[0])
+
+
+class ThreadingTCPServer(ThreadingMixIn, TCPServer):
+	# クライアントが接続したままでも止められるように
+	daemon_threads: bool = True
+	allow_reuse_address: bool = True
+
+
+# Unixソケットが使えない環境（Windowsなど）では定義しない
+if hasattr(socketserver, "UnixStreamServer"):
+	class ThreadingUnixStreamServer(ThreadingMixIn, socketserver.UnixStreamServer):
+		daemon_threads: bool = True
+
+
+def is_listening(address: str) -> bool:
+	"""Unixソケットで待ち受けているサーバーがあるかを返します。"""
+	probe: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		probe.connect(address)
+		return True
+	except OSError:
+		return False
+	finally:
+		probe.close( )
@@ -0,0 +1,39 @@
+from typing import Iterator, List, Optional, Tuple
+
+from .jsonl_shard import read_crawled_records
+
+
+class TokenisedCorpus:
+	"""前処理した記事（dataset/learn/（分割））の形態素の列を，読むたびにディスクから1記事ずつ読み込むコーパスです。\n
+	イテレーターでなく何度でも最初から読めるため，gensimのように複数回（エポックごとに）読むものにそのまま渡せ，全記事をメモリーに載せません。"""
+	
+	# 形態素の列として返す部分
+	PARTS: Tuple[str, ...] = ("title", "summary", "content")
+	
+	def __init__(self, directory_path: str, prefix: str, parts: Tuple[str, ...] = PARTS):
+		"""コーパスを生成します。\n
+		:param directory_path: 前処理した記事のディレクトリー
+		:param prefix: シャードのファイル名の前半（分割の名前）
+		:param parts: 返す部分（title：タイトル，summary：要約の各行，content：本文）"""
+		self.__directory_path: str = directory_path
+		self.__prefix: str = prefix
+		self.__parts: Tuple[str, ...] = parts
+		self.__length: Optional[int] = None
+	
+	def __iter__(self) -> Iterator[List[str]]:
+		"""タイトル，要約の各行，本文をそれぞれひとつの形態素の列として返します（空の列は飛ばします）。"""
+		for record in read_crawled_records(self.__directory_path, self.__prefix):
+			sequences: List[List[str]] = list( )
+			if "title" in self.__parts:
+				sequences.append(record.get("title_tokens") or [ ])
+			if "summary" in self.__parts:
+				sequences.extend(record.get("summary_tokens") or [ ])
+			if "content" in self.__parts:
+				sequences.append(record.get("content_tokens") or [ ])
+			yield from filter(lambda sequence: 0 < len(sequence), sequences)
+	
+	def __len__(self) -> int:
+		"""形態素の列の数（初回だけ全体を1回読んで数えます）"""
+		if self.__length is None:
+			self.__length = sum(map(lambda _: 1, self))
+		return self.__length
@@ -0,0 +1,75 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter
+import numpy
+import json
+
+
+class Vocabulary:
+	"""形態素→IDの語彙です。ID 0はパディング，ID 1は語彙にない形態素を表します。"""
+	
+	PADDING: str = "<pad>"
+	UNKNOWN: str = "<unk>"
+	PADDING_ID: int = 0
+	UNKNOWN_ID: int = 1
+	
+	def __init__(self, tokens: Iterable[Tuple[str, int]] = ( )):
+		"""語彙を生成します。\n
+		:param tokens: （形態素，出現回数）のイテラブル（ID順，特殊な形態素を除く）"""
+		self.__tokens: List[str] = [self.PADDING, self.UNKNOWN]
+		self.__counts: List[int] = [0, 0]
+		for token, count in tokens:
+			self.__tokens.append(token)
+			self.__counts.append(count)
+		self.__ids: Dict[str, int] = dict(map(lambda item: (item[1], item[0]), enumerate(self.__tokens)))
+	
+	@classmethod
+	def build(cls, token_sequences: Iterable[Iterable[str]], min_count: int = 1, max_size: Optional[int] = None) -> "Vocabulary":
+		"""形態素の列を数えて語彙を作ります（出現回数の多い順，同じ回数なら先に出現した順）。\n
+		:param token_sequences: 形態素の列のイテラブル（1回だけ読みます）
+		:param min_count: 語彙に含める最小の出現回数
+		:param max_size: 語彙の最大の大きさ（特殊な形態素を含む，Noneで上限なし）
+		:return: 語彙"""
+		counter: Counter = Counter( )
+		for tokens in token_sequences:
+			counter.update(tokens)
+		counter.pop(cls.PADDING, None)
+		counter.pop(cls.UNKNOWN, None)
+		most_common: List[Tuple[str, int]] = counter.most_common(None if max_size is None else max(max_size - 2, 0))
+		return cls(filter(lambda item: min_count <= item[1], most_common))
+	
+	@classmethod
+	def load(cls, path: str) -> "Vocabulary":
+		"""saveで保存した語彙を読み込みます。"""
+		with open(path, mode = "r", encoding = "utf-8") as vocabulary_file:
+			return cls(map(tuple, json.load(vocabulary_file)[2: ]))
+	
+	def save(self, path: str):
+		"""語彙を（形態素，出現回数）のJSON配列として保存します。"""
+		with open(path, mode = "w", encoding = "utf-8") as vocabulary_file:
+			json.dump(list(zip(self.__tokens, self.__counts)), vocabulary_file, ensure_ascii = False)
+	
+	def __len__(self) -> int:
+		return len(self.__tokens)
+	
+	def __contains__(self, token: str) -> bool:
+		return token in self.__ids
+	
+	def id(self, token: str) -> int:
+		"""形態素のIDを返します（語彙になければUNKNOWN_ID）。"""
+		return self.__ids.get(token, self.UNKNOWN_ID)
+	
+	def token(self, id: int) -> str:
+		"""IDの形態素を返します。"""
+		return self.__tokens[id]
+	
+	def count(self, token: str) -> int:
+		"""語彙を作ったときの出現回数を返します。"""
+		return self.__counts[self.id(token)] if token in self.__ids else 0
+	
+	def encode(self, tokens: Iterable[str]) -> numpy.ndarray:
+		"""形態素の列をIDの配列（int32）にします。"""
+		return numpy.fromiter(map(self.id, tokens), dtype = numpy.int32)
+	
+	def decode(self, ids: Iterable[int]) -> Tuple[str, ...]:
+		"""IDの配列を形態素の組にします。"""
+		return tuple(map(lambda id: self.__tokens[id], ids))
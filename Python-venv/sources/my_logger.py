@@ -1,45 +1,114 @@
-from typing import Optional
-from logging import getLogger, StreamHandler, Formatter, FileHandler, DEBUG, Logger
+from typing import Dict, Iterable, Optional, Set, TextIO, Tuple
+from logging import getLogger, Handler, StreamHandler, Formatter, FileHandler, DEBUG, Logger
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from datetime import date
+import multiprocessing
+import threading
+import atexit
+import queue
+import time
 import sys
 
 
 class MyLogger( ):
-	"""ロガーです。"""
+	"""ロガーです。\n
+	同じ名前で何度生成しても，ハンドラーは最初の1回だけ追加します（出力が重複しないため）。\n
+	use_queue = Trueでは，ロガーにはキューに入れるだけのハンドラーを付け，整形と標準出力・HTMLファイルへの書き込みは別スレッド（QueueListener）で行います。\n
+	このキューとスレッドは子プロセスに引き継がれないため，use_queue = Trueのロガーを使うプロセスプールは，initializer = init_worker_logging，initargs = (worker_log_queue( ), queue_logger_names( ))で作ってください。"""
 	
-	def __init__(self, name: Optional[str] = None):
+	def __init__(self, name: Optional[str] = None, use_queue: bool = False, log_directory_path: Optional[str] = None, stream: TextIO = sys.stdout):
+		"""ロガーを生成します。\n
+		:param name: ロガー名
+		:param use_queue: 整形と書き込みを別スレッドで行うか
+		:param log_directory_path: HTMLのログを書き出すディレクトリー（Noneで「Python-venv/log」）
+		:param stream: 標準出力の代わりに書き出すストリーム"""
 		self.__sources_directory_path: str = str(Path(__file__).parent)
-		self.__log_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../log"))
+		self.__log_directory_path: str = log_directory_path if log_directory_path is not None else str(Path(self.__sources_directory_path).joinpath("../log"))
+		self.__use_queue: bool = use_queue
+		self.__stream: TextIO = stream
 		self.__logger: Logger = self.__setup_logger(name) if name is not None else self.__setup_logger("default")
 	
 	@property
 	def logger(self) -> Logger:
 		return self.__logger
 	
+	@property
+	def listener(self) -> Optional[QueueListener]:
+		"""use_queue = Trueで設定したロガーの，書き込みを行うQueueListenerです（それ以外はNone）。"""
+		return listeners.get(self.__logger.name)
+	
+	def close(self):
+		"""キューに残っているログをすべて書き込んでから，ハンドラーを外します（次に同じ名前で生成すると設定し直します）。"""
+		with setup_lock:
+			listener: Optional[QueueListener] = listeners.pop(self.__logger.name, None)
+			if listener is not None:
+				listener.stop( )
+				handlers: tuple = listener.handlers
+			else:
+				handlers = tuple(self.__logger.handlers)
+			for handler in tuple(self.__logger.handlers):
+				self.__logger.removeHandler(handler)
+			for handler in handlers:
+				handler.close( )
+			configured_names.discard(self.__logger.name)
+	
 	def __setup_logger(self, name: str = __name__) -> Logger:
 		logger: Logger = getLogger(name)
-		logger.setLevel(DEBUG)
-		stream_handler: StreamHandler = StreamHandler(sys.stdout)
-		stream_handler.setLevel(DEBUG)
-		# formatter: Formatter = Formatter('[%(asctime)s: %(levelname)s: (%(name)s)] %(message)s')
-		formatter: Formatter = Formatter("\n[\033[95m%(asctime)s.%(msecs)03d\033[00m:\033[96m%(module)s\033[00m:\033[93m%(levelname)s\033[00m] %(message)s", datefmt = "%Y/%m/%d-%H:%M:%S")
-		stream_handler.setFormatter(formatter)
-		logger.addHandler(stream_handler)
-		file_handler: FileHandler = FileHandler(self.__log_directory_path + "/" + str(date.today( )) + ".html")
-		file_handler.setLevel(DEBUG)
-		file_formatter: Formatter = HTMLFormatter(fmt = '<p>[<span style="color: #ff3030;">%(asctime)s.%(msecs)03d</span>:<span style="color: #0080ff;">%(module)s</span>:<span style="color: #00a000;">%(levelname)s</span>] %(message)s</p>\r\n', datefmt = "%Y/%m/%d-%H:%M:%S")
-		file_handler.setFormatter(file_formatter)
-		logger.addHandler(file_handler)
+		with setup_lock:
+			if name in configured_names:
+				return logger
+			logger.setLevel(DEBUG)
+			stream_handler: StreamHandler = StreamHandler(self.__stream)
+			stream_handler.setLevel(DEBUG)
+			# formatter: Formatter = Formatter('[%(asctime)s: %(levelname)s: (%(name)s)] %(message)s')
+			formatter: Formatter = Formatter("\n[\033[95m%(asctime)s.%(msecs)03d\033[00m:\033[96m%(module)s\033[00m:\033[93m%(levelname)s\033[00m] %(message)s", datefmt = "%Y/%m/%d-%H:%M:%S")
+			stream_handler.setFormatter(formatter)
+			file_handler: FileHandler = FileHandler(self.__log_directory_path + "/" + str(date.today( )) + ".html")
+			file_handler.setLevel(DEBUG)
+			file_formatter: Formatter = HTMLFormatter(fmt = '<p>[<span style="color: #ff3030;">%(asctime)s.%(msecs)03d</span>:<span style="color: #0080ff;">%(module)s</span>:<span style="color: #00a000;">%(levelname)s</span>] %(message)s</p>\r\n', datefmt = "%Y/%m/%d-%H:%M:%S")
+			file_handler.setFormatter(file_formatter)
+			if self.__use_queue:
+				log_queue: queue.SimpleQueue = queue.SimpleQueue( )
+				logger.addHandler(LazyQueueHandler(log_queue))
+				listener: QueueListener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level = True)
+				listener.start( )
+				listeners[name] = listener
+			else:
+				logger.addHandler(stream_handler)
+				logger.addHandler(file_handler)
+			configured_names.add(name)
 		return logger
 
 
+class LazyQueueHandler(QueueHandler):
+	"""呼び出し元のスレッドでは整形せずに，ログをキューに入れるだけのハンドラーです。\n
+	%形式の引数の埋め込みもQueueListenerのスレッドで行います（同じプロセス内のキューのため，ピクルできなくてもよい）。"""
+	
+	def prepare(self, record):
+		# 例外の情報は，呼び出し元を抜けると変わりうるため，ここで文字列にしておく
+		if record.exc_info and not record.exc_text:
+			record.exc_text = exception_formatter.formatException(record.exc_info)
+		return record
+
+
+class ForwardingHandler(Handler):
+	"""子プロセスから受け取ったログを，このプロセスの同じ名前のロガーに渡します。"""
+	
+	def emit(self, record):
+		logger: Logger = getLogger(record.name)
+		if logger.isEnabledFor(record.levelno):
+			logger.handle(record)
+
+
 class HTMLFormatter(Formatter):
 	def __init__(self, fmt: str, datefmt: str):
 		super( ).__init__(fmt, datefmt)
 	
 	def format(self, record) -> str:
-		record.message = record.getMessage( ).replace("<", "&#60").replace(">", "&#62").replace("\r\n", "<br />").replace("\n", "<br />").replace("\t", "　　")
+		message: str = record.getMessage( )
+		# 「\r\n」だけは2文字で1つの改行のため，translateの前に「\n」にまとめる
+		record.message = (message.replace("\r\n", "\n") if "\r" in message else message).translate(HTML_TABLE)
 		if self.usesTime( ):
 			record.asctime = self.formatTime(record, self.datefmt)
 		s = self.formatMessage(record)
@@ -55,3 +124,84 @@ class HTMLFormatter(Formatter):
 				s = s + "\n"
 			s = s + self.formatStack(record.stack_info)
 		return s
+
+
+class ProgressThrottle:
+	"""進捗のログを，指定した間隔より頻繁には出力しないようにします（出力しないときはメッセージを組み立てないため，呼び出し元で判定します）。"""
+	
+	def __init__(self, interval: float = 1.0):
+		"""生成します。\n
+		:param interval: 進捗を出力する最短の間隔の秒数（0で毎回）"""
+		self.__interval: float = interval
+		self.__last_time: float = float("-inf")
+	
+	def ready(self, force: bool = False) -> bool:
+		"""前回から間隔が空いていればTrueを返し，今を前回の出力時刻にします。\n
+		:param force: 間隔に関係なく出力するか（完了時など）"""
+		now_time: float = time.monotonic( )
+		if not force and now_time - self.__last_time < self.__interval:
+			return False
+		self.__last_time = now_time
+		return True
+
+
+# HTMLのログで置き換える文字（「\r\n」はformatで「\n」にまとめてから置き換える）
+HTML_TABLE: Dict[int, str] = str.maketrans({"<": "&#60", ">": "&#62", "\n": "<br />", "\t": "　　"})
+# 例外の情報を文字列にするためだけに使う
+exception_formatter: Formatter = Formatter( )
+# 設定済みのロガー名と，use_queue = Trueのロガー名→QueueListener
+configured_names: Set[str] = set( )
+listeners: Dict[str, QueueListener] = dict( )
+setup_lock: threading.Lock = threading.Lock( )
+# 子プロセスのログを受け取るキューと，それをこのプロセスのロガーに渡すQueueListener（worker_log_queueで作る）
+worker_listener: Optional[QueueListener] = None
+
+
+def worker_log_queue( ) -> multiprocessing.Queue:
+	"""子プロセスのログを受け取るキューを返します（このプロセスでひとつだけ作り，受け取ったログは同じ名前のロガーに渡します）。"""
+	global worker_listener
+	with setup_lock:
+		if worker_listener is None:
+			worker_listener = QueueListener(multiprocessing.Queue( ), ForwardingHandler( ))
+			worker_listener.start( )
+		return worker_listener.queue
+
+
+def queue_logger_names( ) -> Tuple[str, ...]:
+	"""use_queue = Trueで設定したロガー名を返します（init_worker_loggingに渡します）。"""
+	with setup_lock:
+		return tuple(listeners.keys( ))
+
+
+def init_worker_logging(log_queue: multiprocessing.Queue, names: Iterable[str]):
+	"""プロセスプールのinitializerです。指定した名前のロガーのハンドラーを，親プロセスのworker_log_queueに送るものにします。\n
+	forkでは親プロセスから引き継いだハンドラー（書き込むスレッドが子プロセスにない）を置き換え，spawn（macOSの既定）では何も設定されていないロガーに付けます。\n
+	:param log_queue: 親プロセスのworker_log_queue( )
+	:param names: 親プロセスのqueue_logger_names( )"""
+	global worker_listener
+	# 子プロセスの開始直後でほかのスレッドはないため，setup_lockは取らない（forkの時点で親プロセスの別スレッドが持っていると解放されない）
+	for name in names:
+		logger: Logger = getLogger(name)
+		for handler in tuple(logger.handlers):
+			logger.removeHandler(handler)
+		logger.setLevel(DEBUG)
+		logger.addHandler(QueueHandler(log_queue))
+		# 子プロセスで同じ名前のMyLoggerを生成しても，ハンドラーを追加しない
+		configured_names.add(name)
+	listeners.clear( )
+	worker_listener = None
+
+
+def stop_listeners( ):
+	"""すべてのQueueListenerを止めます（キューに残っているログはすべて書き込みます）。子プロセスのログを先にロガーに渡してから止めます。"""
+	global worker_listener
+	with setup_lock:
+		if worker_listener is not None:
+			worker_listener.stop( )
+			worker_listener = None
+		for listener in listeners.values( ):
+			listener.stop( )
+		listeners.clear( )
+
+
+atexit.register(stop_listeners)
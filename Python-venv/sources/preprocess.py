@@ -0,0 +1,148 @@
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Deque, Set
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from logging import Logger, getLogger
+import multiprocessing
+import hashlib
+import time
+import json
+
+from my_logger import MyLogger
+from csv_to_json import peak_rss_mebibytes
+from models.jsonl_shard import JsonlShardWriter, read_crawled_records
+from models.preprocess_state import PreprocessState
+from models.string_normaliser import StringNormaliser
+
+
+class Preprocessor:
+	"""クロールした記事（dataset/crawl）を正規化・形態素解析し，学習用のデータ（dataset/learn）としてJSONLのシャードに書き出します。"""
+	
+	def __init__(self, logger: Optional[Logger] = None, processes: int = max(multiprocessing.cpu_count( ) - 1, 1), chunk_size: int = 64, batch_size: int = 256, compress: bool = False, progress_interval: float = 10.0):
+		"""前処理器を生成します。\n
+		:param logger: ロガー
+		:param processes: 前処理するプロセス数
+		:param chunk_size: 1プロセスにまとめて渡す記事数
+		:param batch_size: 形態素解析でまとめて解析する文字列の数
+		:param compress: 出力をgzip圧縮するか
+		:param progress_interval: 進捗を出力する間隔の秒数"""
+		self.__logger: Logger = logger if logger is not None else getLogger("Preprocessor")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__crawl_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/crawl"))
+		self.__learn_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/learn"))
+		self.__processes: int = max(processes, 1)
+		self.__chunk_size: int = max(chunk_size, 1)
+		self.__batch_size: int = max(batch_size, 1)
+		self.__compress: bool = compress
+		self.__progress_interval: float = progress_interval
+		self.__skipped_count: int = 0
+	
+	def main(self):
+		file_name: str = input("どれを前処理する？（debug / develop / test / train）：")
+		self.preprocess(file_name)
+	
+	def preprocess(self, file_name: str) -> int:
+		"""ひとつの分割を前処理します。記事を順に読み，まとまりごとにプロセスプールで処理して，順番どおりに書き出します（全記事をメモリーに載せません）。\n
+		元の記事が前回から変わっていないものは飛ばします。\n
+		:param file_name: 分割の名前（debug / develop / test / train）
+		:return: 前処理した記事数"""
+		source_directory_path: Path = Path(self.__crawl_directory_path).joinpath(file_name)
+		if not source_directory_path.is_dir( ):
+			self.__logger.error(str(source_directory_path) + " がありません。")
+			return 0
+		output_directory_path: Path = Path(self.__learn_directory_path).joinpath(file_name)
+		output_directory_path.mkdir(parents = True, exist_ok = True)
+		self.__logger.info(file_name + " を前処理します。")
+		count: int = 0
+		self.__skipped_count = 0
+		start_time: float = time.time( )
+		last_progress_time: float = start_time
+		with PreprocessState(str(output_directory_path.joinpath(file_name + ".preprocess.sqlite3"))) as state, JsonlShardWriter(str(output_directory_path), file_name, compress = self.__compress) as shard_writer:
+			records: Iterator[Tuple[Dict[str, Union[int, Optional[bool], str]], str]] = self.__changed_records(read_crawled_records(str(source_directory_path), file_name), state.source_hashes( ), shard_writer.ids( ))
+			chunks: Iterator[List[Tuple[Dict[str, Union[int, Optional[bool], str]], str]]] = iter(lambda: list(islice(records, self.__chunk_size)), [ ])
+			with ProcessPoolExecutor(max_workers = self.__processes) as executor:
+				for chunk, outputs in self.__preprocess_chunks(chunks, executor):
+					tuple(map(lambda output: shard_writer.write(output.get("id"), output), outputs))
+					# 書き込んでから記録する（途中で止まっても，書き込んでいない記事は次回前処理し直す）
+					shard_writer.flush( )
+					state.mark_many(map(lambda item: (item[0].get("id"), item[1]), chunk))
+					count += len(outputs)
+					if self.__progress_interval <= time.time( ) - last_progress_time:
+						last_progress_time = time.time( )
+						self.__disp_progress(file_name, count, last_progress_time - start_time)
+		self.__disp_progress(file_name, count, time.time( ) - start_time)
+		self.__logger.info(file_name + " の前処理が終了しました。")
+		return count
+	
+	def __changed_records(self, records: Iterator[Dict[str, Union[int, Optional[bool], str]]], source_hashes: Dict[int, str], written_ids: Set[int]) -> Iterator[Tuple[Dict[str, Union[int, Optional[bool], str]], str]]:
+		"""前回から変わった（または前処理していない）記事だけを，（記事，元の記事のハッシュ値）で返します。"""
+		for record in records:
+			record_hash: str = source_hash(record)
+			if source_hashes.get(record.get("id")) == record_hash and record.get("id") in written_ids:
+				self.__skipped_count += 1
+				continue
+			yield record, record_hash
+	
+	def __preprocess_chunks(self, chunks: Iterator[List[Tuple[Dict[str, Union[int, Optional[bool], str]], str]]], executor: ProcessPoolExecutor) -> Iterator[Tuple[List[Tuple[Dict[str, Union[int, Optional[bool], str]], str]], List[Dict[str, Union[int, Optional[bool], str, list]]]]]:
+		"""記事のまとまりを前処理し，（まとまり，前処理結果）を順番どおりに返します。処理中のまとまりはプロセス数の2倍までに抑えます。"""
+		futures: Deque[Tuple[List[Tuple[Dict[str, Union[int, Optional[bool], str]], str]], Future]] = deque( )
+		for chunk in chunks:
+			futures.append((chunk, executor.submit(preprocess_chunk, list(map(lambda item: item[0], chunk)), self.__batch_size)))
+			if self.__processes * 2 <= len(futures):
+				chunk, future = futures.popleft( )
+				yield chunk, future.result( )
+		while 0 < len(futures):
+			chunk, future = futures.popleft( )
+			yield chunk, future.result( )
+	
+	def __disp_progress(self, file_name: str, count: int, elapsed_time: float):
+		self.__logger.info(file_name + "：前処理 " + str(count) + " 件，変更なしで飛ばした記事 " + str(self.__skipped_count) + " 件，経過時間：" + str(round(elapsed_time, 2)) + " 秒，スループット：" + str(round(count / max(elapsed_time, 0.000001), 1)) + " 件／秒，最大メモリー使用量：" + str(round(peak_rss_mebibytes( ), 1)) + " MiB")
+
+
+def source_hash(record: Dict[str, Union[int, Optional[bool], str]]) -> str:
+	"""元の記事のハッシュ値を返します。"""
+	return hashlib.blake2b(json.dumps(record, ensure_ascii = False, sort_keys = True).encode("utf-8"), digest_size = 20).hexdigest( )
+
+
+@lru_cache(maxsize = None)
+def worker_normaliser( ) -> StringNormaliser:
+	"""プロセスごとにひとつだけ正規化器を生成します（GiNZAの読み込みが重いため）。形態素解析の結果は，まとまりごとにコミットするキャッシュに保存します。"""
+	return StringNormaliser(use_token_cache = True)
+
+
+def preprocess_chunk(records: List[Dict[str, Union[int, Optional[bool], str]]], batch_size: int) -> List[Dict[str, Union[int, Optional[bool], str, list]]]:
+	"""記事のまとまりを前処理します（プロセスプールから呼ぶため関数にしています）。\n
+	タイトル・要約・本文を正規化し，タイトル，要約の各行，本文を品詞などで絞り込んで形態素解析します。\n
+	:param records: クロールした記事のリスト
+	:param batch_size: 形態素解析でまとめて解析する文字列の数
+	:return: { 'year', 'month', 'category', 'id', 'is_series', 'title', 'summary', 'content', 'title_tokens', 'summary_tokens'（行ごと）, 'content_tokens' }のリスト"""
+	normaliser: StringNormaliser = worker_normaliser( )
+	outputs: List[Dict[str, Union[int, Optional[bool], str, list]]] = list( )
+	texts: List[str] = list( )
+	# 記事ごとの要約の行数
+	line_counts: List[int] = list( )
+	for record in records:
+		output: Dict[str, Union[int, Optional[bool], str, list]] = dict(map(lambda key: (key, record.get(key)), ("year", "month", "category", "id", "is_series")))
+		output["title"] = normaliser.normalise(record.get("title") or "")
+		output["summary"] = normaliser.normalise(record.get("summary") or "")
+		output["content"] = normaliser.normalise(record.get("content") or "")
+		summary_lines: List[str] = list(filter(lambda line: line != "", output["summary"].split("。")))
+		texts.extend([output["title"]] + summary_lines + [output["content"]])
+		line_counts.append(len(summary_lines))
+		outputs.append(output)
+	# まとまり全体をまとめて解析し，記事ごとに分け直す
+	tokens: Iterator[Tuple[str, ...]] = normaliser.analyse_many(texts, with_stop_words = True, batch_size = batch_size)
+	for output, line_count in zip(outputs, line_counts):
+		output["title_tokens"] = list(next(tokens))
+		output["summary_tokens"] = list(map(lambda _: list(next(tokens)), range(line_count)))
+		output["content_tokens"] = list(next(tokens))
+	if normaliser.token_cache is not None:
+		normaliser.token_cache.commit( )
+	return outputs
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("Preprocessor").logger
+	Preprocessor(logger).main( )
@@ -0,0 +1,24 @@
+from typing import Optional
+from logging import Logger, getLogger
+
+from my_logger import MyLogger
+from models.ginza_tokeniser import GinzaTokeniser
+from models.token_client import DEFAULT_ADDRESS
+from models.token_server import TokenServer
+
+
+def main(logger: Optional[Logger] = None):
+	logger = logger if logger is not None else getLogger("TokenServer")
+	address: str = input("待ち受けるアドレスは？（Unixソケットのパス，または「127.0.0.1:ポート」，空欄で" + DEFAULT_ADDRESS + "）：")
+	max_batch_size: str = input("まとめて解析する文字列の数の上限は？（空欄で256）：")
+	max_wait: str = input("他の要求を待つ最長の秒数は？（空欄で0.005）：")
+	logger.info("GiNZAを読み込みます。")
+	tokeniser: GinzaTokeniser = GinzaTokeniser( )
+	token_server: TokenServer = TokenServer(tokeniser, address if address != "" else None, int(max_batch_size) if max_batch_size != "" else 256, float(max_wait) if max_wait != "" else 0.005, logger)
+	logger.info(tokeniser.model_version + " を " + token_server.address + " で待ち受けます（Ctrl + Cで終了）。StringNormaliserは，既定のアドレスなら自動で接続します。")
+	token_server.serve_forever( )
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("TokenServer").logger
+	main(logger)
@@ -0,0 +1,151 @@
+from typing import Dict, List, Match, Optional, Pattern, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from logging import Logger, getLogger
+import threading
+import random
+import time
+import gzip
+import json
+import re
+
+from my_logger import MyLogger
+
+
+class StubServer:
+	"""保存済みの記事ページを返す，ローカルのlivedoorニュースのスタブサーバーです（クローラーをネットワークなしで計測・確認するため）。\n
+	「/article/detail/（記事ID）/」に，記事IDをページ数で割った余り番目のページ（ファイル名順）をgzip圧縮して返します。"""
+	
+	def __init__(self, pages_directory_path: Optional[str] = None, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+		"""スタブサーバーを生成します（startで起動）。\n
+		:param pages_directory_path: 記事ページ（*.html）のディレクトリー（Noneで「Python-venv/benchmark/pages」）
+		:param host: 待ち受けるホスト
+		:param port: 待ち受けるポート（0で空いているポート）
+		:param latency: 応答までの待ち秒数
+		:param jitter: 待ち秒数に加える，0～jitterの一様乱数の秒数
+		:param error_rate: 503（一時的なエラー）を返す割合
+		:param seed: 乱数の種"""
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__pages_directory_path: Path = Path(pages_directory_path) if pages_directory_path is not None else Path(self.__sources_directory_path).joinpath("../benchmark/pages")
+		self.__host: str = host
+		self.__port: int = port
+		self.__latency: float = latency
+		self.__jitter: float = jitter
+		self.__error_rate: float = error_rate
+		self.__random: random.Random = random.Random(seed)
+		self.__random_lock: threading.Lock = threading.Lock( )
+		paths: List[Path] = sorted(self.__pages_directory_path.glob("*.html"))
+		self.__names: List[str] = list(map(lambda path: path.stem, paths))
+		# 毎回圧縮すると計測にサーバーの時間が混ざるため，先に圧縮しておく
+		self.__pages: List[bytes] = list(map(lambda path: gzip.compress(path.read_bytes( )), paths))
+		self.__server: Optional[ThreadingHTTPServer] = None
+		self.__thread: Optional[threading.Thread] = None
+		self.__request_count: int = 0
+	
+	def __enter__(self):
+		self.start( )
+		return self
+	
+	def __exit__(self, exception_type, exception_value, traceback):
+		self.stop( )
+	
+	@property
+	def base_url(self) -> str:
+		"""Crawler(base_url = ...)に渡す，記事URLのIDより前の部分"""
+		return "http://" + self.__host + ":" + str(self.__server.server_address[1] if self.__server is not None else self.__port) + "/article/detail/"
+	
+	@property
+	def names(self) -> List[str]:
+		"""ページ名（ファイル名から拡張子を除いたもの）のリスト（記事IDをこの長さで割った余りが添字）"""
+		return self.__names
+	
+	@property
+	def request_count(self) -> int:
+		return self.__request_count
+	
+	def name_of(self, id: int) -> str:
+		"""記事IDに対して返すページ名を返します。"""
+		return self.__names[id % len(self.__names)]
+	
+	def expected_statuses(self) -> Dict[str, str]:
+		"""ページ名→クロール後に期待するクロール状態（ページのディレクトリーのmanifest.jsonから）を返します。"""
+		manifest_path: Path = self.__pages_directory_path.joinpath("manifest.json")
+		if not manifest_path.exists( ):
+			return dict( )
+		with open(str(manifest_path), mode = "r", encoding = "utf-8") as manifest_file:
+			return json.load(manifest_file)
+	
+	def start(self):
+		"""別スレッドで待ち受けを始めます。"""
+		if len(self.__pages) < 1:
+			raise FileNotFoundError(str(self.__pages_directory_path) + " に記事ページ（*.html）がありません。")
+		self.__server = ThreadingHTTPServer((self.__host, self.__port), self.__handler_class( ))
+		self.__server.daemon_threads = True
+		self.__thread = threading.Thread(target = self.__server.serve_forever, daemon = True)
+		self.__thread.start( )
+	
+	def stop(self):
+		if self.__server is None:
+			return
+		self.__server.shutdown( )
+		self.__server.server_close( )
+		self.__thread.join( )
+		self.__server = None
+	
+	def respond(self, path: str) -> Tuple[int, bytes]:
+		"""パスに対する（ステータスコード，gzip圧縮した本文）を返します（待ち秒数ぶん待ってから）。"""
+		with self.__random_lock:
+			self.__request_count += 1
+			wait_seconds: float = self.__latency + self.__random.uniform(0.0, self.__jitter)
+			is_error: bool = self.__random.random( ) < self.__error_rate
+		if 0.0 < wait_seconds:
+			time.sleep(wait_seconds)
+		id_match: Optional[Match] = ARTICLE_PATH_PATTERN.fullmatch(path)
+		if id_match is None:
+			return 404, b""
+		if is_error:
+			return 503, b""
+		return 200, self.__pages[int(id_match.group(1)) % len(self.__pages)]
+	
+	def __handler_class(self) -> type:
+		stub_server: StubServer = self
+		
+		class StubRequestHandler(BaseHTTPRequestHandler):
+			# クローラーはkeep-aliveで接続を使い回すため
+			protocol_version: str = "HTTP/1.1"
+			
+			def do_GET(self):
+				status, body = stub_server.respond(self.path)
+				self.send_response(status)
+				if 0 < len(body):
+					self.send_header("Content-Encoding", "gzip")
+					self.send_header("Content-Type", "text/html; charset=utf-8")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers( )
+				self.wfile.write(body)
+			
+			def log_message(self, format: str, *args):
+				pass
+		
+		return StubRequestHandler
+
+
+ARTICLE_PATH_PATTERN: Pattern = re.compile("/article/detail/([0-9]+)/?")
+
+
+def main(logger: Optional[Logger] = None):
+	logger = logger if logger is not None else getLogger("StubServer")
+	port: str = input("ポートは？（空欄で8080）：")
+	latency: str = input("応答までの待ち秒数は？（空欄で0.05）：")
+	with StubServer(port = int(port) if port != "" else 8080, latency = float(latency) if latency != "" else 0.05) as stub_server:
+		logger.info("Crawler(base_url = \"" + stub_server.base_url + "\")で，" + str(len(stub_server.names)) + " ページを返します（Ctrl + Cで終了）。")
+		try:
+			while True:
+				time.sleep(1.0)
+		except KeyboardInterrupt:
+			pass
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("StubServer").logger
+	main(logger)
@@ -0,0 +1,76 @@
+from typing import Optional
+from pathlib import Path
+from logging import Logger, getLogger
+import multiprocessing
+import time
+
+from gensim.models import Word2Vec, FastText
+from gensim.models.keyedvectors import KeyedVectors
+
+from my_logger import MyLogger
+from models.tokenised_corpus import TokenisedCorpus
+
+
+class EmbeddingTrainer:
+	"""前処理した記事の形態素で，gensimのWord2VecまたはFastTextの分散表現を学習します。"""
+	
+	def __init__(self, logger: Optional[Logger] = None, algorithm: str = "word2vec", vector_size: int = 300, window: int = 5, min_count: int = 5, epochs: int = 5, workers: int = multiprocessing.cpu_count( )):
+		"""学習器を生成します。\n
+		:param logger: ロガー
+		:param algorithm: word2vec / fasttext
+		:param vector_size: ベクトルの次元数
+		:param window: 文脈の窓の大きさ
+		:param min_count: 語彙に含める最小の出現回数
+		:param epochs: エポック数
+		:param workers: 学習するスレッド数"""
+		self.__logger: Logger = logger if logger is not None else getLogger("EmbeddingTrainer")
+		self.__sources_directory_path: str = str(Path(__file__).parent)
+		self.__learn_directory_path: str = str(Path(self.__sources_directory_path).joinpath("../dataset/learn"))
+		self.__algorithm: str = algorithm
+		self.__vector_size: int = vector_size
+		self.__window: int = window
+		self.__min_count: int = min_count
+		self.__epochs: int = epochs
+		self.__workers: int = max(workers, 1)
+	
+	def main(self):
+		algorithm: str = input("どれで学習する？（word2vec / fasttext，空欄でword2vec）：")
+		vector_size: str = input("ベクトルの次元数は？（空欄で300）：")
+		epochs: str = input("エポック数は？（空欄で5）：")
+		self.__algorithm = algorithm if algorithm != "" else "word2vec"
+		self.__vector_size = int(vector_size) if vector_size != "" else 300
+		self.__epochs = int(epochs) if epochs != "" else 5
+		self.train("train")
+	
+	def train(self, file_name: str = "train") -> str:
+		"""分割の形態素で学習し，ベクトルを「dataset/learn/（word2vec / fasttext）.kv」に保存します。\n
+		コーパスはエポックごとにディスクから読み直すため，メモリー使用量は語彙とベクトルの分だけです。\n
+		:param file_name: 学習に使う分割の名前
+		:return: 保存したファイルのパス"""
+		corpus: TokenisedCorpus = TokenisedCorpus(self.__learn_directory_path + "/" + file_name, file_name)
+		model_class = FastText if self.__algorithm == "fasttext" else Word2Vec
+		model = model_class(vector_size = self.__vector_size, window = self.__window, min_count = self.__min_count, workers = self.__workers)
+		self.__logger.info(file_name + " で" + self.__algorithm + "の語彙を作ります。")
+		start_time: float = time.time( )
+		model.build_vocab(corpus)
+		self.__logger.info("語彙の大きさ：" + str(len(model.wv)) + "，形態素の列の数：" + str(model.corpus_count) + "（" + str(round(time.time( ) - start_time, 2)) + " 秒）")
+		start_time = time.time( )
+		model.train(corpus, total_examples = model.corpus_count, epochs = self.__epochs)
+		self.__logger.info(str(self.__epochs) + " エポック学習しました（" + str(round(time.time( ) - start_time, 2)) + " 秒，" + str(self.__workers) + " スレッド）。")
+		vectors_path: str = self.__learn_directory_path + "/" + self.__algorithm + ".kv"
+		# すべての配列を別の.npyファイルに保存し，load_vectors(mmap = "r")でメモリーマップして読めるようにする
+		model.wv.save(vectors_path, sep_limit = 0)
+		self.__logger.info(vectors_path + " に保存しました。")
+		return vectors_path
+
+
+def load_vectors(vectors_path: str, mmap: Optional[str] = "r") -> KeyedVectors:
+	"""保存したベクトルを読み込みます。\n
+	:param vectors_path: EmbeddingTrainer.trainで保存したファイルのパス
+	:param mmap: メモリーマップのモード（Noneでメモリーに読み込む）"""
+	return KeyedVectors.load(vectors_path, mmap = mmap)
+
+
+if __name__ == "__main__":
+	logger: Logger = MyLogger("EmbeddingTrainer").logger
+	EmbeddingTrainer(logger).main( )